@@ -0,0 +1,18 @@
+-- pk arrangement: one row per timeslot per teaching class, parsed from arrangeInfo by the exporter
+-- weekMask: bit (w-1) set when the slot occupies week w; oddEven: 0 = as listed, 1 = odd weeks, 2 = even weeks
+
+CREATE TABLE IF NOT EXISTS arrangement (
+  teachingClassId INTEGER NOT NULL,
+  slotIndex INTEGER NOT NULL,
+  calendarId INTEGER NOT NULL,
+  weekday INTEGER NOT NULL,
+  startPeriod INTEGER NOT NULL,
+  endPeriod INTEGER NOT NULL,
+  weekMask INTEGER NOT NULL DEFAULT 0,
+  oddEven INTEGER NOT NULL DEFAULT 0,
+  room TEXT,
+  campus TEXT,
+  PRIMARY KEY (teachingClassId, slotIndex)
+);
+
+CREATE INDEX IF NOT EXISTS idx_arrangement_slot ON arrangement(calendarId, weekday, startPeriod, endPeriod, teachingClassId);
@@ -0,0 +1,13 @@
+-- Composite indexes proposed by scripts/pk-plan-check.py for pk route / exporter queries
+
+-- getLatestUpdateTime
+CREATE INDEX IF NOT EXISTS idx_fetchlog_fetchTime ON fetchlog(fetchTime);
+
+-- findCourseByMajor.majorId
+-- makes idx_major_code redundant (column prefix); drop once no plan depends on it
+CREATE INDEX IF NOT EXISTS idx_major_code_grade ON major(code, grade);
+
+-- findMajorByGrade
+-- makes idx_major_grade redundant (column prefix); drop once no plan depends on it
+CREATE INDEX IF NOT EXISTS idx_major_grade_code ON major(grade, code);
+
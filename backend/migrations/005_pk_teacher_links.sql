@@ -0,0 +1,43 @@
+-- pk teachers: one row per onesystem teacher + teaching class -> teacher links; arrangeInfo text stored once per class
+-- teacher_by_class keeps the legacy teacher (id, teachingClassId, teacherCode, teacherName, arrangeInfoText) shape for readers
+
+CREATE TABLE IF NOT EXISTS teacherinfo (
+  id INTEGER PRIMARY KEY,
+  teacherCode TEXT,
+  teacherName TEXT,
+  calendarId INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS teacherandclass (
+  teachingClassId INTEGER NOT NULL,
+  teacherId INTEGER NOT NULL,
+  PRIMARY KEY (teachingClassId, teacherId)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS arrangeinfo (
+  teachingClassId INTEGER PRIMARY KEY,
+  arrangeInfoText TEXT
+);
+
+CREATE VIEW IF NOT EXISTS teacher_by_class AS
+SELECT
+  tc.teacherId AS id,
+  tc.teachingClassId AS teachingClassId,
+  ti.teacherCode AS teacherCode,
+  ti.teacherName AS teacherName,
+  ai.arrangeInfoText AS arrangeInfoText
+FROM teacherandclass tc
+LEFT JOIN teacherinfo ti ON ti.id = tc.teacherId
+LEFT JOIN arrangeinfo ai ON ai.teachingClassId = tc.teachingClassId;
+
+-- Backfill from the legacy teacher table (rows of calendars not re-exported yet); idempotent.
+INSERT OR IGNORE INTO teacherinfo (id, teacherCode, teacherName)
+SELECT id, teacherCode, teacherName FROM teacher;
+
+INSERT OR IGNORE INTO teacherandclass (teachingClassId, teacherId)
+SELECT teachingClassId, id FROM teacher WHERE teachingClassId IS NOT NULL;
+
+INSERT OR IGNORE INTO arrangeinfo (teachingClassId, arrangeInfoText)
+SELECT teachingClassId, MAX(arrangeInfoText) FROM teacher
+WHERE teachingClassId IS NOT NULL AND arrangeInfoText IS NOT NULL
+GROUP BY teachingClassId;
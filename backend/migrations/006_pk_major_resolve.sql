@@ -0,0 +1,46 @@
+-- findCourseByMajor / getLatestCourseInfo: precomputed grade-fallback major lookup and per-calendar course ids
+-- Rebuilt by the exporter (pk-sync-000-dimensions.sql refreshes majorresolve, pk-sync-<cid>.sql its majorcourses rows);
+-- routes fall back to the major/majorandcourse queries when a row is missing.
+
+-- (major code, requested grade) -> the major with that code and the newest grade <= requested
+-- (ties: highest id, as the old ORDER BY grade DESC LIMIT 1 over idx_major_code_grade); requested grades are the major table's grades
+CREATE TABLE IF NOT EXISTS majorresolve (
+  code TEXT NOT NULL,
+  grade INTEGER NOT NULL,
+  majorId INTEGER NOT NULL,
+  PRIMARY KEY (code, grade)
+) WITHOUT ROWID;
+
+-- per calendar and resolved major (JSON arrays of coursedetail ids):
+-- courseIds = classes linked to any major with the same code and grade <= the major's (findCourseByMajor),
+-- ownCourseIds = classes linked to the major itself (isExclusive)
+CREATE TABLE IF NOT EXISTS majorcourses (
+  calendarId INTEGER NOT NULL,
+  majorId INTEGER NOT NULL,
+  courseIds TEXT NOT NULL,
+  ownCourseIds TEXT NOT NULL,
+  PRIMARY KEY (calendarId, majorId)
+) WITHOUT ROWID;
+
+-- Backfill from the rows already in D1 (same SQL as pk_export MAJORRESOLVE_SQL / MAJORCOURSES_SQL); idempotent,
+-- and a re-apply (the workflow applies every migration on each run) writes no unchanged row.
+INSERT INTO majorresolve (code, grade, majorId)
+SELECT code, grade, majorId FROM (
+  SELECT c.code AS code, g.grade AS grade,
+    (SELECT m.id FROM major m WHERE m.code = c.code AND m.grade <= g.grade ORDER BY m.grade DESC, m.id DESC LIMIT 1) AS majorId
+  FROM (SELECT DISTINCT code FROM major WHERE code IS NOT NULL) c, (SELECT DISTINCT grade FROM major WHERE grade IS NOT NULL) g
+) WHERE majorId IS NOT NULL
+ON CONFLICT(code, grade) DO UPDATE SET majorId = excluded.majorId WHERE majorresolve.majorId != excluded.majorId;
+
+INSERT INTO majorcourses (calendarId, majorId, courseIds, ownCourseIds)
+SELECT l.calendarId, t.id, json_group_array(DISTINCT l.courseId), json_group_array(l.courseId) FILTER (WHERE l.majorId = t.id)
+FROM (SELECT DISTINCT r.majorId AS id, m.code AS code, m.grade AS grade FROM majorresolve r JOIN major m ON m.id = r.majorId) t
+JOIN (
+  SELECT cd.calendarId AS calendarId, mac.majorId AS majorId, mac.courseId AS courseId, m.code AS code, m.grade AS grade
+  FROM majorandcourse mac
+  JOIN major m ON m.id = mac.majorId
+  JOIN coursedetail cd ON cd.id = mac.courseId
+) l ON l.code = t.code AND l.grade <= t.grade
+GROUP BY l.calendarId, t.id
+ON CONFLICT(calendarId, majorId) DO UPDATE SET courseIds = excluded.courseIds, ownCourseIds = excluded.ownCourseIds
+WHERE majorcourses.courseIds IS NOT excluded.courseIds OR majorcourses.ownCourseIds IS NOT excluded.ownCourseIds;
@@ -4,7 +4,7 @@
 -- Insert teachers (review site teachers table) by name if missing
 INSERT INTO teachers (name)
 SELECT DISTINCT TRIM(t.teacherName) AS name
-FROM teacher t
+FROM teacher_by_class t
 WHERE TRIM(COALESCE(t.teacherName, '')) != ''
   AND NOT EXISTS (
     SELECT 1 FROM teachers tt WHERE tt.name = TRIM(t.teacherName)
@@ -17,7 +17,7 @@ WITH
       cd.courseCode AS courseCode,
       MIN(TRIM(t.teacherName)) AS teacherName
     FROM coursedetail cd
-    LEFT JOIN teacher t ON t.teachingClassId = cd.id
+    LEFT JOIN teacher_by_class t ON t.teachingClassId = cd.id
     WHERE TRIM(COALESCE(cd.courseCode, '')) != ''
     GROUP BY cd.courseCode
   ),
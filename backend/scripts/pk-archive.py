@@ -0,0 +1,71 @@
+import argparse
+import json
+import pathlib
+import sys
+
+from pk_export.archive import CourseArchive
+from pk_export.dimensions import DIMENSIONS_FILE, DimensionStage
+from pk_export.sqlgen import write_calendar_sql
+
+
+def rebuild_sql(archive: CourseArchive, calendar_ids: list, out_dir: pathlib.Path) -> dict:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dimensions = DimensionStage()
+    files = []
+    for cid in calendar_ids:
+        courses = archive.courses(cid)
+        dimensions.add_courses(cid, courses)
+        file_path = out_dir / f"pk-sync-{cid}.sql"
+        with file_path.open("w", encoding="utf-8", newline="\n") as f:
+            inserted = write_calendar_sql(f, cid, courses, source="archive")
+        files.append({"calendarId": cid, "file": str(file_path), "teachingClassInserted": inserted})
+    dimensions_path = out_dir / DIMENSIONS_FILE
+    with dimensions_path.open("w", encoding="utf-8", newline="\n") as f:
+        f.write("-- generated by pk-archive.py (shared dimensions)\n")
+        dimensions.write_sql(f)
+    return {"files": files, "dimensionsFile": str(dimensions_path), "dimensions": dimensions.counts()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the local multi-semester pk archive or rebuild pk-sync SQL from it offline.")
+    parser.add_argument(
+        "--archive", default=".tmp/pk-archive.sqlite", help="Archive file written by pk-login-and-export-sql.py --archive (relative to backend/)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Calendars, dedup ratio and size versus the raw crawl JSON")
+    p = sub.add_parser("sections", help="All archived sections of one courseCode, newest calendar first")
+    p.add_argument("course_code")
+    p.add_argument("--last", type=int, default=0, help="Only the last N archived calendars (0 = all)")
+    p = sub.add_parser("rebuild-sql", help="Write pk-sync-*.sql for archived calendars without crawling")
+    p.add_argument("calendar_ids", nargs="*", type=int, help="Calendars to rebuild (default: all archived)")
+    p.add_argument("--out-dir", default=".tmp/pk-sync", help="Output directory for generated SQL files (relative to backend/)")
+    args = parser.parse_args()
+
+    # Relative paths resolve against backend/, like pk-login-and-export-sql.py, wherever this is run from.
+    backend_dir = pathlib.Path(__file__).resolve().parent.parent
+    archive_path = backend_dir / args.archive
+    if not archive_path.exists():
+        print(f"Archive not found: {archive_path}")
+        return 1
+    archive = CourseArchive(archive_path)
+    try:
+        if args.command == "stats":
+            out = archive.stats()
+        elif args.command == "sections":
+            out = archive.sections(args.course_code, last=args.last)
+        else:
+            calendar_ids = args.calendar_ids or archive.calendar_ids()
+            missing = sorted(set(calendar_ids) - set(archive.calendar_ids()))
+            if missing:
+                print(f"Calendars not archived: {missing}")
+                return 1
+            out = rebuild_sql(archive, calendar_ids, (backend_dir / args.out_dir).resolve())
+    finally:
+        archive.close()
+
+    print(json.dumps(out, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
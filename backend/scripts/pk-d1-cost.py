@@ -0,0 +1,80 @@
+import argparse
+import json
+import pathlib
+import sys
+
+from pk_export.cost import check_budget, compare_reports, estimate_files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Estimate D1 rows read/written by exported pk-sync SQL and enforce a write budget."
+    )
+    parser.add_argument("files", nargs="*", help="SQL files to estimate (default: pk-sync-*.sql in --sql-dir, in apply order)")
+    parser.add_argument("--sql-dir", default=".tmp/pk-sync", help="Directory holding exporter output (relative to backend/)")
+    parser.add_argument(
+        "--db",
+        default="",
+        help="Staging SQLite database to replay onto (a copy is used; e.g. the local D1 sqlite). Empty = fresh pk schema",
+    )
+    parser.add_argument("--report", default="", help="Report JSON path (default: <sql-dir>/d1-cost-report.json)")
+    parser.add_argument("--baseline", default="", help="Previous report to compare with (default: the existing --report file)")
+    parser.add_argument("--max-rows-written", type=int, default=0, help="Fail when estimated rows written exceed this (0 = off)")
+    parser.add_argument("--max-rows-read", type=int, default=0, help="Fail when estimated rows read exceed this (0 = off)")
+    parser.add_argument("--max-growth", type=float, default=0, help="Fail when rows read/written grow more than this ratio vs baseline (0 = off)")
+    args = parser.parse_args()
+
+    sql_dir = pathlib.Path(args.sql_dir)
+    files = [pathlib.Path(f) for f in args.files] or sorted(sql_dir.glob("pk-sync-*.sql"))
+    if not files:
+        print(f"No SQL files found in {sql_dir}")
+        return 1
+
+    report_path = pathlib.Path(args.report) if args.report else sql_dir / "d1-cost-report.json"
+    baseline_path = pathlib.Path(args.baseline) if args.baseline else report_path
+    previous = None
+    if baseline_path.exists():
+        try:
+            previous = json.loads(baseline_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[warn] baseline unreadable: {baseline_path}: {e}")
+
+    report = estimate_files(files, db_path=args.db or None)
+    comparison = compare_reports(report, previous) if previous else None
+    if comparison:
+        report["comparison"] = comparison
+    violations = check_budget(
+        report,
+        max_rows_written=args.max_rows_written,
+        max_rows_read=args.max_rows_read,
+        max_growth=args.max_growth,
+        comparison=comparison,
+    )
+    report["budget"] = {
+        "maxRowsWritten": args.max_rows_written,
+        "maxRowsRead": args.max_rows_read,
+        "maxGrowth": args.max_growth,
+        "violations": violations,
+    }
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{'calendar':<12} {'statements':>10} {'rowsRead':>12} {'rowsWritten':>12}")
+    for label, c in report["byCalendar"].items():
+        print(f"{label:<12} {c['statements']:>10} {c['rowsRead']:>12} {c['rowsWritten']:>12}")
+    print(f"{'table':<24} {'rowsRead':>12} {'rowsWritten':>12}")
+    for table, c in sorted(report["byTable"].items(), key=lambda kv: -kv[1]["rowsWritten"]):
+        print(f"{table:<24} {c['rowsRead']:>12} {c['rowsWritten']:>12}")
+    for v in violations:
+        print(f"[budget] {v}")
+
+    summary = {"report": str(report_path), **report["totals"], "violations": len(violations)}
+    if comparison:
+        summary["previousRowsWritten"] = comparison["totals"]["rowsWritten"]["previous"]
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import glob
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import requests
+
+from pk_export import decode
+from pk_export.synth import synthetic_courses, synthetic_page
+
+
+def res_json(raw: bytes):
+    # what fetch_manual_arrange_page used to do with the response
+    res = requests.Response()
+    res._content = raw
+    res.status_code = 200
+    return res.json()
+
+
+def decoders() -> dict:
+    out = {"res.json()": res_json, "stdlib": decode.decode_page_stdlib}
+    if decode.msgspec is not None:
+        out["msgspec"] = decode.decode_page_typed
+    return out
+
+
+def measure(fn, pages: list, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        for raw in pages:
+            t0 = time.perf_counter()
+            fn(raw)
+            times.append((time.perf_counter() - t0) * 1000)
+
+    # allocations of one pass, kept results included (what the crawl holds on to until the SQL is written)
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    kept = [fn(raw) for raw in pages]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    records = sum(len(((page or {}).get("data") or {}).get("list") or []) for page in kept)
+    del kept
+    return {
+        "msPerPage": {"median": round(statistics.median(times), 3), "mean": round(statistics.fmean(times), 3), "max": round(max(times), 3)},
+        "pagesPerSec": round(1000 / statistics.fmean(times), 1),
+        "records": records,
+        "blocksPerPage": round(blocks / len(pages)),
+        "retainedKiBPerPage": round(current / 1024 / len(pages), 1),
+        "peakKiB": round(peak / 1024, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare manualArrange/page decoding (res.json() vs the projected stdlib/msgspec decoders): time and allocations per page."
+    )
+    parser.add_argument("--pages", default="", help="Glob of recorded page response bodies (default: synthetic pages)")
+    parser.add_argument("--classes", type=int, default=4000, help="Synthetic: teaching classes to page through")
+    parser.add_argument("--page-size", type=int, default=200, help="Synthetic: records per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the pages")
+    parser.add_argument("--report", default="", help="Also write the results here as JSON")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = [open(path, "rb").read() for path in sorted(glob.glob(args.pages))]
+        if not pages:
+            print(f"No files match {args.pages}")
+            return 1
+    else:
+        courses = synthetic_courses(121, classes=args.classes)
+        pages = [synthetic_page(courses, n, args.page_size) for n in range(1, -(-len(courses) // args.page_size) + 1)]
+
+    results = {name: measure(fn, pages, args.repeat) for name, fn in decoders().items()}
+    # every decoder must hand the exporter the same records
+    projected = [decode.decode_page_stdlib(raw) for raw in pages]
+    for name, fn in decoders().items():
+        if name != "res.json()":
+            results[name]["sameRecords"] = [fn(raw) for raw in pages] == projected
+
+    base = results["res.json()"]["msPerPage"]["median"]
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.1f} KiB/page on average")
+    print(f"{'decoder':<12} {'ms/page':>9} {'speedup':>8} {'blocks/page':>12} {'KiB kept/page':>14}")
+    for name, r in results.items():
+        speedup = base / r["msPerPage"]["median"] if r["msPerPage"]["median"] else 0
+        print(f"{name:<12} {r['msPerPage']['median']:>9} {speedup:>7.2f}x {r['blocksPerPage']:>12} {r['retainedKiBPerPage']:>14}")
+    summary = {"pages": len(pages), "pageBytes": sum(map(len, pages)), "decoders": results}
+    stdlib = results["stdlib"]
+    if stdlib["msPerPage"]["median"] > base:
+        # Expected: the fallback is the same json.loads plus a projection; what it buys is the memory held per page.
+        kept = 1 - stdlib["retainedKiBPerPage"] / results["res.json()"]["retainedKiBPerPage"]
+        summary["note"] = (
+            f"stdlib is json.loads plus a projection, so it is slower than res.json() and keeps {kept:.0%} less per page; "
+            "msgspec (scripts/requirements.txt) is the fast path"
+            + ("" if "msgspec" in results else ", and is not installed here")
+        )
+        print(f"note: {summary['note']}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if all(r.get("sameRecords", True) for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
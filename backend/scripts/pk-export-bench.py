@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+from pk_export.dimensions import DimensionStage
+from pk_export.parallel import ParallelCalendarGenerator
+from pk_export.sqlgen import calendar_statements, write_calendar_statements
+from pk_export.synth import synthetic_courses
+
+
+def generate(calendars: dict, out_dir: pathlib.Path, generator=None):
+    """Dimension rows, statements and SQL file bytes of every calendar, as the exporter builds them."""
+    dimensions = DimensionStage()
+    groups, size = [], 0
+    for cid, courses in calendars.items():
+        path = out_dir / f"pk-sync-{cid}.sql"
+        with path.open("w", encoding="utf-8", newline="\n") as f:
+            if generator is not None:
+                generated = generator.generate(cid, courses, source="bench")
+                dimensions.merge(generated.dimensions)
+                generated.write(f)
+                statements = generated.statements
+            else:
+                statements, _ = calendar_statements(cid, courses, source="bench")
+                dimensions.add_courses(cid, courses)
+                write_calendar_statements(f, statements)
+        groups.append(statements)
+        size += path.stat().st_size
+    return dimensions, groups, size
+
+
+def comparable(dimensions: DimensionStage, groups: list):
+    # fetchlog rows carry the generation time
+    return (
+        dimensions.statements(),
+        [[s for s in statements if not s[0].startswith("INSERT INTO fetchlog")] for statements in groups],
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time calendar SQL generation in process vs on a process pool (synthetic calendars).")
+    parser.add_argument("--calendars", type=int, default=2, help="Synthetic calendars")
+    parser.add_argument("--classes", type=int, default=20000, help="Teaching classes per calendar")
+    parser.add_argument("--jobs", default="", help="Comma-separated pool sizes (default: 2,4,... up to the CPU count)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    jobs = [int(j) for j in args.jobs.split(",") if j.strip()] if args.jobs else [j for j in (2, 4, 8, 16) if j <= max(2, cpus)]
+    calendars = {cid: synthetic_courses(cid, classes=args.classes, seed=args.seed) for cid in range(121 - args.calendars + 1, 122)}
+    classes = sum(len(c) for c in calendars.values())
+
+    with tempfile.TemporaryDirectory(prefix="pk-export-bench-") as tmp:
+        out_dir = pathlib.Path(tmp)
+        t0 = time.perf_counter()
+        serial = generate(calendars, out_dir)
+        base = time.perf_counter() - t0
+        expected = comparable(*serial[:2])
+        runs = [{"jobs": 1, "sec": round(base, 3), "classesPerSec": round(classes / base), "speedup": 1.0, "sqlBytes": serial[2]}]
+        for n in jobs:
+            with ParallelCalendarGenerator(n, work_dir=out_dir / "fragments") as generator:
+                generate({121: calendars[121][:2000]}, out_dir, generator)  # start the workers outside the timing
+                t0 = time.perf_counter()
+                result = generate(calendars, out_dir, generator)
+                sec = time.perf_counter() - t0
+            runs.append(
+                {
+                    "jobs": n,
+                    "sec": round(sec, 3),
+                    "classesPerSec": round(classes / sec),
+                    "speedup": round(base / sec, 2),
+                    "sqlBytes": result[2],
+                    "sameStatements": comparable(*result[:2]) == expected,
+                }
+            )
+
+    for r in runs:
+        print(f"jobs={r['jobs']:>3} {r['sec']:>8.3f}s {r['classesPerSec']:>9} classes/s x{r['speedup']}")
+    print(json.dumps({"cpus": cpus, "classes": classes, "runs": runs}, ensure_ascii=False))
+    return 0 if all(r.get("sameStatements", True) for r in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import argparse
+import json
+import pathlib
+import sqlite3
+import sys
+
+from pk_export.dimensions import DimensionStage
+from pk_export.loadtest import DEFAULT_MIX, LoadRunner, check_run, compare_runs, sample_pool
+from pk_export.localdb import LocalSchemaError, apply_local, find_local_d1
+from pk_export.sqlgen import calendar_statements
+from pk_export.synth import synthetic_courses
+
+
+def parse_mix(text: str) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown endpoint in --mix: {name} (known: {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def seed_synthetic(db_path: pathlib.Path, calendars: int, classes: int, seed: int, latest: int = 121) -> dict:
+    stage = DimensionStage()
+    groups = []
+    for cid in range(latest - calendars + 1, latest + 1):
+        courses = synthetic_courses(cid, classes=classes, seed=seed)
+        stage.add_courses(cid, courses)
+        groups.append(calendar_statements(cid, courses, source="synthetic")[0])
+    return apply_local(db_path, [stage.statements(), *groups])
+
+
+def main() -> int:
+    backend_dir = pathlib.Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(
+        description="Replay a weighted pk/review request mix against a local `wrangler dev` Worker at increasing concurrency."
+    )
+    parser.add_argument("--base-url", default="http://127.0.0.1:8787", help="Worker under test (wrangler dev default port)")
+    parser.add_argument(
+        "--db",
+        default="auto",
+        help="SQLite file the Worker serves, used to sample request parameters ('auto' = local D1 under .wrangler/state)",
+    )
+    parser.add_argument("--calendar-id", type=int, default=None, help="Calendar to query (default: newest in --db)")
+    parser.add_argument(
+        "--mix",
+        default="",
+        help=f"Endpoint weights overriding the defaults, e.g. findCourseBySearch=50,getAllCalendar=0 (endpoints: {', '.join(DEFAULT_MIX)})",
+    )
+    parser.add_argument("--ramp", default="1,4,16", help="Comma-separated concurrency stages")
+    parser.add_argument("--stage-seconds", type=float, default=15, help="Duration of each stage")
+    parser.add_argument("--warmup", type=float, default=3, help="Unrecorded warmup at the first stage's concurrency (seconds)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for parameter sampling and the request sequence")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout (seconds)")
+    parser.add_argument(
+        "--seed-synthetic",
+        type=int,
+        default=0,
+        help="First write this many synthetic calendars into --db with the exporter's statements (0 = use the data as is)",
+    )
+    parser.add_argument("--synthetic-classes", type=int, default=3000, help="Teaching classes per synthetic calendar")
+    parser.add_argument("--report", default=".tmp/pk-load-test-report.json", help="Report JSON path (relative to backend/)")
+    parser.add_argument("--baseline", default="", help="Previous report to compare with (default: the existing --report file)")
+    parser.add_argument("--max-error-rate", type=float, default=0, help="Fail when an endpoint's error rate exceeds this (0 = off)")
+    parser.add_argument("--max-p95-growth", type=float, default=0, help="Fail when an endpoint's p95 grows more than this ratio vs baseline (0 = off)")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+        ramp = [int(c) for c in args.ramp.split(",") if c.strip()]
+        db_path = find_local_d1(backend_dir) if args.db == "auto" else (backend_dir / args.db).resolve()
+        if not db_path.exists():
+            raise FileNotFoundError(f"Database not found: {db_path}")
+        if args.seed_synthetic > 0:
+            seeded = seed_synthetic(db_path, args.seed_synthetic, args.synthetic_classes, args.seed)
+            print(f"seeded {args.seed_synthetic} synthetic calendars rowsChanged={seeded['rowsChanged']} db={db_path}")
+    except (ValueError, FileNotFoundError, LocalSchemaError) as e:
+        print(str(e))
+        return 1
+    if not ramp or min(ramp) < 1:
+        print("--ramp needs at least one concurrency >= 1")
+        return 1
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        pool = sample_pool(conn, calendar_id=args.calendar_id, seed=args.seed)
+    finally:
+        conn.close()
+
+    runner = LoadRunner(args.base_url, pool, mix=mix, seed=args.seed, timeout=args.timeout)
+    stages = runner.run(ramp, args.stage_seconds, warmup=args.warmup)
+    report = {
+        "baseUrl": args.base_url,
+        "db": str(db_path),
+        "calendarId": pool["calendarId"],
+        "seed": args.seed,
+        "mix": runner.mix,
+        "stageSeconds": args.stage_seconds,
+        "stages": stages,
+    }
+
+    report_path = backend_dir / args.report
+    baseline_path = backend_dir / args.baseline if args.baseline else report_path
+    comparison = None
+    if baseline_path.exists():
+        try:
+            comparison = compare_runs(report, json.loads(baseline_path.read_text(encoding="utf-8")))
+        except Exception as e:
+            print(f"[warn] baseline unreadable: {baseline_path}: {e}")
+    if comparison:
+        report["comparison"] = comparison
+    violations = check_run(report, max_error_rate=args.max_error_rate, max_p95_growth=args.max_p95_growth, comparison=comparison)
+    report["violations"] = violations
+
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{'c':>4} {'endpoint':<24} {'req':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for stage in stages:
+        for name, s in sorted(stage["endpoints"].items(), key=lambda kv: kv[0] == "all"):
+            lat = s["latencyMs"]
+            print(
+                f"{stage['concurrency']:>4} {name:<24} {s['requests']:>7} {s['throughput']:>8} {s['errorRate'] * 100:>6.1f} "
+                f"{lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8}"
+            )
+    for v in violations:
+        print(f"[load] {v}")
+    print(json.dumps({"report": str(report_path), "stages": len(stages), "violations": len(violations)}, ensure_ascii=False))
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import argparse
+import json
 import os
 import pathlib
+import sqlite3
 import sys
 import time
 import traceback
@@ -11,60 +13,28 @@ except Exception as e:
     print("Missing python dependency: requests")
     print(str(e))
     print("Install:")
-    print("  python -m pip install requests")
+    print("  python -m pip install -r scripts/requirements.txt  (from backend/, or: npm run pk:deps)")
     raise SystemExit(1)
 
-
-def sql_quote(value):
-    if value is None:
-        return "NULL"
-    if isinstance(value, bool):
-        return "1" if value else "0"
-    if isinstance(value, (int, float)):
-        # Keep NaN/inf out of SQL
-        if isinstance(value, float) and (value != value or value == float("inf") or value == float("-inf")):
-            return "NULL"
-        return str(value)
-    s = str(value)
-    s = s.replace("\x00", "")
-    s = s.replace("'", "''")
-    return "'" + s + "'"
-
-
-def parse_major_string(major: str):
-    name = str(major or "").strip()
-    grade = None
-    grade_raw = name[:4]
-    if grade_raw.isdigit():
-        grade = int(grade_raw)
-
-    code = None
-    # Example: "2025(03074 土木工程(国际班))"
-    import re
-
-    # Example:
-    # - "2025(03074 土木工程(国际班))"
-    # - "2025(WF00020204 ... )"
-    # We want to capture the leading major code inside the first parentheses.
-    m = re.search(r"\(([0-9A-Za-z]{3,16})\s", name)
-    if m:
-        code = m.group(1)
-
-    return {"grade": grade, "code": code, "name": name}
-
-
-def compute_new_code(course: dict):
-    new_course_code = str(course.get("newCourseCode") or "").strip() or None
-    if not new_course_code:
-        return (None, None)
-
-    code = str(course.get("code") or "").strip()
-    course_code = str(course.get("courseCode") or "").strip()
-    if not code or not course_code or not code.startswith(course_code) or len(code) < 2:
-        return (new_course_code, None)
-
-    suffix = code[-2:]
-    return (new_course_code, (new_course_code + suffix) if suffix else None)
+from pk_export.archive import CourseArchive
+from pk_export.checksums import CHECKSUMS_FILE, checksum_tree, expected_db, key_ranges
+from pk_export.daemon import SyncDaemon, run_daemon
+from pk_export.dimensions import DIMENSIONS_FILE, DimensionStage
+from pk_export.localdb import LocalSchemaError, apply_local, find_local_d1, schema_problems
+from pk_export.onesystem import fetch_calendar_courses
+from pk_export.parallel import ParallelCalendarGenerator
+from pk_export.shards import ShardWriter, build_calendar_shards, known_majors
+from pk_export.sqlgen import calendar_statements, write_calendar_statements, write_statements
+from pk_export.volatile import (
+    REFRESH_FILE,
+    diff_rows,
+    commit_snapshots,
+    load_snapshot,
+    local_rows,
+    refresh_statements,
+    save_snapshot,
+    volatile_rows,
+)
 
 
 def ensure_config_copy(config_path: pathlib.Path):
@@ -97,46 +67,6 @@ def disable_proxy_env():
         os.environ.pop(key, None)
 
 
-def fetch_manual_arrange_page(session: requests.Session, calendar_id: int, page_num: int, page_size: int):
-    payload = {
-        "condition": {
-            "trainingLevel": "",
-            "campus": "",
-            "calendar": calendar_id,
-            "college": "",
-            "course": "",
-            "ids": [],
-            "isChineseTeaching": None,
-        },
-        "pageNum_": page_num,
-        "pageSize_": page_size,
-    }
-
-    url = "https://1.tongji.edu.cn/api/arrangementservice/manualArrange/page?profile"
-    headers = {
-        "Content-Type": "application/json",
-        "Referer": "https://1.tongji.edu.cn/taskResultQuery",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36",
-    }
-    last_err = None
-    for attempt in range(1, 6):
-        try:
-            res = session.post(url, json=payload, headers=headers, timeout=120)
-            if res.status_code in (429, 500, 502, 503, 504):
-                raise requests.HTTPError(f"HTTP {res.status_code}", response=res)
-            res.raise_for_status()
-            return res.json()
-        except Exception as e:
-            last_err = e
-            sleep_s = min(10, 1 + attempt * 2)
-            print(
-                f"[warn] manualArrange/page failed (calendarId={calendar_id} page={page_num} attempt={attempt}): {e}. retry in {sleep_s}s",
-                file=sys.stderr,
-            )
-            time.sleep(sleep_s)
-    raise last_err  # type: ignore[misc]
-
-
 def main() -> int:
     disable_proxy_env()
 
@@ -152,15 +82,111 @@ def main() -> int:
         default=str(pathlib.Path(__file__).resolve().parents[1] / "config.onesystem.ini"),
         help="Path to config.ini used by pk crawler login",
     )
+    parser.add_argument(
+        "--shards-dir",
+        default="",
+        help="Also write content-hashed JSON read-model shards + manifest.json here (relative to backend/, empty = off; major isExclusive needs --local-d1)",
+    )
+    parser.add_argument(
+        "--local-d1",
+        default="",
+        help="Also write the data straight into the local D1 SQLite file (path relative to backend/, or 'auto' = .wrangler/state)",
+    )
+    parser.add_argument("--no-analyze", action="store_true", help="Local D1: skip ANALYZE after loading")
+    parser.add_argument(
+        "--archive",
+        default="",
+        help="Also append each crawled calendar to this multi-semester archive (relative to backend/, e.g. .tmp/pk-archive.sqlite)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Generate each calendar's SQL on this many processes (1 = in process, 0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Only refresh the volatile coursedetail columns (number/elcNumber) of changed classes into pk-refresh-<cid>.sql",
+    )
+    parser.add_argument(
+        "--refresh-all",
+        action="store_true",
+        help="Refresh: ignore the volatile-<cid>.json snapshot and send every class (the UPDATE still writes only changed rows)",
+    )
+    parser.add_argument(
+        "--commit-snapshot",
+        action="store_true",
+        help="Mark the last export/refresh of these calendars as applied (promote volatile-<cid>.pending.json, the next "
+        "--refresh baseline) and exit; run it after the pk-sync/pk-refresh SQL was applied to D1",
+    )
+    parser.add_argument("--daemon", action="store_true", help="Keep the session alive and re-export a calendar only when it changes")
+    parser.add_argument("--poll-interval", type=float, default=300, help="Daemon: seconds between change probes per calendar")
+    parser.add_argument("--keepalive-interval", type=float, default=600, help="Daemon: max idle seconds before a session keep-alive probe")
+    parser.add_argument("--probe-page-size", type=int, default=20, help="Daemon: pageSize_ of the page-1 fingerprint probe")
+    parser.add_argument(
+        "--full-every",
+        type=int,
+        default=12,
+        help="Daemon: force a full crawl after this many unchanged probes (catches edits beyond page 1, 0 = never)",
+    )
+    parser.add_argument("--status-file", default="", help="Daemon: status JSON path (relative to backend/, default <out-dir>/daemon-status.json)")
+    parser.add_argument("--status-port", type=int, default=0, help="Daemon: serve the status JSON on 127.0.0.1:<port> (0 = off)")
+    parser.add_argument(
+        "--on-change",
+        default="",
+        help="Daemon: shell command run after a changed calendar is exported, e.g. 'npx wrangler d1 execute jcourse-db --local --file={file}'",
+    )
     args = parser.parse_args()
 
     if args.calendar_id <= 0:
         print("Invalid --calendarId")
         return 1
 
+    if args.jobs < 0:
+        print("Invalid --jobs")
+        return 1
+    if args.refresh and args.daemon:
+        print("--refresh and --daemon cannot be combined")
+        return 1
+
     depth = max(1, int(args.depth))
 
     repo_root = pathlib.Path(__file__).resolve().parents[2]  # .../main
+    calendar_ids = list(range(args.calendar_id - depth + 1, args.calendar_id + 1))
+
+    if args.commit_snapshot:
+        committed = commit_snapshots((repo_root / "backend" / args.out_dir).resolve(), calendar_ids)
+        print(json.dumps({"committedSnapshots": committed}, ensure_ascii=False))
+        return 0
+
+    local_d1 = None
+    if args.local_d1:
+        try:
+            if args.local_d1 == "auto":
+                local_d1 = find_local_d1(repo_root / "backend")
+            else:
+                local_d1 = (repo_root / "backend" / args.local_d1).resolve()
+                if not local_d1.exists():
+                    raise FileNotFoundError(f"Local D1 database not found: {local_d1}")
+        except FileNotFoundError as e:
+            print(str(e))
+            return 1
+        # Fail before the crawl rather than after it.
+        conn = sqlite3.connect(str(local_d1))
+        try:
+            errors, warnings = schema_problems(conn)
+        finally:
+            conn.close()
+        for w in warnings:
+            print(f"[local-d1] {w}")
+        if errors:
+            print(f"Local D1 schema at {local_d1} is behind the pk migrations:")
+            for e in errors:
+                print(f"  {e}")
+            print("Apply them with: npx wrangler d1 execute jcourse-db --local --file=migrations/<file>")
+            return 1
+
     pk_crawler_dir = pathlib.Path(__file__).resolve().parent / "pk_crawler"
     if not pk_crawler_dir.exists():
         print(f"Cannot find pk crawler runtime at: {pk_crawler_dir}")
@@ -200,215 +226,184 @@ def main() -> int:
     out_dir = pathlib.Path(repo_root / "backend" / args.out_dir).resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    calendar_ids = list(range(args.calendar_id - depth + 1, args.calendar_id + 1))
     summary = {"calendarIds": calendar_ids, "files": []}
 
-    for cid in calendar_ids:
+    shard_writer = ShardWriter((repo_root / "backend" / args.shards_dir).resolve()) if args.shards_dir else None
+
+    calendar_groups = []
+    archive = CourseArchive((repo_root / "backend" / args.archive).resolve()) if args.archive else None
+
+    generator = ParallelCalendarGenerator(args.jobs) if args.jobs != 1 and not args.refresh else None
+
+    def export_calendar(cid: int, courses: list, source: str = "action", standalone: bool = False, dimensions=None, raw_bytes=None):
         t0 = time.time()
-        first = fetch_manual_arrange_page(session, cid, 1, args.page_size)
-        total = int(((first.get("data") or {}).get("total_") or 0))
-        first_list = (first.get("data") or {}).get("list") or []
-        if not isinstance(first_list, list):
-            first_list = []
-
-        total_pages = (total // args.page_size) + 1
-        courses = list(first_list)
-        for page in range(2, total_pages + 1):
-            nxt = fetch_manual_arrange_page(session, cid, page, args.page_size)
-            lst = (nxt.get("data") or {}).get("list") or []
-            if isinstance(lst, list) and lst:
-                courses.extend(lst)
-
-        # generate sql
         file_path = out_dir / f"pk-sync-{cid}.sql"
-        seen_language = set()
-        seen_course_nature = set()
-        seen_assessment = set()
-        seen_campus = set()
-        seen_faculty = set()
-        seen_major = set()
-
+        # Single-calendar export (daemon): carry this calendar's dimension rows in the same file.
+        stage = DimensionStage() if standalone else dimensions
+        generated = None
+        if generator is not None:
+            generated = generator.generate(cid, courses, source=source)
+            statements, inserted = generated.statements, generated.inserted
+            stage.merge(generated.dimensions)
+        else:
+            statements, inserted = calendar_statements(cid, courses, source=source)
+            stage.add_courses(cid, courses)
         with file_path.open("w", encoding="utf-8", newline="\n") as f:
-            f.write("-- generated by pk-login-and-export-sql.py\n")
-            # NOTE: Cloudflare D1 (via wrangler d1 execute) does not allow explicit BEGIN/COMMIT statements.
-            # Keep this file as plain sequential SQL statements.
-
-            # Clear only this calendar data to avoid duplicates/stale rows (keep other semesters).
-            f.write(f"DELETE FROM teacher WHERE teachingClassId IN (SELECT id FROM coursedetail WHERE calendarId = {cid});\n")
-            f.write(f"DELETE FROM majorandcourse WHERE courseId IN (SELECT id FROM coursedetail WHERE calendarId = {cid});\n")
-            f.write(f"DELETE FROM coursedetail WHERE calendarId = {cid};\n")
-            f.write(f"DELETE FROM calendar WHERE calendarId = {cid};\n")
-            f.write(f"DELETE FROM coursenature_by_calendar WHERE calendarId = {cid};\n")
-
-            inserted = 0
-            for course in courses:
-                if not isinstance(course, dict):
-                    continue
-
-                calendar_i18n = str(course.get("calendarIdI18n") or "").strip() or None
-                f.write(
-                    f"INSERT OR REPLACE INTO calendar (calendarId, calendarIdI18n) VALUES ({cid}, {sql_quote(calendar_i18n)});\n"
-                )
-
-                teaching_language = str(course.get("teachingLanguage") or "").strip() or None
-                teaching_language_i18n = str(course.get("teachingLanguageI18n") or "").strip() or None
-                if teaching_language and teaching_language not in seen_language:
-                    seen_language.add(teaching_language)
-                    f.write(
-                        "INSERT INTO language (teachingLanguage, teachingLanguageI18n, calendarId) "
-                        f"VALUES ({sql_quote(teaching_language)}, {sql_quote(teaching_language_i18n)}, {cid}) "
-                        "ON CONFLICT(teachingLanguage) DO UPDATE SET "
-                        "teachingLanguageI18n=excluded.teachingLanguageI18n, calendarId=excluded.calendarId;\n"
-                    )
-
-                course_label_id = course.get("courseLabelId")
+            if standalone:
+                stage.write_sql(f)
+            if generated is not None:
+                generated.write(f)
+            else:
+                write_calendar_statements(f, statements)
+        info = {"calendarId": cid, "file": str(file_path), "teachingClassInserted": inserted}
+        if generated is not None:
+            info["slices"] = generated.slices
+        if not standalone:
+            # Kept for the local D1 load (after the run's dimension rows, one transaction) and the checksums.
+            calendar_groups.append(statements)
+        elif local_d1 is not None:
+            info["localD1"] = apply_local(local_d1, [stage.statements(), statements], analyze=not args.no_analyze)
+        # Baseline of the next --refresh run, once applied (here only for a standalone local D1 load;
+        # the run's local load commits it below, otherwise --commit-snapshot does).
+        save_snapshot(out_dir, cid, volatile_rows(courses), pending=not (standalone and local_d1 is not None))
+        if archive is not None:
+            info["archive"] = archive.add_calendar(cid, courses, raw_bytes=raw_bytes)
+        if shard_writer is not None:
+            # Major ids decide which major isExclusive refers to; without a local D1 it is left to the route.
+            known = None
+            if local_d1 is not None:
+                conn = sqlite3.connect(f"file:{local_d1}?mode=ro", uri=True)
                 try:
-                    course_label_id_i = int(course_label_id) if course_label_id is not None else None
-                except Exception:
-                    course_label_id_i = None
-                course_label_name = str(course.get("courseLabelName") or "").strip() or None
-                if course_label_id_i is not None and course_label_id_i not in seen_course_nature:
-                    seen_course_nature.add(course_label_id_i)
-                    f.write(
-                        "INSERT INTO coursenature_by_calendar (calendarId, courseLabelId, courseLabelName) "
-                        f"VALUES ({cid}, {course_label_id_i}, {sql_quote(course_label_name)}) "
-                        "ON CONFLICT(calendarId, courseLabelId) DO UPDATE SET "
-                        "courseLabelName=excluded.courseLabelName;\n"
-                    )
-
-                assessment_mode = str(course.get("assessmentMode") or "").strip() or None
-                assessment_mode_i18n = str(course.get("assessmentModeI18n") or "").strip() or None
-                if assessment_mode and assessment_mode not in seen_assessment:
-                    seen_assessment.add(assessment_mode)
-                    f.write(
-                        "INSERT INTO assessment (assessmentMode, assessmentModeI18n, calendarId) "
-                        f"VALUES ({sql_quote(assessment_mode)}, {sql_quote(assessment_mode_i18n)}, {cid}) "
-                        "ON CONFLICT(assessmentMode) DO UPDATE SET "
-                        "assessmentModeI18n=excluded.assessmentModeI18n, calendarId=excluded.calendarId;\n"
-                    )
-
-                campus = str(course.get("campus") or "").strip() or None
-                campus_i18n = str(course.get("campusI18n") or "").strip() or None
-                if campus and campus not in seen_campus:
-                    seen_campus.add(campus)
-                    f.write(
-                        "INSERT INTO campus (campus, campusI18n, calendarId) "
-                        f"VALUES ({sql_quote(campus)}, {sql_quote(campus_i18n)}, {cid}) "
-                        "ON CONFLICT(campus) DO UPDATE SET "
-                        "campusI18n=excluded.campusI18n, calendarId=excluded.calendarId;\n"
-                    )
-
-                faculty = str(course.get("faculty") or "").strip() or None
-                faculty_i18n = str(course.get("facultyI18n") or "").strip() or None
-                if faculty and faculty not in seen_faculty:
-                    seen_faculty.add(faculty)
-                    f.write(
-                        "INSERT INTO faculty (faculty, facultyI18n, calendarId) "
-                        f"VALUES ({sql_quote(faculty)}, {sql_quote(faculty_i18n)}, {cid}) "
-                        "ON CONFLICT(faculty) DO UPDATE SET "
-                        "facultyI18n=excluded.facultyI18n, calendarId=excluded.calendarId;\n"
-                    )
-
-                majors = course.get("majorList") or []
-                if isinstance(majors, list):
-                    for mj in majors:
-                        mj_name = str(mj or "").strip()
-                        if not mj_name or mj_name in seen_major:
-                            continue
-                        seen_major.add(mj_name)
-                        parsed = parse_major_string(mj_name)
-                        f.write(
-                            "INSERT INTO major (code, grade, name, calendarId) "
-                            f"VALUES ({sql_quote(parsed['code'])}, {sql_quote(parsed['grade'])}, {sql_quote(parsed['name'])}, {cid}) "
-                            "ON CONFLICT(name) DO UPDATE SET "
-                            "code=excluded.code, grade=excluded.grade, calendarId=excluded.calendarId;\n"
-                        )
-
-                teaching_class_id = course.get("id")
-                try:
-                    teaching_class_id_i = int(teaching_class_id) if teaching_class_id is not None else None
-                except Exception:
-                    teaching_class_id_i = None
-                if teaching_class_id_i is None:
-                    continue
-
-                new_course_code, new_code = compute_new_code(course)
-
-                f.write(
-                    "INSERT OR REPLACE INTO coursedetail "
-                    "(id, code, name, courseLabelId, assessmentMode, period, weekHour, campus, number, elcNumber, startWeek, endWeek, "
-                    "courseCode, courseName, credit, teachingLanguage, faculty, calendarId, newCourseCode, newCode) VALUES ("
-                    f"{teaching_class_id_i}, "
-                    f"{sql_quote(str(course.get('code') or '').strip() or None)}, "
-                    f"{sql_quote(str(course.get('name') or '').strip() or None)}, "
-                    f"{sql_quote(course_label_id_i)}, "
-                    f"{sql_quote(assessment_mode)}, "
-                    f"{sql_quote(course.get('period'))}, "
-                    f"{sql_quote(course.get('weekHour'))}, "
-                    f"{sql_quote(campus)}, "
-                    f"{sql_quote(course.get('number'))}, "
-                    f"{sql_quote(course.get('elcNumber'))}, "
-                    f"{sql_quote(course.get('startWeek'))}, "
-                    f"{sql_quote(course.get('endWeek'))}, "
-                    f"{sql_quote(str(course.get('courseCode') or '').strip() or None)}, "
-                    f"{sql_quote(str(course.get('courseName') or '').strip() or None)}, "
-                    f"{sql_quote(course.get('credits'))}, "
-                    f"{sql_quote(teaching_language)}, "
-                    f"{sql_quote(faculty)}, "
-                    f"{cid}, "
-                    f"{sql_quote(new_course_code)}, "
-                    f"{sql_quote(new_code)}"
-                    ");\n"
+                    known = known_majors(conn)
+                finally:
+                    conn.close()
+            info["shards"] = shard_writer.write_calendar(cid, build_calendar_shards(cid, courses, known))
+            shard_writer.save()
+        info["elapsedSec"] = int(time.time() - t0)
+        return info
+
+    def refresh_calendar(cid: int, courses: list):
+        t0 = time.time()
+        current = volatile_rows(courses)
+        if args.refresh_all:
+            baseline, baseline_source = None, "none"
+        elif local_d1 is not None:
+            # The local copy is the applied state itself, so the diff is exact.
+            conn = sqlite3.connect(f"file:{local_d1}?mode=ro", uri=True)
+            try:
+                baseline, baseline_source = local_rows(conn, cid), "local-d1"
+            finally:
+                conn.close()
+        else:
+            baseline = load_snapshot(out_dir, cid)
+            baseline_source = "snapshot" if baseline is not None else "none"
+        diff = diff_rows(current, baseline)
+        statements = refresh_statements(cid, current, diff["changed"])
+        file_path = out_dir / REFRESH_FILE.format(cid=cid)
+        with file_path.open("w", encoding="utf-8", newline="\n") as f:
+            f.write("-- generated by pk-login-and-export-sql.py --refresh (coursedetail volatile columns only)\n")
+            write_statements(f, statements)
+        info = {
+            "calendarId": cid,
+            "file": str(file_path),
+            "baseline": baseline_source,
+            "changed": len(diff["changed"]),
+            "added": len(diff["added"]),
+            "removed": len(diff["removed"]),
+        }
+        if local_d1 is not None:
+            info["localD1"] = apply_local(local_d1, [statements], analyze=False)
+        save_snapshot(out_dir, cid, current, pending=local_d1 is None)
+        info["elapsedSec"] = int(time.time() - t0)
+        return info
+
+    if args.refresh:
+        summary["mode"] = "refresh"
+        for cid in calendar_ids:
+            courses = fetch_calendar_courses(session, cid, args.page_size)
+            try:
+                info = refresh_calendar(cid, courses)
+            except LocalSchemaError as e:
+                print(str(e))
+                return 1
+            print(
+                f"calendarId={cid} refresh changed={info['changed']} baseline={info['baseline']} "
+                f"elapsed={info['elapsedSec']}s file={info['file']}"
+            )
+            if info["added"] or info["removed"]:
+                # New or dropped classes touch teachers, arrangements and majors: only a full export covers them.
+                print(
+                    f"[refresh] calendarId={cid}: {info['added']} classes added, {info['removed']} removed since the baseline; "
+                    "run a full export (without --refresh)"
                 )
+            summary["files"].append(info)
+        if local_d1 is None:
+            print("[refresh] after applying the pk-refresh files, run again with --commit-snapshot to advance the refresh baseline")
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0
 
-                arrange_info = str(course.get("arrangeInfo") or "").strip() or None
-                teachers = course.get("teacherList") or []
-                if isinstance(teachers, list):
-                    for t in teachers:
-                        if not isinstance(t, dict):
-                            continue
-                        tid = t.get("id")
-                        try:
-                            tid_i = int(tid) if tid is not None else None
-                        except Exception:
-                            tid_i = None
-                        if tid_i is None:
-                            continue
-                        f.write(
-                            "INSERT OR REPLACE INTO teacher (id, teachingClassId, teacherCode, teacherName, arrangeInfoText) VALUES ("
-                            f"{tid_i}, {teaching_class_id_i}, "
-                            f"{sql_quote(str(t.get('teacherCode') or '').strip() or None)}, "
-                            f"{sql_quote(str(t.get('teacherName') or '').strip() or None)}, "
-                            f"{sql_quote(arrange_info)}"
-                            ");\n"
-                        )
-
-                if isinstance(majors, list):
-                    for mj in majors:
-                        mj_name = str(mj or "").strip()
-                        if not mj_name:
-                            continue
-                        f.write(
-                            "INSERT OR IGNORE INTO majorandcourse (majorId, courseId) VALUES ("
-                            f"(SELECT id FROM major WHERE name = {sql_quote(mj_name)}), {teaching_class_id_i}"
-                            ");\n"
-                        )
-
-                inserted += 1
-
-            f.write(
-                "INSERT INTO fetchlog (fetchTime, msg) VALUES "
-                f"({int(time.time())}, {sql_quote(f'sync calendarId={cid} via action')});\n"
+    # The pool's workers and fragment directory go away however the run ends (daemon stop, fetch errors).
+    try:
+        if args.daemon:
+            daemon = SyncDaemon(
+                login=loginout.login,
+                export=lambda cid, courses, raw_bytes: export_calendar(cid, courses, source="daemon", standalone=True, raw_bytes=raw_bytes),
+                calendar_ids=calendar_ids,
+                page_size=args.page_size,
+                poll_interval=args.poll_interval,
+                keepalive_interval=args.keepalive_interval,
+                probe_page_size=args.probe_page_size,
+                full_every=args.full_every,
+                status_path=(repo_root / "backend" / args.status_file).resolve() if args.status_file else out_dir / "daemon-status.json",
+                on_change=args.on_change,
             )
-            # end
-
-        elapsed = int(time.time() - t0)
-        print(f"calendarId={cid} teachingClassInserted={inserted} elapsed={elapsed}s file={file_path}")
-        summary["files"].append({"calendarId": cid, "file": str(file_path), "teachingClassInserted": inserted, "elapsedSec": elapsed})
+            daemon.session = session
+            return run_daemon(daemon, status_port=args.status_port)
+
+        dimensions = DimensionStage()
+        for cid in calendar_ids:
+            t0 = time.time()
+            fetch_stats = {}
+            courses = fetch_calendar_courses(session, cid, args.page_size, stats=fetch_stats)
+            info = export_calendar(cid, courses, dimensions=dimensions, raw_bytes=fetch_stats.get("rawBytes"))
+            info["elapsedSec"] = int(time.time() - t0)
+            print(f"calendarId={cid} teachingClassInserted={info['teachingClassInserted']} elapsed={info['elapsedSec']}s file={info['file']}")
+            summary["files"].append(info)
+    finally:
+        if generator is not None:
+            generator.close()
+
+    # Shared dimension rows for every calendar of this run; the file name sorts before pk-sync-<cid>.sql
+    # so it is applied first (majorandcourse rows look up major ids by name).
+    dimensions_path = out_dir / DIMENSIONS_FILE
+    with dimensions_path.open("w", encoding="utf-8", newline="\n") as f:
+        f.write("-- generated by pk-login-and-export-sql.py (shared dimensions)\n")
+        dimensions.write_sql(f)
+    summary["dimensionsFile"] = str(dimensions_path)
+    summary["dimensions"] = dimensions.counts()
+    print(f"dimensions={summary['dimensions']} file={dimensions_path}")
+
+    # Merkle checksums of exactly what the files write; pk-reconcile.py compares them with D1.
+    expected = expected_db([dimensions.statements(), *calendar_groups])
+    try:
+        tree = checksum_tree(expected, key_ranges(expected, calendar_ids))
+    finally:
+        expected.close()
+    checksums_path = out_dir / CHECKSUMS_FILE
+    checksums_path.write_text(json.dumps(tree, ensure_ascii=False), encoding="utf-8")
+    summary["checksums"] = {"file": str(checksums_path), "root": tree["root"]}
+    print(f"checksums root={tree['root']} file={checksums_path}")
+
+    if local_d1 is not None:
+        try:
+            summary["localD1"] = apply_local(local_d1, [dimensions.statements(), *calendar_groups], analyze=not args.no_analyze)
+        except LocalSchemaError as e:
+            print(str(e))
+            return 1
+        print(f"local D1 rowsChanged={summary['localD1']['rowsChanged']} elapsed={summary['localD1']['elapsedSec']}s db={local_d1}")
+        commit_snapshots(out_dir, calendar_ids)
 
     # Print a machine-readable summary for workflow parsing
-    import json
-
     print(json.dumps(summary, ensure_ascii=False))
     return 0
 
@@ -10,7 +10,7 @@ except Exception as e:
     print("Missing python dependency: requests")
     print(str(e))
     print("Install:")
-    print("  python -m pip install requests")
+    print("  python -m pip install -r scripts/requirements.txt  (from backend/, or: npm run pk:deps)")
     raise SystemExit(1)
 
 
@@ -78,8 +78,7 @@ def main() -> int:
         print(str(e))
         print("You may need to install python deps used by pk crawler (requests, pycryptodome, etc).")
         print("Install:")
-        print("  python -m pip install pycryptodome")
-        print("  python -m pip install beautifulsoup4")
+        print("  python -m pip install -r scripts/requirements.txt  (from backend/, or: npm run pk:deps)")
         return 1
 
     session = loginout.login()
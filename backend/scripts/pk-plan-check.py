@@ -0,0 +1,132 @@
+import argparse
+import io
+import json
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from pk_export.cost import iter_statements, load_schema
+from pk_export.dimensions import DimensionStage
+from pk_export.plans import PlanChecker, compare_baseline, migration_sql
+from pk_export.sqlgen import write_calendar_sql
+from pk_export.synth import synthetic_courses
+
+
+def load_synthetic(conn: sqlite3.Connection, calendars: int, classes: int, seed: int, latest: int):
+    stage = DimensionStage()
+    files = []
+    for cid in range(latest - calendars + 1, latest + 1):
+        courses = synthetic_courses(cid, classes=classes, seed=seed)
+        stage.add_courses(cid, courses)
+        buf = io.StringIO()
+        write_calendar_sql(buf, cid, courses, source="synthetic")
+        files.append(buf.getvalue())
+    buf = io.StringIO()
+    stage.write_sql(buf)
+    for text in [buf.getvalue(), *files]:
+        conn.executescript(text)
+
+
+def load_sql_files(conn: sqlite3.Connection, files):
+    for path in files:
+        for sql in iter_statements(pathlib.Path(path).read_text(encoding="utf-8")):
+            conn.execute(sql)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check query plans of pk route SQL and exporter DELETEs, flag scans/temp B-trees and propose indexes."
+    )
+    parser.add_argument("--db", default="", help="SQLite database with pk data (a copy is used; pk migrations are applied on top)")
+    parser.add_argument("--sql-dir", default="", help="Load exporter output pk-sync-*.sql from this directory into a fresh pk schema")
+    parser.add_argument("--synthetic-calendars", type=int, default=3, help="Synthetic calendars to generate when neither --db nor --sql-dir is given")
+    parser.add_argument("--synthetic-classes", type=int, default=3000, help="Teaching classes per synthetic calendar")
+    parser.add_argument("--seed", type=int, default=1, help="Synthetic data seed")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed executions per query (median is reported)")
+    parser.add_argument("--analyze", action="store_true", help="Run ANALYZE before planning (D1 does not by default)")
+    parser.add_argument(
+        "--baseline",
+        default=str(pathlib.Path(__file__).resolve().parent / "pk-plan-baseline.json"),
+        help="Baseline report; new plan flags versus it fail the check",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0, help="Also fail when a query is this many times slower than baseline (0 = off)")
+    parser.add_argument("--report", default="", help="Write the full JSON report here")
+    parser.add_argument("--emit-migration", default="", help="Write proposed indexes as a migration SQL file")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory(prefix="pk-plan-")
+    db_path = pathlib.Path(tmp.name) / "pk.sqlite"
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode = MEMORY")  # savepoints need a rollback journal
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        load_schema(conn)
+        if args.sql_dir:
+            load_sql_files(conn, sorted(pathlib.Path(args.sql_dir).glob("pk-sync-*.sql")))
+            source = f"sql:{args.sql_dir}"
+        elif args.db:
+            source = f"db:{args.db}"
+        else:
+            load_synthetic(conn, args.synthetic_calendars, args.synthetic_classes, args.seed, latest=121)
+            source = f"synthetic:{args.synthetic_calendars}x{args.synthetic_classes}:seed={args.seed}"
+        conn.commit()
+        if args.analyze:
+            conn.execute("ANALYZE")
+
+        checker = PlanChecker(conn, repeat=args.repeat)
+        report = checker.run()
+        report["source"] = source
+        proposals = checker.advise(report)
+        report["proposals"] = proposals
+    finally:
+        conn.close()
+        tmp.cleanup()
+
+    baseline_path = pathlib.Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.update_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        regressions = compare_baseline(report, baseline, max_slowdown=args.max_slowdown)
+    report["regressions"] = regressions
+
+    for name, q in report["queries"].items():
+        flags = ", ".join(q["flags"]) or "-"
+        print(f"{name:<36} {q['ms']:>9.3f}ms  {flags}")
+    for p in proposals:
+        print(f"[advise] {p['index']} ON {p['table']}({', '.join(p['columns'])}) <- {', '.join(q['name'] for q in p['queries'])}")
+    for r in regressions:
+        print(f"[regression] {r}")
+
+    if args.report:
+        pathlib.Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.emit_migration and proposals:
+        pathlib.Path(args.emit_migration).write_text(migration_sql(proposals), encoding="utf-8")
+    if args.update_baseline:
+        baseline = {
+            "source": source,
+            "queries": {name: {"flags": q["flags"], "plan": q["plan"], "ms": q["ms"]} for name, q in report["queries"].items()},
+        }
+        baseline_path.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    print(
+        json.dumps(
+            {
+                "source": source,
+                "queries": len(report["queries"]),
+                "flagged": sum(1 for q in report["queries"].values() if q["flags"]),
+                "proposals": len(proposals),
+                "regressions": len(regressions),
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import argparse
+import json
+import pathlib
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+from pk_export.checksums import (
+    build_tree,
+    checksum_query,
+    checksum_tree,
+    compare_trees,
+    fix_statements,
+    key_ranges,
+)
+from pk_export.cost import CALENDAR_FILE_RE, iter_statements, load_schema
+from pk_export.sqlgen import write_statements
+
+
+def expected_from_sql(files) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    load_schema(conn)
+    for path in files:
+        for sql in iter_statements(pathlib.Path(path).read_text(encoding="utf-8")):
+            conn.execute(sql)
+    conn.commit()
+    return conn
+
+
+def d1_leaves(database: str, sql: str, remote: bool) -> list:
+    cmd = [shutil.which("npx") or "npx", "wrangler", "d1", "execute", database, "--remote" if remote else "--local", "--json", "--command", sql]
+    res = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
+    if res.returncode != 0:
+        raise RuntimeError(f"wrangler d1 execute failed ({res.returncode}): {res.stderr.strip() or res.stdout.strip()}")
+    results = json.loads(res.stdout)[0]["results"]
+    return [(r["tbl"], r["calendarId"], r["bucket"], r["n"], r["fp"]) for r in results]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare Merkle checksums of exported pk SQL with D1 (or a local copy) and re-emit only divergent id ranges."
+    )
+    parser.add_argument("--sql-dir", default=".tmp/pk-sync", help="Exporter output with pk-sync-*.sql (relative to backend/)")
+    parser.add_argument(
+        "--expected",
+        default="",
+        help="Use this checksums.json instead of rebuilding from --sql-dir (compare only; --emit-fix needs the SQL files)",
+    )
+    parser.add_argument("--db", default="", help="Compare with this SQLite file (e.g. the local D1 state)")
+    parser.add_argument("--d1", default="", help="Compare with this D1 database through wrangler, e.g. jcourse-db")
+    parser.add_argument("--local", action="store_true", help="With --d1: query the local wrangler state instead of --remote")
+    parser.add_argument("--report", default="", help="Report JSON path (default: <sql-dir>/reconcile-report.json)")
+    parser.add_argument("--emit-fix", default="", help="Write D1 SQL re-emitting only the divergent ranges here")
+    parser.add_argument("--strict", action="store_true", help="Also fail on dimension-table divergence (may be rows left by older runs)")
+    args = parser.parse_args()
+
+    if bool(args.db) == bool(args.d1):
+        print("Pass exactly one of --db or --d1")
+        return 1
+
+    sql_dir = pathlib.Path(args.sql_dir)
+    expected_conn = None
+    if args.expected:
+        expected = json.loads(pathlib.Path(args.expected).read_text(encoding="utf-8"))
+    else:
+        files = sorted(sql_dir.glob("pk-sync-*.sql"))
+        calendar_ids = sorted(int(m.group(1)) for m in (CALENDAR_FILE_RE.search(f.name) for f in files) if m)
+        if not calendar_ids:
+            print(f"No pk-sync-<calendarId>.sql files in {sql_dir}")
+            return 1
+        expected_conn = expected_from_sql(files)
+        expected = checksum_tree(expected_conn, key_ranges(expected_conn, calendar_ids))
+    if args.emit_fix and expected_conn is None:
+        print("--emit-fix needs the exported SQL files (drop --expected)")
+        return 1
+
+    sql = checksum_query(expected["ranges"])
+    if args.db:
+        conn = sqlite3.connect(f"file:{pathlib.Path(args.db).resolve()}?mode=ro", uri=True)
+        try:
+            leaves = conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+        target = args.db
+    else:
+        try:
+            leaves = d1_leaves(args.d1, sql, remote=not args.local)
+        except (RuntimeError, ValueError, KeyError, IndexError) as e:
+            print(str(e))
+            return 1
+        target = f"d1:{args.d1}:{'local' if args.local else 'remote'}"
+    actual = build_tree(leaves, expected["ranges"])
+
+    divergences = compare_trees(expected, actual)
+    failing = [d for d in divergences if args.strict or d["kind"] != "dimension"]
+    report = {
+        "target": target,
+        "expectedRoot": expected["root"],
+        "actualRoot": actual["root"],
+        "divergences": divergences,
+        "expected": expected,
+        "actual": actual,
+    }
+    if args.emit_fix and divergences:
+        fix_path = pathlib.Path(args.emit_fix)
+        fix_path.parent.mkdir(parents=True, exist_ok=True)
+        with fix_path.open("w", encoding="utf-8", newline="\n") as f:
+            f.write("-- generated by pk-reconcile.py: re-emits only divergent ranges\n")
+            write_statements(f, fix_statements(expected_conn, divergences))
+        report["fixFile"] = str(fix_path)
+    if expected_conn is not None:
+        expected_conn.close()
+
+    report_path = pathlib.Path(args.report) if args.report else sql_dir / "reconcile-report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for d in divergences:
+        rng = "all" if d["range"] is None else f"[{d['range'][0]}, {d['range'][1]}]"
+        print(
+            f"[diverge] calendar={d['calendarId']} {d['table']:<26} ids={rng} "
+            f"rows expected={d['expected']['rows']} actual={d['actual']['rows']}"
+        )
+    print(
+        json.dumps(
+            {
+                "target": target,
+                "expectedRoot": expected["root"],
+                "actualRoot": actual["root"],
+                "divergences": len(divergences),
+                "failing": len(failing),
+                "report": str(report_path),
+                "fixFile": report.get("fixFile"),
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 2 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import pathlib
+import sqlite3
+import time
+
+from .common import norm_str
+from .decode import STRING_FIELDS, VALUE_FIELDS
+
+RECORD_COLUMNS = STRING_FIELDS + VALUE_FIELDS + ("majors", "teachers")
+
+ARCHIVE_SCHEMA = f"""
+-- values are unique by construction (CourseArchive keeps the value -> id map in memory); no index on value,
+-- which would store every string a second time
+CREATE TABLE IF NOT EXISTS dictionary (
+  id INTEGER PRIMARY KEY,
+  value NOT NULL
+);
+
+-- one row per distinct teaching-class record; ids and the calendar name live in sections/calendars
+CREATE TABLE IF NOT EXISTS records (
+  id INTEGER PRIMARY KEY,
+  digest BLOB UNIQUE NOT NULL,
+  {", ".join(f"{name} INTEGER" for name in STRING_FIELDS)},
+  {", ".join(VALUE_FIELDS)},
+  majors TEXT,
+  teachers TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_records_courseCode ON records(courseCode);
+
+CREATE TABLE IF NOT EXISTS calendars (
+  calendarId INTEGER PRIMARY KEY,
+  calendarIdI18n TEXT,
+  archivedAt INTEGER,
+  classes INTEGER,
+  rawBytes INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS sections (
+  calendarId INTEGER NOT NULL,
+  ord INTEGER NOT NULL,
+  teachingClassId,
+  recordId INTEGER NOT NULL,
+  PRIMARY KEY (calendarId, ord)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sections_recordId ON sections(recordId);
+"""
+
+
+class CourseArchive:
+    """Local multi-semester archive of crawled manualArrange records (SQLite, one file).
+
+    Records identical across semesters apart from the teaching class id are stored once and
+    referenced from each calendar's sections; string columns go through a shared dictionary.
+    ``courses(cid)`` gives back page-record dicts that export the same SQL/shards as the crawl.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(ARCHIVE_SCHEMA)
+        self._ids = None
+        self._values = None
+
+    def close(self):
+        self.conn.close()
+
+    def _sid(self, value):
+        if value is None:
+            return None
+        if not isinstance(value, (str, int, float)):
+            value = str(value)
+        if self._ids is None:
+            self._ids = {(type(v), v): i for i, v in self.conn.execute("SELECT id, value FROM dictionary")}
+        key = (type(value), value)
+        sid = self._ids.get(key)
+        if sid is None:
+            sid = self.conn.execute("INSERT INTO dictionary (value) VALUES (?)", (value,)).lastrowid
+            self._ids[key] = sid
+            if self._values is not None:
+                self._values[sid] = value
+        return sid
+
+    def _value(self, sid):
+        if self._values is None:
+            self._values = dict(self.conn.execute("SELECT id, value FROM dictionary"))
+        return self._values.get(sid)
+
+    def _encode(self, course: dict) -> tuple:
+        majors = course.get("majorList")
+        teachers = course.get("teacherList")
+        return (
+            *(self._sid(course.get(name)) for name in STRING_FIELDS),
+            *(course.get(name) for name in VALUE_FIELDS),
+            json.dumps([self._sid(m) for m in majors], separators=(",", ":")) if isinstance(majors, list) else None,
+            json.dumps(
+                [[t.get("id"), self._sid(t.get("teacherCode")), self._sid(t.get("teacherName"))] for t in teachers if isinstance(t, dict)],
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            if isinstance(teachers, list)
+            else None,
+        )
+
+    def _decode(self, row) -> dict:
+        n = len(STRING_FIELDS)
+        course = {name: self._value(sid) for name, sid in zip(STRING_FIELDS, row[:n])}
+        course.update(zip(VALUE_FIELDS, row[n : n + len(VALUE_FIELDS)]))
+        majors, teachers = row[-2:]
+        course["majorList"] = [self._value(sid) for sid in json.loads(majors)] if majors is not None else None
+        course["teacherList"] = (
+            [{"id": tid, "teacherCode": self._value(code), "teacherName": self._value(name)} for tid, code, name in json.loads(teachers)]
+            if teachers is not None
+            else None
+        )
+        return course
+
+    def add_calendar(self, cid: int, courses: list, raw_bytes: int = None) -> dict:
+        """Replace calendar ``cid`` in the archive with freshly crawled page records.
+
+        ``raw_bytes`` is the size of the crawled page responses (fetch_calendar_courses stats), the
+        baseline of stats()["sizeRatio"]; it is stored as NULL when not measured.
+        """
+        courses = [c for c in courses if isinstance(c, dict)]
+        calendar_i18n = next((norm_str(c.get("calendarIdI18n")) for c in courses if norm_str(c.get("calendarIdI18n"))), None)
+        new_records = 0
+        sections = []
+        try:
+            self.conn.execute("DELETE FROM sections WHERE calendarId = ?", (cid,))
+            for ord_, course in enumerate(courses):
+                row = self._encode(course)
+                digest = hashlib.sha1(json.dumps(row, ensure_ascii=False).encode("utf-8")).digest()
+                cur = self.conn.execute(
+                    f"INSERT OR IGNORE INTO records (digest, {', '.join(RECORD_COLUMNS)}) VALUES (?{', ?' * len(RECORD_COLUMNS)})",
+                    (digest, *row),
+                )
+                if cur.rowcount:
+                    record_id = cur.lastrowid
+                    new_records += 1
+                else:
+                    record_id = self.conn.execute("SELECT id FROM records WHERE digest = ?", (digest,)).fetchone()[0]
+                sections.append((cid, ord_, course.get("id"), record_id))
+            self.conn.executemany("INSERT INTO sections (calendarId, ord, teachingClassId, recordId) VALUES (?, ?, ?, ?)", sections)
+            # records only the replaced sections pointed at
+            self.conn.execute("DELETE FROM records WHERE id NOT IN (SELECT recordId FROM sections)")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO calendars (calendarId, calendarIdI18n, archivedAt, classes, rawBytes) VALUES (?, ?, ?, ?, ?)",
+                (cid, calendar_i18n, int(time.time()), len(sections), raw_bytes),
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._ids = None
+            self._values = None
+            raise
+        return {"calendarId": cid, "classes": len(sections), "newRecords": new_records, "reusedRecords": len(sections) - new_records}
+
+    def calendar_ids(self) -> list:
+        return [cid for (cid,) in self.conn.execute("SELECT calendarId FROM calendars ORDER BY calendarId")]
+
+    def courses(self, cid: int) -> list:
+        """Page-record dicts of one archived calendar, in crawl order."""
+        calendar = self.conn.execute("SELECT calendarIdI18n FROM calendars WHERE calendarId = ?", (cid,)).fetchone()
+        if calendar is None:
+            raise KeyError(f"calendar {cid} is not archived")
+        out = []
+        for row in self.conn.execute(
+            f"SELECT s.teachingClassId, {', '.join('r.' + c for c in RECORD_COLUMNS)} "
+            "FROM sections s JOIN records r ON r.id = s.recordId WHERE s.calendarId = ? ORDER BY s.ord",
+            (cid,),
+        ):
+            course = {"id": row[0], **self._decode(row[1:]), "calendarIdI18n": calendar[0]}
+            out.append(course)
+        return out
+
+    def sections(self, course_code: str, last: int = 0) -> list:
+        """Every archived section of ``course_code`` (newest calendar first), optionally only the last N calendars."""
+        sid = self.conn.execute(
+            "SELECT id FROM dictionary WHERE id IN (SELECT DISTINCT courseCode FROM records) AND value = ?", (str(course_code),)
+        ).fetchone()
+        if sid is None:
+            return []
+        sql = (
+            f"SELECT s.calendarId, c.calendarIdI18n, s.teachingClassId, {', '.join('r.' + col for col in RECORD_COLUMNS)} "
+            "FROM records r JOIN sections s ON s.recordId = r.id JOIN calendars c ON c.calendarId = s.calendarId "
+            "WHERE r.courseCode = ?"
+        )
+        params = [sid[0]]
+        if last > 0:
+            sql += " AND s.calendarId IN (SELECT calendarId FROM calendars ORDER BY calendarId DESC LIMIT ?)"
+            params.append(last)
+        sql += " ORDER BY s.calendarId DESC, s.ord"
+        return [
+            {"calendarId": row[0], "calendarIdI18n": row[1], "id": row[2], **self._decode(row[3:])}
+            for row in self.conn.execute(sql, params)
+        ]
+
+    def _count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = self.conn.execute("PRAGMA page_count").fetchone()[0] - self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        raw = self.conn.execute("SELECT COALESCE(SUM(rawBytes), 0) FROM calendars").fetchone()[0]
+        sections = self._count("sections")
+        records = self._count("records")
+        return {
+            "calendars": self.calendar_ids(),
+            "sections": sections,
+            "records": records,
+            "dictionary": self._count("dictionary"),
+            "dedupRatio": round(sections / records, 3) if records else 0,
+            "rawBytes": raw,
+            "archiveBytes": pages * page_size,
+            "sizeRatio": round(pages * page_size / raw, 4) if raw else 0,
+        }
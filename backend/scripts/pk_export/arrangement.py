@@ -0,0 +1,159 @@
+import re
+
+DAY_MAP = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "日": 7, "天": 7}
+
+SLOT_RE = re.compile(r"星期([一二三四五六日天])\s*([0-9]{1,2})\s*-\s*([0-9]{1,2})\s*节?")
+WEEK_RE = re.compile(r"\[([^\]]+)\]")
+WEEK_RANGE_RE = re.compile(r"^([0-9]{1,2})(?:-([0-9]{1,2}))?$")
+
+# odd/even flags stored in arrangement.oddEven
+WEEKS_ALL = 0
+WEEKS_ODD = 1
+WEEKS_EVEN = 2
+
+
+def parse_weeks(text: str):
+    """Week text -> (bitmask with bit w-1 set for week w, oddEven flag).
+
+    Examples: "1-16", "1-15周(单)", "2-14周(双) 15-16".
+    """
+    mask = 0
+    parities = set()
+    for part0 in str(text or "").split():
+        part = part0.replace("周", "")
+        parity = WEEKS_ODD if "单" in part else WEEKS_EVEN if "双" in part else WEEKS_ALL
+        cleaned = re.sub(r"[()（）单双]", "", part).strip()
+        m = WEEK_RANGE_RE.match(cleaned)
+        if not m:
+            continue
+        a = int(m.group(1))
+        b = int(m.group(2)) if m.group(2) else a
+        if a <= 0 or b < a:
+            continue
+        step = 2 if parity else 1
+        start = a
+        if parity == WEEKS_ODD and start % 2 == 0:
+            start += 1
+        if parity == WEEKS_EVEN and start % 2 == 1:
+            start += 1
+        for w in range(start, b + 1, step):
+            mask |= 1 << (w - 1)
+        parities.add(parity)
+
+    odd_even = parities.pop() if len(parities) == 1 else WEEKS_ALL
+    return mask, odd_even
+
+
+def split_room(text: str):
+    # "四平路校区 A101" -> ("四平路校区", "A101"); no campus prefix -> (None, text)
+    rest = str(text or "").strip()
+    if not rest:
+        return None, None
+    head, _, tail = rest.partition(" ")
+    if head.endswith("校区"):
+        return head, tail.strip() or None
+    return None, rest
+
+
+def parse_arrange_line(line: str):
+    m = SLOT_RE.search(line or "")
+    if not m:
+        return None
+    start = int(m.group(2))
+    end = int(m.group(3))
+    if start <= 0 or end < start:
+        return None
+
+    tail = line[m.end():]
+    week_mask, odd_even = 0, WEEKS_ALL
+    wm = WEEK_RE.search(tail)
+    if wm:
+        week_mask, odd_even = parse_weeks(wm.group(1))
+        tail = tail[wm.end():]
+    campus, room = split_room(tail)
+
+    return {
+        "weekday": DAY_MAP[m.group(1)],
+        "startPeriod": start,
+        "endPeriod": end,
+        "weekMask": week_mask,
+        "oddEven": odd_even,
+        "room": room,
+        "campus": campus,
+    }
+
+
+def parse_arrange_info(text: str):
+    """Parse a teaching class's arrangeInfo into unique slots (teacher prefixes are dropped).
+
+    Co-taught classes repeat the same slot once per teacher, so slots are deduplicated and
+    returned in (weekday, startPeriod) order.
+    """
+    seen = set()
+    out = []
+    for line in str(text or "").split("\n"):
+        slot = parse_arrange_line(line.strip())
+        if slot is None:
+            continue
+        key = (slot["weekday"], slot["startPeriod"], slot["endPeriod"], slot["weekMask"], slot["room"], slot["campus"])
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(slot)
+    out.sort(key=lambda s: (s["weekday"], s["startPeriod"], s["endPeriod"], s["weekMask"]))
+    return out
+
+
+TEXT_DAY_RE = re.compile(r"^星期([一二三四五六日])")
+TEXT_TIME_RE = re.compile(r"^星期[一二三四五六日]([0-9]{1,2})-([0-9]{1,2})节")
+
+
+def week_list(text: str):
+    mask, _ = parse_weeks(text)
+    return [w + 1 for w in range(mask.bit_length()) if mask >> w & 1]
+
+
+def arrangement_text_to_obj(text: str):
+    # Same shape as arrangementTextToObj in src/pk/utils.ts (the pk API's arrangementInfo items).
+    if not text or not text.strip():
+        return {"arrangementText": "", "occupyDay": None, "occupyTime": None, "occupyWeek": None, "occupyRoom": None, "teacherAndCode": None}
+
+    idx = text.find(" 星期")
+    teacher_and_code = text[:idx].strip() if idx >= 0 else None
+    rest = text[idx + 1:].strip() if idx >= 0 else text.strip()
+
+    m = TEXT_DAY_RE.match(rest)
+    occupy_day = DAY_MAP[m.group(1)] if m else None
+
+    m = TEXT_TIME_RE.match(rest)
+    occupy_time = None
+    if m:
+        start, end = int(m.group(1)), int(m.group(2))
+        occupy_time = list(range(start, end + 1)) if 0 < start <= end else []
+
+    m = WEEK_RE.search(rest)
+    occupy_week = week_list(m.group(1)) if m else None
+
+    room_idx = rest.find("] ")
+    occupy_room = (rest[room_idx + 2:].strip() or None) if room_idx >= 0 else None
+
+    return {
+        "arrangementText": rest,
+        "occupyDay": occupy_day,
+        "occupyTime": occupy_time,
+        "occupyWeek": occupy_week,
+        "occupyRoom": occupy_room,
+        "teacherAndCode": teacher_and_code,
+    }
+
+
+def arrangement_info_objs(text: str):
+    # mergeArrangementInfo in src/pk/routes.ts: unique lines, sorted by day then first section.
+    lines = []
+    for line in str(text or "").split("\n"):
+        line = line.strip()
+        if line and line not in lines:
+            lines.append(line)
+    objs = [arrangement_text_to_obj(line) for line in lines]
+    objs.sort(key=lambda o: (o["occupyDay"] if o["occupyDay"] is not None else 99, (o["occupyTime"] or [99])[0]))
+    return objs
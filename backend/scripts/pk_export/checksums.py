@@ -0,0 +1,385 @@
+import hashlib
+import json
+import re
+import sqlite3
+
+from .cost import load_schema, statement_class
+from .dimensions import DimensionStage
+from .localdb import execute_statements
+from .sqlgen import (
+    ARRANGEINFO_SQL,
+    ARRANGEMENT_SQL,
+    CALENDAR_SQL,
+    COURSEDETAIL_SQL,
+    COURSENATURE_SQL,
+    MAJORANDCOURSE_SQL,
+    MAJORCOURSES_SQL,
+    TEACHERANDCLASS_SQL,
+    VALUES_BATCH,
+)
+
+CHECKSUM_FORMAT_VERSION = 2
+CHECKSUMS_FILE = "checksums.json"
+BUCKET_ROWS = 64  # target teaching classes (or teachers) per leaf bucket
+
+# Row fingerprints are plain SQL so D1, a local copy and the exporter's scratch database compute
+# them identically. Everything stays modulo a 31-bit prime, so a bucket SUM of up to 2^17 rows
+# stays below 2^53 and survives the JSON round trip through wrangler. Changing any constant
+# below invalidates stored trees (bump CHECKSUM_FORMAT_VERSION).
+PRIME = 2147483647
+COLUMN_WEIGHTS = [pow(31, j + 1, PRIME) for j in range(32)]
+# Text is hashed as a polynomial over its code points, TEXT_CHUNK characters per recursion step.
+TEXT_BASE = 131
+TEXT_CHUNK = 16
+TEXT_WEIGHT = pow(37, 5, PRIME)
+
+MIN_KEY = -(1 << 63)
+MAX_KEY = (1 << 63) - 1
+
+# name, kind, FROM clause (row alias t), calendar expr, bucket key expr, range name, fingerprinted columns.
+# kind "class": rows owned by one calendar's teaching classes, bucketed by teaching class id;
+# "calendar": per-calendar rows, one bucket; "dimension": rows attributed to a calendar through
+# calendarId (an older run may legitimately have left rows attributed to the same calendar).
+CHECKSUM_TABLES = (
+    ("calendar", "calendar", "calendar t", "t.calendarId", None, None, ("t.calendarId", "t.calendarIdI18n")),
+    (
+        "coursenature_by_calendar",
+        "calendar",
+        "coursenature_by_calendar t",
+        "t.calendarId",
+        None,
+        None,
+        ("t.courseLabelId", "t.courseLabelName"),
+    ),
+    (
+        "coursedetail",
+        "class",
+        "coursedetail t",
+        "t.calendarId",
+        "t.id",
+        "classes",
+        tuple(
+            "t." + c
+            for c in (
+                "id", "code", "name", "courseLabelId", "assessmentMode", "period", "weekHour", "campus", "number", "elcNumber",
+                "startWeek", "endWeek", "courseCode", "courseName", "credit", "teachingLanguage", "faculty", "newCourseCode", "newCode",
+            )
+        ),
+    ),
+    (
+        "arrangement",
+        "class",
+        "arrangement t",
+        "t.calendarId",
+        "t.teachingClassId",
+        "classes",
+        tuple(
+            "t." + c
+            for c in ("teachingClassId", "slotIndex", "weekday", "startPeriod", "endPeriod", "weekMask", "oddEven", "room", "campus")
+        ),
+    ),
+    (
+        "arrangeinfo",
+        "class",
+        "arrangeinfo t JOIN coursedetail cd ON cd.id = t.teachingClassId",
+        "cd.calendarId",
+        "t.teachingClassId",
+        "classes",
+        ("t.teachingClassId", "t.arrangeInfoText"),
+    ),
+    (
+        "teacherandclass",
+        "class",
+        "teacherandclass t JOIN coursedetail cd ON cd.id = t.teachingClassId",
+        "cd.calendarId",
+        "t.teachingClassId",
+        "classes",
+        ("t.teachingClassId", "t.teacherId"),
+    ),
+    (
+        # major ids are assigned by each database; compare through the major name
+        "majorandcourse",
+        "class",
+        "majorandcourse t JOIN coursedetail cd ON cd.id = t.courseId LEFT JOIN major m ON m.id = t.majorId",
+        "cd.calendarId",
+        "t.courseId",
+        "classes",
+        ("m.name", "t.courseId"),
+    ),
+    ("language", "dimension", "language t", "t.calendarId", None, None, ("t.teachingLanguage", "t.teachingLanguageI18n")),
+    ("assessment", "dimension", "assessment t", "t.calendarId", None, None, ("t.assessmentMode", "t.assessmentModeI18n")),
+    ("campus", "dimension", "campus t", "t.calendarId", None, None, ("t.campus", "t.campusI18n")),
+    ("faculty", "dimension", "faculty t", "t.calendarId", None, None, ("t.faculty", "t.facultyI18n")),
+    ("major", "dimension", "major t", "t.calendarId", None, None, ("t.code", "t.grade", "t.name")),
+    ("teacherinfo", "dimension", "teacherinfo t", "t.calendarId", "t.id", "teachers", ("t.id", "t.teacherCode", "t.teacherName")),
+)
+
+INSERT_COLUMNS_RE = re.compile(r"INTO\s+\w+\s+\(([^)]*)\)", re.IGNORECASE)
+
+
+def _term(expr: str) -> str:
+    return (
+        f"CASE typeof({expr}) WHEN 'null' THEN 1 "
+        f"WHEN 'integer' THEN ({expr} % {PRIME} + {PRIME}) % {PRIME} + 2 "
+        f"WHEN 'real' THEN (CAST({expr} * 1000 AS INTEGER) % {PRIME} + {PRIME}) % {PRIME} + 3 "
+        f"ELSE length(hex({expr})) + 4 END"
+    )
+
+
+def text_sql(columns) -> str:
+    """The row's text columns, each followed by a separator (non-text values are hashed by _term instead)."""
+    return " || ".join(f"iif(typeof({c}) = 'text', {c}, '') || char(31)" for c in columns)
+
+
+def text_step_sql(h: str, rest: str) -> str:
+    """Next polynomial hash state: ``h`` extended by the first TEXT_CHUNK characters of ``rest``.
+
+    Every character is weighted by its position, so reordering characters changes the hash.
+    """
+    terms = [
+        f"ifnull(unicode(substr({rest}, {i + 1}, 1)), 0) * {pow(TEXT_BASE, TEXT_CHUNK - 1 - i, PRIME)}" for i in range(TEXT_CHUNK)
+    ]
+    return f"(({h} * {pow(TEXT_BASE, TEXT_CHUNK, PRIME)}) % {PRIME} + " + " + ".join(terms) + f") % {PRIME}"
+
+
+def fingerprint_sql(count: int) -> str:
+    """Per-row fingerprint over columns v0..v<count-1>, key k and h, the positional hash of the row's text.
+
+    Each value contributes its type and integer value (or text byte length) at a per-column weight, and
+    the text through h, which depends on every character and its position within its column. The sum
+    is squared, so values swapped between two rows of a bucket do not cancel out, and then multiplied
+    by a function of the row key, so a value moved to another teaching class changes the bucket too.
+    Missing, extra and stale rows, and edits to any value, change the bucket sum unless two different
+    rows collide modulo PRIME.
+    """
+    terms = [f"({w} * ({_term(f'v{j}')})) % {PRIME}" for j, w in zip(range(count), COLUMN_WEIGHTS)]
+    linear = "(" + " + ".join(terms) + f" + ({TEXT_WEIGHT} * h) % {PRIME}) % {PRIME}"
+    return f"((({linear}) * ({linear})) % {PRIME} * ((k % {PRIME} + {PRIME}) % {PRIME} + 1)) % {PRIME}"
+
+
+def _bucket_sql(key: str, cal: str, ranges: dict, range_name: str) -> str:
+    if key is None:
+        return "0"
+    arms = []
+    for cid, r in sorted(ranges.items()):
+        lo, hi, width, buckets = r[range_name]
+        arms.append(f"WHEN {int(cid)} THEN CASE WHEN {key} < {lo} THEN -1 WHEN {key} > {hi} THEN {buckets} ELSE ({key} - {lo}) / {width} END")
+    return f"CASE {cal} {' '.join(arms)} ELSE -1 END"
+
+
+def checksum_query(ranges: dict) -> str:
+    """One query returning (tbl, calendarId, bucket, n, fp) leaves for every calendar in ``ranges``.
+
+    Each table's rows walk through a recursive CTE that hashes TEXT_CHUNK characters of their text
+    per step; a row is fingerprinted once its text is consumed.
+    """
+    cids = ", ".join(str(int(cid)) for cid in sorted(ranges))
+    ctes = []
+    arms = []
+    for i, (name, _, frm, cal, key, range_name, columns) in enumerate(CHECKSUM_TABLES):
+        names = ", ".join(f"v{j}" for j in range(len(columns)))
+        values = ", ".join(f"{c}" for c in columns)
+        text = text_sql(columns)
+        ctes.append(
+            f"w{i}(cal, k, {names}, rest, h) AS ("
+            f"SELECT {cal}, {key or 0}, {values}, {text}, length({text}) FROM {frm} WHERE {cal} IN ({cids}) "
+            f"UNION ALL SELECT cal, k, {names}, substr(rest, {TEXT_CHUNK + 1}), {text_step_sql('h', 'rest')} FROM w{i} WHERE rest != '')"
+        )
+        arms.append(
+            f"SELECT '{name}' AS tbl, cal AS calendarId, {_bucket_sql(key and 'k', 'cal', ranges, range_name)} AS bucket, "
+            f"COUNT(*) AS n, SUM({fingerprint_sql(len(columns))}) AS fp FROM w{i} WHERE rest = '' GROUP BY 2, 3"
+        )
+    return "WITH RECURSIVE\n" + ",\n".join(ctes) + "\n" + "\nUNION ALL\n".join(arms)
+
+
+def _key_range(keys: list) -> list:
+    """[lo, hi, width, buckets] splitting sorted integer keys into ~BUCKET_ROWS-sized id ranges."""
+    if not keys:
+        return [0, -1, 1, 0]
+    lo, hi = keys[0], keys[-1]
+    buckets = max(1, -(-len(keys) // BUCKET_ROWS))
+    width = max(1, -(-(hi - lo + 1) // buckets))
+    return [lo, hi, width, -(-(hi - lo + 1) // width)]
+
+
+def key_ranges(conn: sqlite3.Connection, calendar_ids) -> dict:
+    """Bucket layout per calendar, taken from the expected (exported) data."""
+    out = {}
+    for cid in calendar_ids:
+        classes = [k for (k,) in conn.execute("SELECT id FROM coursedetail WHERE calendarId = ? ORDER BY id", (cid,))]
+        teachers = [k for (k,) in conn.execute("SELECT id FROM teacherinfo WHERE calendarId = ? ORDER BY id", (cid,))]
+        out[str(cid)] = {"classes": _key_range(classes), "teachers": _key_range(teachers)}
+    return out
+
+
+def _digest(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+
+def build_tree(leaves, ranges: dict) -> dict:
+    """Merkle tree (root -> calendar -> table -> bucket) from (tbl, calendarId, bucket, n, fp) leaves."""
+    calendars = {cid: {table[0]: {} for table in CHECKSUM_TABLES} for cid in ranges}
+    for table, cid, bucket, n, fp in leaves:
+        if str(cid) in calendars:
+            calendars[str(cid)][table][str(bucket)] = [int(n), int(fp or 0)]
+    kinds = {table[0]: table[1] for table in CHECKSUM_TABLES}
+    tree = {"formatVersion": CHECKSUM_FORMAT_VERSION, "ranges": ranges, "calendars": {}}
+    for cid, tables in calendars.items():
+        node = {name: {"kind": kinds[name], "digest": _digest(buckets), "buckets": buckets} for name, buckets in tables.items()}
+        tree["calendars"][cid] = {"digest": _digest({name: t["digest"] for name, t in node.items()}), "tables": node}
+    tree["root"] = _digest({cid: c["digest"] for cid, c in tree["calendars"].items()})
+    return tree
+
+
+def checksum_tree(conn: sqlite3.Connection, ranges: dict) -> dict:
+    return build_tree(conn.execute(checksum_query(ranges)).fetchall(), ranges)
+
+
+def expected_db(statement_groups) -> sqlite3.Connection:
+    """In-memory pk schema holding exactly what the export writes (dimension group first)."""
+    conn = sqlite3.connect(":memory:")
+    load_schema(conn)
+    for statements in statement_groups:
+        execute_statements(conn, statements)
+    conn.commit()
+    return conn
+
+
+def bucket_range(ranges: dict, cid: str, table_range: str, bucket: int):
+    """Inclusive [lo, hi] key range of one leaf bucket (None = unbounded; whole table when not bucketed)."""
+    if table_range is None:
+        return None
+    lo, hi, width, buckets = ranges[cid][table_range]
+    if bucket < 0:
+        return [None, lo - 1]
+    if bucket >= buckets:
+        return [hi + 1, None]
+    return [lo + bucket * width, min(hi, lo + (bucket + 1) * width - 1)]
+
+
+def compare_trees(expected: dict, actual: dict) -> list:
+    """Divergent leaves, descending only into calendars/tables whose digests differ."""
+    if expected["root"] == actual["root"]:
+        return []
+    range_names = {table[0]: table[5] for table in CHECKSUM_TABLES}
+    out = []
+    for cid, exp_cal in expected["calendars"].items():
+        act_cal = actual["calendars"].get(cid, {"digest": None, "tables": {}})
+        if exp_cal["digest"] == act_cal["digest"]:
+            continue
+        for name, exp_table in exp_cal["tables"].items():
+            act_table = act_cal["tables"].get(name, {"digest": None, "buckets": {}})
+            if exp_table["digest"] == act_table["digest"]:
+                continue
+            for bucket in sorted(set(exp_table["buckets"]) | set(act_table["buckets"]), key=int):
+                exp_leaf = exp_table["buckets"].get(bucket, [0, 0])
+                act_leaf = act_table["buckets"].get(bucket, [0, 0])
+                if exp_leaf != act_leaf:
+                    out.append(
+                        {
+                            "calendarId": int(cid),
+                            "table": name,
+                            "kind": exp_table["kind"],
+                            "bucket": int(bucket),
+                            "range": bucket_range(expected["ranges"], cid, range_names[name], int(bucket)),
+                            "expected": {"rows": exp_leaf[0], "fp": exp_leaf[1]},
+                            "actual": {"rows": act_leaf[0], "fp": act_leaf[1]},
+                        }
+                    )
+    return out
+
+
+def _insert_columns(sql: str) -> str:
+    return INSERT_COLUMNS_RE.search(sql).group(1)
+
+
+def _merge_ranges(ranges: list) -> list:
+    out = []
+    for lo, hi in sorted(ranges, key=lambda r: MIN_KEY if r[0] is None else r[0]):
+        lo = MIN_KEY if lo is None else lo
+        hi = MAX_KEY if hi is None else hi
+        if out and lo <= out[-1][1] + 1:
+            out[-1][1] = max(out[-1][1], hi)
+        else:
+            out.append([lo, hi])
+    return out
+
+
+def fix_statements(conn: sqlite3.Connection, divergences: list) -> list:
+    """(sql, rows, batch) statements re-emitting only the divergent ranges from the expected database.
+
+    Class ranges are replaced in every class table together (and the calendar's majorcourses rebuilt);
+    per-calendar tables are replaced whole; dimension rows are re-upserted (rows D1 holds beyond the
+    export are reported, not deleted).
+    """
+    class_ranges = {}
+    calendar_tables = {}
+    dimension_tables = {}
+    for d in divergences:
+        if d["kind"] == "class":
+            class_ranges.setdefault(d["calendarId"], []).append(d["range"])
+        elif d["kind"] == "calendar":
+            calendar_tables.setdefault(d["calendarId"], set()).add(d["table"])
+        else:
+            dimension_tables.setdefault(d["calendarId"], {}).setdefault(d["table"], []).append(d["range"])
+
+    in_range = "SELECT id FROM coursedetail WHERE calendarId = ? AND id BETWEEN ? AND ?"
+    deletes = [
+        f"DELETE FROM teacherandclass WHERE teachingClassId IN ({in_range})",
+        f"DELETE FROM arrangeinfo WHERE teachingClassId IN ({in_range})",
+        f"DELETE FROM majorandcourse WHERE courseId IN ({in_range})",
+        "DELETE FROM coursedetail WHERE calendarId = ? AND id BETWEEN ? AND ?",
+        "DELETE FROM arrangement WHERE calendarId = ? AND teachingClassId BETWEEN ? AND ?",
+    ]
+    selects = [
+        (COURSEDETAIL_SQL, f"SELECT {_insert_columns(COURSEDETAIL_SQL)} FROM coursedetail WHERE calendarId = ? AND id BETWEEN ? AND ? ORDER BY id"),
+        (
+            ARRANGEMENT_SQL,
+            f"SELECT {_insert_columns(ARRANGEMENT_SQL)} FROM arrangement "
+            "WHERE calendarId = ? AND teachingClassId BETWEEN ? AND ? ORDER BY teachingClassId, slotIndex",
+        ),
+        (ARRANGEINFO_SQL, f"SELECT {_insert_columns(ARRANGEINFO_SQL)} FROM arrangeinfo WHERE teachingClassId IN ({in_range}) ORDER BY 1"),
+        (
+            TEACHERANDCLASS_SQL,
+            f"SELECT {_insert_columns(TEACHERANDCLASS_SQL)} FROM teacherandclass WHERE teachingClassId IN ({in_range}) ORDER BY 1, 2",
+        ),
+        (
+            MAJORANDCOURSE_SQL,
+            f"SELECT m.name, mc.courseId FROM majorandcourse mc JOIN major m ON m.id = mc.majorId WHERE mc.courseId IN ({in_range}) ORDER BY 2, 1",
+        ),
+    ]
+
+    out = []
+    for cid, ranges in sorted(class_ranges.items()):
+        params = [(cid, lo, hi) for lo, hi in _merge_ranges(ranges)]
+        out.extend((sql, params, 0) for sql in deletes)
+        for insert_sql, select_sql in selects:
+            rows = [row for p in params for row in conn.execute(select_sql, p)]
+            out.append((insert_sql, rows, VALUES_BATCH if insert_sql in (ARRANGEINFO_SQL, TEACHERANDCLASS_SQL) else 0))
+
+    per_calendar = {
+        "calendar": (CALENDAR_SQL, "calendar"),
+        "coursenature_by_calendar": (COURSENATURE_SQL, "coursenature_by_calendar"),
+    }
+    for cid, tables in sorted(calendar_tables.items()):
+        for name in sorted(tables):
+            insert_sql, table = per_calendar[name]
+            out.append((f"DELETE FROM {table} WHERE calendarId = ?", [(cid,)], 0))
+            out.append((insert_sql, conn.execute(f"SELECT {_insert_columns(insert_sql)} FROM {table} WHERE calendarId = ?", (cid,)).fetchall(), 0))
+
+    upserts = {statement_class(sql)[1]: (sql, batch) for sql, _, batch in DimensionStage().statements()}
+    for cid, tables in sorted(dimension_tables.items()):
+        for name, ranges in sorted(tables.items()):
+            sql, batch = upserts[name]
+            select_sql = f"SELECT {_insert_columns(sql)} FROM {name} WHERE calendarId = ?"
+            if None in ranges:
+                rows = conn.execute(select_sql, (cid,)).fetchall()
+            else:
+                rows = [row for lo, hi in _merge_ranges(ranges) for row in conn.execute(select_sql + " AND id BETWEEN ? AND ?", (cid, lo, hi))]
+            out.append((sql, rows, batch))
+
+    # majorcourses is derived from the calendar's majorandcourse rows
+    for cid in sorted(class_ranges):
+        out.append(("DELETE FROM majorcourses WHERE calendarId = ?", [(cid,)], 0))
+        out.append((MAJORCOURSES_SQL, [(cid,)], 0))
+    return out
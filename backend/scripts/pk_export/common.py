@@ -0,0 +1,79 @@
+import re
+
+# Leading major code inside the first parentheses, e.g.
+# - "2025(03074 土木工程(国际班))" -> 03074
+# - "2025(WF00020204 ... )" -> WF00020204
+MAJOR_CODE_RE = re.compile(r"\(([0-9A-Za-z]{3,16})\s")
+
+
+def sql_quote(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        # Keep NaN/inf out of SQL
+        if isinstance(value, float) and (value != value or value == float("inf") or value == float("-inf")):
+            return "NULL"
+        return str(value)
+    s = str(value)
+    s = s.replace("\x00", "")
+    s = s.replace("'", "''")
+    return "'" + s + "'"
+
+
+def sql_value(value):
+    """The value ``sql_quote`` would inline, as a sqlite3 bind parameter."""
+    if value is None or isinstance(value, int):
+        return int(value) if isinstance(value, bool) else value
+    if isinstance(value, float):
+        return None if value != value or value in (float("inf"), float("-inf")) else value
+    return str(value).replace("\x00", "")
+
+
+def inline_params(sql: str, row) -> str:
+    """Render a ``?``-placeholder statement with literal values (for the D1 SQL files)."""
+    parts = sql.split("?")
+    if len(parts) != len(row) + 1:
+        raise ValueError(f"expected {len(parts) - 1} params, got {len(row)}: {sql}")
+    return "".join(part + sql_quote(value) for part, value in zip(parts, row)) + parts[-1]
+
+
+def norm_str(value):
+    return str(value or "").strip() or None
+
+
+def as_int(value):
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def parse_major_string(major: str):
+    name = str(major or "").strip()
+    grade = None
+    grade_raw = name[:4]
+    if grade_raw.isdigit():
+        grade = int(grade_raw)
+
+    code = None
+    m = MAJOR_CODE_RE.search(name)
+    if m:
+        code = m.group(1)
+
+    return {"grade": grade, "code": code, "name": name}
+
+
+def compute_new_code(course: dict):
+    new_course_code = str(course.get("newCourseCode") or "").strip() or None
+    if not new_course_code:
+        return (None, None)
+
+    code = str(course.get("code") or "").strip()
+    course_code = str(course.get("courseCode") or "").strip()
+    if not code or not course_code or not code.startswith(course_code) or len(code) < 2:
+        return (new_course_code, None)
+
+    suffix = code[-2:]
+    return (new_course_code, (new_course_code + suffix) if suffix else None)
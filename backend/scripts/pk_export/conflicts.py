@@ -0,0 +1,113 @@
+import base64
+
+from .arrangement import parse_arrange_info
+from .common import as_int
+
+# Occupancy bitset of a teaching class: one WEEK_BITS-wide week mask per (weekday, period) cell, cell
+# ((weekday - 1) * MAX_PERIODS + period - 1), i.e. bit (cell * WEEK_BITS + week - 1) is set when the class
+# meets in that period of that weekday in that week.
+MAX_PERIODS = 14
+WEEK_BITS = 32
+ALL_WEEKS = (1 << WEEK_BITS) - 1
+CELL_MASK = ALL_WEEKS
+# Classes per {cid}/conflicts/<block> shard.
+CONFLICT_BLOCK = 256
+
+
+def occupancy(slots) -> int:
+    """Week x weekday x period bitset of parse_arrange_info slots.
+
+    A slot without week information ("星期一1-2节" with no [..]) counts as every week, so it can only add
+    conflicts, never hide one.
+    """
+    bits = 0
+    for slot in slots:
+        weekday, start, end = slot["weekday"], slot["startPeriod"], min(slot["endPeriod"], MAX_PERIODS)
+        weeks = (slot["weekMask"] & ALL_WEEKS) or ALL_WEEKS
+        for period in range(start, end + 1):
+            bits |= weeks << (((weekday - 1) * MAX_PERIODS + period - 1) * WEEK_BITS)
+    return bits
+
+
+def cells(bits: int):
+    """(cell, week mask) pairs of an occupancy bitset."""
+    cell = 0
+    while bits:
+        weeks = bits & CELL_MASK
+        if weeks:
+            yield cell, weeks
+        bits >>= WEEK_BITS
+        cell += 1
+
+
+def class_occupancy(courses: list) -> dict:
+    """{teachingClassId: occupancy} from the courses' arrangeInfo (the same slots the arrangement table gets)."""
+    out = {}
+    for course in courses:
+        if not isinstance(course, dict):
+            continue
+        tid = as_int(course.get("id"))
+        if tid is not None:
+            out[tid] = out.get(tid, 0) | occupancy(parse_arrange_info(str(course.get("arrangeInfo") or "").strip() or None))
+    return out
+
+
+def conflict_graph(occupancies: dict):
+    """Sorted class ids and, per class ordinal, the bitset of ordinals it clashes with (bit i = ids[i]).
+
+    Bucketed by (weekday, period) cell instead of comparing every pair: within a cell the classes are
+    grouped by week mask, each group's members become one ordinal bitset, and a class gets the union of
+    the groups whose weeks intersect its own. Work grows with the occupied cells and distinct week
+    patterns per cell, not with the number of clashing pairs.
+    """
+    ids = sorted(occupancies)
+    buckets = {}  # cell -> {week mask: ordinal bitset}
+    for ordinal, tid in enumerate(ids):
+        for cell, weeks in cells(occupancies[tid]):
+            groups = buckets.setdefault(cell, {})
+            groups[weeks] = groups.get(weeks, 0) | (1 << ordinal)
+
+    adjacency = [0] * len(ids)
+    for groups in buckets.values():
+        patterns = list(groups.items())
+        for weeks, members in patterns:
+            clash = 0
+            for other_weeks, other_members in patterns:
+                if weeks & other_weeks:
+                    clash |= other_members
+            ordinal_bits = members
+            while ordinal_bits:
+                low = ordinal_bits & -ordinal_bits
+                ordinal = low.bit_length() - 1
+                adjacency[ordinal] |= clash
+                ordinal_bits ^= low
+    for ordinal in range(len(ids)):
+        adjacency[ordinal] &= ~(1 << ordinal)
+    return ids, adjacency
+
+
+def conflict_shards(cid: int, courses: list) -> dict:
+    """Read-model shards of one calendar's conflict graph (see build_calendar_shards).
+
+    - ``{cid}/conflicts/index``: the class ids in ordinal order, the block size and per-class degrees
+    - ``{cid}/conflicts/{block}``: ordinals [block * CONFLICT_BLOCK, (block + 1) * CONFLICT_BLOCK), each
+      as base64 of its clash bitset in little-endian bytes (ordinal j is bit j % 8 of byte j // 8)
+
+    Checking whether two classes clash is then two index lookups and one bit test.
+    """
+    ids, adjacency = conflict_graph(class_occupancy(courses))
+    size = (len(ids) + 7) // 8
+    shards = {
+        f"{cid}/conflicts/index": {
+            "calendarId": cid,
+            "ids": ids,
+            "block": CONFLICT_BLOCK,
+            "degrees": [bin(bits).count("1") for bits in adjacency],
+        }
+    }
+    for block, start in enumerate(range(0, len(ids), CONFLICT_BLOCK)):
+        shards[f"{cid}/conflicts/{block}"] = {
+            "start": start,
+            "bits": [base64.b64encode(bits.to_bytes(size, "little")).decode("ascii") for bits in adjacency[start : start + CONFLICT_BLOCK]],
+        }
+    return shards
@@ -0,0 +1,306 @@
+import pathlib
+import re
+import shutil
+import sqlite3
+import tempfile
+
+MIGRATIONS_DIR = pathlib.Path(__file__).resolve().parents[2] / "migrations"
+
+STMT_RE = re.compile(
+    r"^\s*(INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|DELETE\s+FROM|UPDATE(?:\s+OR\s+\w+)?)\s+([\"`\[]?\w+)",
+    re.IGNORECASE,
+)
+PLAN_RE = re.compile(r"^(SCAN|SEARCH)(?: TABLE)? (\w+)")
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+CALENDAR_FILE_RE = re.compile(r"pk-sync-(\d+)\.sql$")
+WITHOUT_ROWID_RE = re.compile(r"\)\s*WITHOUT\s+ROWID\s*$", re.IGNORECASE)
+
+
+def pk_migration_files(migrations_dir=MIGRATIONS_DIR):
+    # Only the pk schema files; 010_materialize needs the review site tables.
+    return sorted(pathlib.Path(migrations_dir).glob("0*_pk_*.sql"))
+
+
+def load_schema(conn: sqlite3.Connection, migrations_dir=MIGRATIONS_DIR):
+    for path in pk_migration_files(migrations_dir):
+        conn.executescript(path.read_text(encoding="utf-8-sig"))
+
+
+def iter_statements(text: str):
+    buf = []
+    for line in text.splitlines(keepends=True):
+        if not buf and (not line.strip() or line.lstrip().startswith("--")):
+            continue
+        buf.append(line)
+        stmt = "".join(buf)
+        if sqlite3.complete_statement(stmt):
+            yield stmt.strip()
+            buf = []
+    if buf and "".join(buf).strip():
+        yield "".join(buf).strip()
+
+
+def statement_shape(sql: str) -> str:
+    return LITERAL_RE.sub("?", re.sub(r"\s+", " ", sql))
+
+
+def statement_class(sql: str):
+    m = STMT_RE.match(sql)
+    if not m:
+        return ("OTHER", None)
+    verb = re.sub(r"\s+", " ", m.group(1).upper()).replace(" INTO", "").replace(" FROM", "")
+    if verb == "INSERT" and re.search(r"\bON\s+CONFLICT\b", sql, re.IGNORECASE):
+        verb = "UPSERT"
+    return (verb, m.group(2).strip("\"`[]"))
+
+
+def in_subqueries(sql: str):
+    """Return the text of every ``IN (SELECT ...)`` subquery (quotes respected)."""
+    out = []
+    upper = sql.upper()
+    i = 0
+    while True:
+        i = upper.find("(SELECT", i)
+        if i < 0:
+            return out
+        prefix = upper[:i].rstrip()
+        depth = 0
+        j = i
+        in_str = False
+        while j < len(sql):
+            ch = sql[j]
+            if in_str:
+                if ch == "'":
+                    in_str = False
+            elif ch == "'":
+                in_str = True
+            elif ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        if prefix.endswith(" IN"):
+            out.append(sql[i + 1:j])
+        i = j
+
+
+class CostMeter:
+    """Apply SQL statements to a staging SQLite database and estimate D1 rows read/written.
+
+    Writes are exact row-level counts taken from temporary triggers (REPLACE deletions and
+    upsert updates included): every inserted or deleted row costs 1 + the table's index
+    count (not counting the primary key of a WITHOUT ROWID table, which is the table's own
+    B-tree), an updated row costs 1 + the indexes covering an updated column. Reads are an
+    estimate from the query plan: a SCAN costs the table's current row count, a SEARCH on the
+    target costs the rows it touched, an IN (SELECT ...) subquery costs the rows it returns,
+    other point lookups (and INSERT conflict probes) cost one row.
+    """
+
+    def __init__(self, db_path=None, migrations_dir=MIGRATIONS_DIR):
+        self._tmp = tempfile.TemporaryDirectory(prefix="pk-d1-cost-")
+        staging = pathlib.Path(self._tmp.name) / "staging.sqlite"
+        if db_path:
+            shutil.copyfile(db_path, staging)
+        self.conn = sqlite3.connect(str(staging), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("PRAGMA recursive_triggers = ON")
+        load_schema(self.conn, migrations_dir)
+
+        self.hits = {}
+        self.conn.create_function("_pk_cost_hit", 3, self._hit)
+        schema = {
+            r[0]: r[1]
+            for r in self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        }
+        self.tables = list(schema)
+        self.index_count = {}
+        self.row_count = {}
+        for t in self.tables:
+            indexes = self.conn.execute(f'PRAGMA index_list("{t}")').fetchall()
+            if WITHOUT_ROWID_RE.search(schema[t] or ""):
+                # the primary key index of a WITHOUT ROWID table is the table itself, already counted as the row
+                indexes = [idx for idx in indexes if idx[3] != "pk"]
+            self.index_count[t] = len(indexes)
+            self.row_count[t] = self.conn.execute(f'SELECT count(*) FROM "{t}"').fetchone()[0]
+            for op in ("INSERT", "DELETE", "UPDATE"):
+                self.conn.execute(
+                    f'CREATE TEMP TRIGGER "_pk_cost_{op.lower()}_{t}" AFTER {op} ON "{t}" '
+                    f"BEGIN SELECT _pk_cost_hit('{t}', '{op.lower()}', 1); END"
+                )
+            for idx in indexes:
+                cols = [r[2] for r in self.conn.execute(f'PRAGMA index_info("{idx[1]}")').fetchall() if r[2]]
+                if not cols:
+                    continue
+                col_sql = ", ".join(f'"{c}"' for c in cols)
+                self.conn.execute(
+                    f'CREATE TEMP TRIGGER "_pk_cost_idx_{idx[1]}" AFTER UPDATE OF {col_sql} ON "{t}" '
+                    f"BEGIN SELECT _pk_cost_hit('{t}', 'index_update', 1); END"
+                )
+        self.plans = {}
+        self.conn.execute("BEGIN")
+
+    def _hit(self, table, op, n):
+        key = (table, op)
+        self.hits[key] = self.hits.get(key, 0) + n
+        return None
+
+    def close(self):
+        try:
+            self.conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def _plan(self, sql: str, shape: str):
+        plan = self.plans.get(shape)
+        if plan is None:
+            plan = []
+            for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall():
+                m = PLAN_RE.match(row[-1])
+                if m:
+                    plan.append((m.group(1), m.group(2)))
+            self.plans[shape] = plan
+        return plan
+
+    def measure(self, sql: str) -> dict:
+        verb, target = statement_class(sql)
+        shape = statement_shape(sql)
+        try:
+            plan = self._plan(sql, shape)
+        except sqlite3.Error:
+            plan = []
+
+        sub_tables = {}
+        for sub in in_subqueries(sql):
+            try:
+                n = self.conn.execute(f"SELECT count(*) FROM ({sub})").fetchone()[0]
+            except sqlite3.Error:
+                continue
+            m = re.search(r"\bFROM\s+(\w+)", sub, re.IGNORECASE)
+            if m:
+                sub_tables[m.group(1)] = sub_tables.get(m.group(1), 0) + n
+
+        self.hits = {}
+        self.conn.execute(sql)
+        hits = self.hits
+
+        written = {}
+        for (table, op), n in hits.items():
+            if op in ("insert", "delete"):
+                written[table] = written.get(table, 0) + n * (1 + self.index_count.get(table, 0))
+            else:
+                written[table] = written.get(table, 0) + n
+            if op == "insert":
+                self.row_count[table] = self.row_count.get(table, 0) + n
+            elif op == "delete":
+                self.row_count[table] = self.row_count.get(table, 0) - n
+
+        touched = sum(n for (table, op), n in hits.items() if table == target and op in ("delete", "update"))
+        read = 0
+        for kind, table in plan:
+            if kind == "SCAN":
+                read += self.row_count.get(table, 0) + (touched if table == target and verb == "DELETE" else 0)
+            elif table == target and verb in ("DELETE", "UPDATE"):
+                read += touched
+            elif table in sub_tables:
+                read += sub_tables[table]
+            else:
+                read += 1
+        if verb not in ("INSERT", "DELETE", "OTHER") and not verb.startswith("UPDATE"):
+            read += 1  # conflict probe of INSERT OR REPLACE / OR IGNORE / upsert
+
+        return {
+            "class": f"{verb} {target}" if target else verb,
+            "table": target,
+            "rowsRead": read,
+            "rowsWritten": sum(written.values()),
+            "writtenByTable": written,
+        }
+
+
+def _bump(bucket: dict, key, m: dict):
+    cur = bucket.setdefault(key, {"statements": 0, "rowsRead": 0, "rowsWritten": 0})
+    cur["statements"] += 1
+    cur["rowsRead"] += m["rowsRead"]
+    cur["rowsWritten"] += m["rowsWritten"]
+
+
+def calendar_label(path: pathlib.Path) -> str:
+    m = CALENDAR_FILE_RE.search(path.name)
+    if m:
+        return m.group(1)
+    return "dimensions" if "dimensions" in path.name else path.stem
+
+
+def estimate_files(files, db_path=None, migrations_dir=MIGRATIONS_DIR) -> dict:
+    meter = CostMeter(db_path=db_path, migrations_dir=migrations_dir)
+    report = {
+        "files": [],
+        "totals": {"statements": 0, "rowsRead": 0, "rowsWritten": 0, "sqlBytes": 0},
+        "byClass": {},
+        "byTable": {},
+        "byCalendar": {},
+        "indexCount": dict(meter.index_count),
+    }
+    try:
+        for path in files:
+            path = pathlib.Path(path)
+            text = path.read_text(encoding="utf-8")
+            label = calendar_label(path)
+            file_totals = {"statements": 0, "rowsRead": 0, "rowsWritten": 0}
+            for sql in iter_statements(text):
+                m = meter.measure(sql)
+                _bump(report["byClass"], m["class"], m)
+                _bump(report["byCalendar"], label, m)
+                for table, n in m["writtenByTable"].items():
+                    t = report["byTable"].setdefault(table, {"rowsRead": 0, "rowsWritten": 0})
+                    t["rowsWritten"] += n
+                if m["table"]:
+                    report["byTable"].setdefault(m["table"], {"rowsRead": 0, "rowsWritten": 0})["rowsRead"] += m["rowsRead"]
+                for key in ("rowsRead", "rowsWritten"):
+                    file_totals[key] += m[key]
+                    report["totals"][key] += m[key]
+                file_totals["statements"] += 1
+                report["totals"]["statements"] += 1
+            report["totals"]["sqlBytes"] += len(text.encode("utf-8"))
+            report["files"].append({"file": str(path), "calendar": label, "sqlBytes": len(text.encode("utf-8")), **file_totals})
+    finally:
+        meter.close()
+    return report
+
+
+def compare_reports(current: dict, previous: dict) -> dict:
+    def delta(cur, prev):
+        out = {}
+        for key in ("statements", "rowsRead", "rowsWritten", "sqlBytes"):
+            if key in cur or key in prev:
+                a = cur.get(key, 0)
+                b = prev.get(key, 0)
+                out[key] = {"current": a, "previous": b, "delta": a - b, "ratio": round(a / b, 3) if b else None}
+        return out
+
+    out = {"totals": delta(current.get("totals", {}), previous.get("totals", {})), "byTable": {}, "byCalendar": {}}
+    for section in ("byTable", "byCalendar"):
+        keys = set(current.get(section, {})) | set(previous.get(section, {}))
+        for key in sorted(keys):
+            out[section][key] = delta(current.get(section, {}).get(key, {}), previous.get(section, {}).get(key, {}))
+    return out
+
+
+def check_budget(report: dict, max_rows_written=0, max_rows_read=0, max_growth=0.0, comparison=None):
+    violations = []
+    totals = report["totals"]
+    if max_rows_written and totals["rowsWritten"] > max_rows_written:
+        violations.append(f"rowsWritten {totals['rowsWritten']} > budget {max_rows_written}")
+    if max_rows_read and totals["rowsRead"] > max_rows_read:
+        violations.append(f"rowsRead {totals['rowsRead']} > budget {max_rows_read}")
+    if max_growth and comparison:
+        for key in ("rowsWritten", "rowsRead"):
+            ratio = comparison["totals"].get(key, {}).get("ratio")
+            if ratio is not None and ratio > max_growth:
+                violations.append(f"{key} grew x{ratio} vs previous run (> x{max_growth})")
+    return violations
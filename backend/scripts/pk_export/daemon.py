@@ -0,0 +1,286 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .onesystem import SessionExpired, content_hash, fetch_calendar_courses, fetch_manual_arrange_page, probe_fingerprint
+
+
+def iso(ts):
+    if not ts:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(ts))
+
+
+def log(msg: str):
+    print(f"[daemon {time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+class SyncDaemon:
+    """Keep one onesystem session alive and re-export a calendar only when its fingerprint changes.
+
+    A poll costs one small page-1 request (``total_`` + hash of the rows). Changes that only touch
+    later pages are caught by forcing a full crawl every ``full_every`` unchanged polls; a full crawl
+    whose content hash matches the last export is counted as a skip and does not rewrite the SQL.
+    """
+
+    def __init__(
+        self,
+        login,
+        export,
+        calendar_ids,
+        page_size: int = 200,
+        poll_interval: float = 300,
+        keepalive_interval: float = 600,
+        probe_page_size: int = 20,
+        full_every: int = 12,
+        status_path=None,
+        on_change: str = "",
+    ):
+        self.login = login
+        self.export = export
+        self.page_size = page_size
+        self.poll_interval = max(5.0, float(poll_interval))
+        self.keepalive_interval = max(5.0, float(keepalive_interval))
+        self.probe_page_size = max(1, int(probe_page_size))
+        self.full_every = max(0, int(full_every))
+        self.status_path = pathlib.Path(status_path) if status_path else None
+        self.on_change = on_change or ""
+
+        self.lock = threading.Lock()
+        self.session = None
+        self.started_at = time.time()
+        self.logins = 0
+        self.last_login_at = None
+        self.last_activity_at = None
+        self.keepalives = 0
+        self.keepalive_errors = 0
+        self.next_keepalive_at = None
+
+        now = time.time()
+        stagger = min(5.0, self.poll_interval / max(1, len(calendar_ids)))
+        self.watch = {}
+        for i, cid in enumerate(calendar_ids):
+            self.watch[cid] = {
+                "calendarId": cid,
+                "fingerprint": None,
+                "contentHash": None,
+                "nextPollAt": now + i * stagger,
+                "lastPollAt": None,
+                "lastChangeAt": None,
+                "lastExportAt": None,
+                "lastExportFile": None,
+                "lastHookExit": None,
+                "polls": 0,
+                "skips": 0,
+                "unchangedFullCrawls": 0,
+                "exports": 0,
+                "errors": 0,
+                "lastError": None,
+                "pollsSinceFull": 0,
+            }
+        self._restore()
+
+    def _restore(self):
+        # Reuse fingerprints from the previous run so a restart does not force a re-export.
+        if not self.status_path or not self.status_path.exists():
+            return
+        try:
+            prev = json.loads(self.status_path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for item in prev.get("calendars") or []:
+            st = self.watch.get(item.get("calendarId"))
+            if st is None:
+                continue
+            for key in ("fingerprint", "contentHash", "lastExportFile"):
+                st[key] = item.get(key)
+            for key in ("lastChangeAt", "lastExportAt"):
+                st[key] = item.get(key + "Ts")
+
+    def status(self) -> dict:
+        with self.lock:
+            calendars = []
+            for st in self.watch.values():
+                item = dict(st)
+                for key in ("nextPollAt", "lastPollAt", "lastChangeAt", "lastExportAt"):
+                    item[key + "Ts"] = st[key]
+                    item[key] = iso(st[key])
+                calendars.append(item)
+            return {
+                "startedAt": iso(self.started_at),
+                "pollIntervalSec": self.poll_interval,
+                "keepaliveIntervalSec": self.keepalive_interval,
+                "probePageSize": self.probe_page_size,
+                "fullEvery": self.full_every,
+                "session": {
+                    "logins": self.logins,
+                    "lastLoginAt": iso(self.last_login_at),
+                    "lastActivityAt": iso(self.last_activity_at),
+                    "nextKeepaliveAt": iso(self.next_keepalive_at),
+                    "keepalives": self.keepalives,
+                    "keepaliveErrors": self.keepalive_errors,
+                },
+                "calendars": calendars,
+            }
+
+    def write_status(self):
+        if not self.status_path:
+            return
+        tmp = self.status_path.with_suffix(self.status_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.status(), ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.status_path)
+
+    def serve_status(self, port: int):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(daemon.status(), ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        log(f"status endpoint on http://127.0.0.1:{port}/status")
+        return server
+
+    def _touch(self):
+        self.last_activity_at = time.time()
+        self.next_keepalive_at = self.last_activity_at + self.keepalive_interval
+
+    def relogin(self):
+        log("login")
+        session = self.login()
+        if session is None:
+            raise RuntimeError("Login failed.")
+        self.session = session
+        self.logins += 1
+        self.last_login_at = time.time()
+        self._touch()
+
+    def _with_session(self, fn):
+        if self.session is None:
+            self.relogin()
+        try:
+            out = fn(self.session)
+        except SessionExpired as e:
+            log(f"session expired ({e}), logging in again")
+            self.relogin()
+            out = fn(self.session)
+        self._touch()
+        return out
+
+    def keepalive(self):
+        cid = next(iter(self.watch))
+        try:
+            self._with_session(lambda s: fetch_manual_arrange_page(s, cid, 1, 1, attempts=1))
+            self.keepalives += 1
+        except Exception as e:
+            self.keepalive_errors += 1
+            self.next_keepalive_at = time.time() + min(60.0, self.keepalive_interval)
+            log(f"keepalive failed: {e}")
+
+    def poll(self, cid: int):
+        st = self.watch[cid]
+        now = time.time()
+        st["lastPollAt"] = now
+        st["nextPollAt"] = now + self.poll_interval
+        st["polls"] += 1
+        try:
+            fp = self._with_session(lambda s: probe_fingerprint(s, cid, self.probe_page_size))
+            changed = fp != st["fingerprint"]
+            forced = self.full_every > 0 and st["pollsSinceFull"] >= self.full_every
+            if not changed and not forced:
+                st["skips"] += 1
+                st["pollsSinceFull"] += 1
+                return
+            log(f"calendarId={cid} {'fingerprint changed' if changed else 'periodic full crawl'} total={fp['total']}")
+            self.full_export(cid)
+            st["fingerprint"] = fp
+        except Exception as e:
+            st["errors"] += 1
+            st["lastError"] = f"{type(e).__name__}: {e}"
+            log(f"calendarId={cid} poll failed: {e}")
+
+    def full_export(self, cid: int):
+        st = self.watch[cid]
+        stats = {}
+
+        def crawl(session):
+            stats.clear()  # a re-login crawls the calendar again
+            return fetch_calendar_courses(session, cid, self.page_size, stats=stats)
+
+        courses = self._with_session(crawl)
+        st["pollsSinceFull"] = 0
+        h = content_hash(courses)
+        if h == st["contentHash"]:
+            st["unchangedFullCrawls"] += 1
+            st["skips"] += 1
+            log(f"calendarId={cid} content unchanged, skip export")
+            return
+
+        info = self.export(cid, courses, stats.get("rawBytes"))
+        now = time.time()
+        st["contentHash"] = h
+        st["lastChangeAt"] = now
+        st["lastExportAt"] = now
+        st["lastExportFile"] = info.get("file")
+        st["exports"] += 1
+        print(json.dumps(info, ensure_ascii=False), flush=True)
+
+        if self.on_change:
+            cmd = self.on_change.format(calendarId=cid, file=info.get("file") or "")
+            log(f"on-change: {cmd}")
+            st["lastHookExit"] = subprocess.run(cmd, shell=True).returncode
+
+    def run(self, max_cycles: int = 0):
+        if self.session is None:
+            self.relogin()
+        else:
+            self._touch()
+        self.write_status()
+        cycles = 0
+        while True:
+            now = time.time()
+            due = [cid for cid, st in self.watch.items() if st["nextPollAt"] <= now]
+            for cid in due:
+                self.poll(cid)
+            if due:
+                cycles += 1
+            elif self.next_keepalive_at is not None and self.next_keepalive_at <= now:
+                self.keepalive()
+            self.write_status()
+
+            if max_cycles and cycles >= max_cycles:
+                return 0
+
+            next_at = min([st["nextPollAt"] for st in self.watch.values()] + [self.next_keepalive_at or now + 60])
+            wait = max(0.0, next_at - time.time())
+            if wait:
+                time.sleep(min(wait, 30.0))
+
+
+def run_daemon(daemon: SyncDaemon, status_port: int = 0, max_cycles: int = 0) -> int:
+    if status_port:
+        daemon.serve_status(status_port)
+    try:
+        return daemon.run(max_cycles=max_cycles)
+    except KeyboardInterrupt:
+        log("stopped")
+        daemon.write_status()
+        return 0
+    except Exception as e:
+        print(f"daemon crashed: {e}", file=sys.stderr)
+        daemon.write_status()
+        return 1
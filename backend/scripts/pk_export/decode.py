@@ -0,0 +1,109 @@
+import json
+from typing import List, Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # optional fast backend, in scripts/requirements.txt
+    msgspec = None
+
+# The manualArrange/page record fields anything downstream reads (sqlgen, dimensions, shards, archive, volatile);
+# decoded records carry only these, and only when not null. The archive dictionary-encodes the string fields
+# (the column holds a dictionary id) and keeps the raw scalar of the value fields.
+STRING_FIELDS = (
+    "code",
+    "name",
+    "courseLabelName",
+    "assessmentMode",
+    "assessmentModeI18n",
+    "campus",
+    "campusI18n",
+    "courseCode",
+    "courseName",
+    "teachingLanguage",
+    "teachingLanguageI18n",
+    "faculty",
+    "facultyI18n",
+    "newCourseCode",
+    "arrangeInfo",
+)
+VALUE_FIELDS = ("courseLabelId", "period", "weekHour", "number", "elcNumber", "startWeek", "endWeek", "credits")
+COURSE_FIELDS = ("id", "calendarIdI18n", *STRING_FIELDS, *VALUE_FIELDS, "majorList", "teacherList")
+TEACHER_FIELDS = ("id", "teacherCode", "teacherName")
+
+
+COURSE_KEYS = frozenset(COURSE_FIELDS)
+TEACHER_KEYS = frozenset(TEACHER_FIELDS)
+PAGE_KEYS = frozenset(("code", "data"))
+PAGE_DATA_KEYS = frozenset(("total_", "list"))
+
+
+def _pick(obj: dict, keys: frozenset) -> dict:
+    return {k: v for k, v in obj.items() if v is not None and k in keys}
+
+
+def _project_course(course):
+    if not isinstance(course, dict):
+        return course
+    out = _pick(course, COURSE_KEYS)
+    teachers = out.get("teacherList")
+    if isinstance(teachers, list):
+        out["teacherList"] = [_pick(t, TEACHER_KEYS) if isinstance(t, dict) else t for t in teachers]
+    return out
+
+
+def decode_page_stdlib(raw) -> dict:
+    """Projected ``{"code", "data": {"total_", "list"}}`` page with the stdlib decoder (any JSON the page may hold).
+
+    json.loads builds the whole page, then only the projected fields are copied out: slower than a plain
+    res.json() by that copy (pk-decode-bench.py), but the full page is garbage as soon as this returns.
+    """
+    page = json.loads(raw)
+    if not isinstance(page, dict):
+        return page
+    out = _pick(page, PAGE_KEYS)
+    data = out.get("data")
+    if isinstance(data, dict):
+        data = out["data"] = _pick(data, PAGE_DATA_KEYS)
+        if isinstance(data.get("list"), list):
+            data["list"] = [_project_course(c) for c in data["list"]]
+    return out
+
+
+if msgspec is not None:
+    Scalar = Union[bool, int, float, str, None]
+    Teacher = msgspec.defstruct("Teacher", [(name, Scalar, None) for name in TEACHER_FIELDS], omit_defaults=True)
+    Course = msgspec.defstruct(
+        "Course",
+        [(name, Scalar, None) for name in COURSE_FIELDS[:-2]]
+        + [("majorList", Optional[List[Scalar]], None), ("teacherList", Optional[List[Optional[Teacher]]], None)],
+        omit_defaults=True,
+    )
+    PageData = msgspec.defstruct(
+        "PageData", [("total_", Scalar, None), ("list", Optional[List[Optional[Course]]], None)], omit_defaults=True
+    )
+    Page = msgspec.defstruct("Page", [("code", Scalar, None), ("data", Optional[PageData], None)], omit_defaults=True)
+    _TYPED_DECODER = msgspec.json.Decoder(Page)
+
+
+def decode_page_typed(raw) -> dict:
+    """Same page through msgspec: fields outside the schema are skipped by the parser and never built.
+
+    Raises msgspec.ValidationError when a record does not fit the schema (decode_page then falls back).
+    msgspec must be installed.
+    """
+    return msgspec.to_builtins(_TYPED_DECODER.decode(raw))
+
+
+def decode_page(raw) -> dict:
+    """Decode a manualArrange/page response body into projected course records.
+
+    Uses the typed msgspec decoder when it is installed and the page fits its schema, otherwise the
+    stdlib one; both return the same dicts. Raises ValueError when the body is not JSON.
+    """
+    if msgspec is not None:
+        try:
+            return decode_page_typed(raw)
+        except msgspec.DecodeError:
+            # off-schema record (or not JSON at all: the stdlib decoder raises the ValueError then)
+            pass
+    return decode_page_stdlib(raw)
@@ -0,0 +1,135 @@
+from .common import as_int, norm_str, parse_major_string
+from .sqlgen import write_statements
+
+DIMENSIONS_FILE = "pk-sync-000-dimensions.sql"
+TEACHER_BATCH = 200
+
+# (code, requested grade) -> newest major with grade <= requested, for every grade in the major table; unchanged
+# rows are not rewritten (migrations/006_pk_major_resolve.sql). Runs after the major upserts, before any calendar's
+# MAJORCOURSES_SQL.
+MAJORRESOLVE_SQL = (
+    "INSERT INTO majorresolve (code, grade, majorId) "
+    "SELECT code, grade, majorId FROM ("
+    "SELECT c.code AS code, g.grade AS grade, "
+    "(SELECT m.id FROM major m WHERE m.code = c.code AND m.grade <= g.grade ORDER BY m.grade DESC, m.id DESC LIMIT 1) AS majorId "
+    "FROM (SELECT DISTINCT code FROM major WHERE code IS NOT NULL) c, (SELECT DISTINCT grade FROM major WHERE grade IS NOT NULL) g"
+    ") WHERE majorId IS NOT NULL "
+    "ON CONFLICT(code, grade) DO UPDATE SET majorId = excluded.majorId WHERE majorresolve.majorId != excluded.majorId"
+)
+MAJORRESOLVE_STALE_SQL = (
+    "DELETE FROM majorresolve WHERE grade NOT IN (SELECT grade FROM major WHERE grade IS NOT NULL) "
+    "OR NOT EXISTS (SELECT 1 FROM major m WHERE m.id = majorresolve.majorId AND m.code = majorresolve.code AND m.grade <= majorresolve.grade)"
+)
+
+# table, key column, label column (course fields use the same names)
+DIMENSIONS = (
+    ("language", "teachingLanguage", "teachingLanguageI18n"),
+    ("assessment", "assessmentMode", "assessmentModeI18n"),
+    ("campus", "campus", "campusI18n"),
+    ("faculty", "faculty", "facultyI18n"),
+)
+
+
+class DimensionStage:
+    """Globally keyed dimension rows merged across every calendar of a run.
+
+    The newest calendar wins a key's label (within a calendar the first course seen wins, as the
+    per-calendar export always did). The emitted upserts also refuse to let an older calendar
+    overwrite a label already written by a newer one in D1.
+    """
+
+    def __init__(self):
+        self.values = {table: {} for table, _, _ in DIMENSIONS}
+        self.majors = {}
+        self.teachers = {}
+
+    def _offer(self, bucket: dict, key, cid: int, value):
+        cur = bucket.get(key)
+        if cur is None or cid > cur[0]:
+            bucket[key] = (cid, value)
+
+    def add_course(self, cid: int, course: dict):
+        for table, key_col, label_col in DIMENSIONS:
+            key = norm_str(course.get(key_col))
+            if key:
+                self._offer(self.values[table], key, cid, norm_str(course.get(label_col)))
+
+        majors = course.get("majorList") or []
+        if isinstance(majors, list):
+            for mj in majors:
+                name = str(mj or "").strip()
+                if not name:
+                    continue
+                cur = self.majors.get(name)
+                if cur is None:
+                    self.majors[name] = (cid, parse_major_string(name))
+                elif cid > cur[0]:
+                    self.majors[name] = (cid, cur[1])
+
+        teachers = course.get("teacherList") or []
+        if isinstance(teachers, list):
+            for t in teachers:
+                tid = as_int(t.get("id")) if isinstance(t, dict) else None
+                if tid is not None:
+                    self._offer(self.teachers, tid, cid, (norm_str(t.get("teacherCode")), norm_str(t.get("teacherName"))))
+
+    def add_courses(self, cid: int, courses: list):
+        for course in courses:
+            if isinstance(course, dict):
+                self.add_course(cid, course)
+
+    def merge(self, other: "DimensionStage"):
+        for table in self.values:
+            for key, (cid, value) in other.values[table].items():
+                self._offer(self.values[table], key, cid, value)
+        for name, (cid, parsed) in other.majors.items():
+            self._offer(self.majors, name, cid, parsed)
+        for tid, (cid, value) in other.teachers.items():
+            self._offer(self.teachers, tid, cid, value)
+
+    def counts(self) -> dict:
+        out = {table: len(bucket) for table, bucket in self.values.items()}
+        out["major"] = len(self.majors)
+        out["teacherinfo"] = len(self.teachers)
+        return out
+
+    def statements(self):
+        """(sql, rows, batch) upserts for every staged dimension row (see sqlgen.write_statements), then the majorresolve refresh."""
+        out = []
+        for table, key_col, label_col in DIMENSIONS:
+            out.append(
+                (
+                    f"INSERT INTO {table} ({key_col}, {label_col}, calendarId) VALUES (?, ?, ?) "
+                    f"ON CONFLICT({key_col}) DO UPDATE SET "
+                    f"{label_col}=excluded.{label_col}, calendarId=excluded.calendarId "
+                    f"WHERE {table}.calendarId IS NULL OR excluded.calendarId >= {table}.calendarId",
+                    [(key, label, cid) for key, (cid, label) in sorted(self.values[table].items())],
+                    0,
+                )
+            )
+        out.append(
+            (
+                "INSERT INTO major (code, grade, name, calendarId) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "code=excluded.code, grade=excluded.grade, calendarId=excluded.calendarId "
+                "WHERE major.calendarId IS NULL OR excluded.calendarId >= major.calendarId",
+                [(parsed["code"], parsed["grade"], name, cid) for name, (cid, parsed) in sorted(self.majors.items())],
+                0,
+            )
+        )
+        out.append(
+            (
+                "INSERT INTO teacherinfo (id, teacherCode, teacherName, calendarId) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "teacherCode=excluded.teacherCode, teacherName=excluded.teacherName, calendarId=excluded.calendarId "
+                "WHERE teacherinfo.calendarId IS NULL OR excluded.calendarId >= teacherinfo.calendarId",
+                [(tid, code, name, cid) for tid, (cid, (code, name)) in sorted(self.teachers.items())],
+                TEACHER_BATCH,
+            )
+        )
+        out.append((MAJORRESOLVE_SQL, [()], 0))
+        out.append((MAJORRESOLVE_STALE_SQL, [()], 0))
+        return out
+
+    def write_sql(self, f):
+        write_statements(f, self.statements())
@@ -0,0 +1,252 @@
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+
+# Relative weights of the request mix (roughly the frontend's traffic: course search and major views dominate).
+DEFAULT_MIX = {
+    "findCourseByMajor": 20,
+    "findCourseBySearch": 25,
+    "findCourseByTime": 15,
+    "findCourseDetailByCode": 20,
+    "getAllCalendar": 10,
+    "reviewCourseSearch": 10,
+}
+SAMPLE_ROWS = 300
+CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]{2,}")
+PERCENTILES = (50, 95, 99)
+
+
+def _values(conn: sqlite3.Connection, sql: str, params=()) -> list:
+    try:
+        return [r[0] if len(r) == 1 else list(r) for r in conn.execute(sql, params)]
+    except sqlite3.OperationalError:
+        return []
+
+
+def _pick(rng: random.Random, values: list, limit: int = SAMPLE_ROWS) -> list:
+    return rng.sample(values, min(limit, len(values)))
+
+
+def search_terms(names, rng: random.Random, limit: int = SAMPLE_ROWS) -> list:
+    """Chinese substrings (2-3 characters) of course names, as typed into the search box."""
+    out = []
+    for name in names:
+        for run in CJK_RUN_RE.findall(str(name or "")):
+            size = min(len(run), rng.choice((2, 2, 3)))
+            start = rng.randrange(len(run) - size + 1)
+            out.append(run[start : start + size])
+    return list(dict.fromkeys(out))[:limit]
+
+
+def sample_pool(conn: sqlite3.Connection, calendar_id: int = None, seed: int = 1) -> dict:
+    """Request parameters drawn from the database the Worker serves (the local D1 file wrangler dev uses).
+
+    Deterministic for a given database and seed, so runs before and after a change replay the same requests.
+    """
+    rng = random.Random(seed)
+    if calendar_id is None:
+        latest = _values(conn, "SELECT MAX(calendarId) FROM coursedetail")
+        calendar_id = latest[0] if latest and latest[0] is not None else 0
+    majors = _values(
+        conn,
+        """SELECT DISTINCT m.code, m.grade FROM major m
+           JOIN majorandcourse mac ON mac.majorId = m.id
+           JOIN coursedetail cd ON cd.id = mac.courseId
+           WHERE cd.calendarId = ? AND m.code IS NOT NULL AND m.grade IS NOT NULL
+           ORDER BY 1, 2""",
+        (calendar_id,),
+    )
+    codes = _values(
+        conn, "SELECT DISTINCT courseCode FROM coursedetail WHERE calendarId = ? AND courseCode IS NOT NULL ORDER BY 1", (calendar_id,)
+    )
+    names = _values(
+        conn, "SELECT DISTINCT courseName FROM coursedetail WHERE calendarId = ? AND courseName IS NOT NULL ORDER BY 1", (calendar_id,)
+    )
+    teachers = _values(
+        conn,
+        """SELECT DISTINCT ti.teacherName FROM teacherinfo ti
+           JOIN teacherandclass tc ON tc.teacherId = ti.id
+           JOIN coursedetail cd ON cd.id = tc.teachingClassId
+           WHERE cd.calendarId = ? AND ti.teacherName IS NOT NULL ORDER BY 1""",
+        (calendar_id,),
+    )
+    review_names = _values(conn, "SELECT DISTINCT name FROM courses WHERE name IS NOT NULL ORDER BY 1")
+    terms = search_terms(_pick(rng, names), rng)
+    return {
+        "calendarId": calendar_id,
+        "majors": _pick(rng, majors),
+        "courseCodes": _pick(rng, codes),
+        "searchTerms": terms,
+        "teacherNames": _pick(rng, teachers),
+        # the review site's own course table when the database has it, otherwise the pk course names
+        "reviewTerms": search_terms(_pick(rng, review_names), rng) if review_names else terms,
+    }
+
+
+def build_request(name: str, pool: dict, rng: random.Random):
+    """(method, path, requests kwargs) for one request of endpoint ``name``."""
+    cid = pool["calendarId"]
+    if name == "findCourseByMajor":
+        code, grade = rng.choice(pool["majors"]) if pool["majors"] else ("", 0)
+        return "POST", "/api/findCourseByMajor", {"json": {"calendarId": cid, "code": code, "grade": grade}}
+    if name == "findCourseBySearch":
+        body = {"calendarId": cid}
+        pick = rng.random()
+        if pick < 0.6 and pool["searchTerms"]:
+            body["courseName"] = rng.choice(pool["searchTerms"])
+        elif pick < 0.8 and pool["teacherNames"]:
+            body["teacherName"] = rng.choice(pool["teacherNames"])
+        elif pool["courseCodes"]:
+            code = rng.choice(pool["courseCodes"])
+            body["courseCode"] = code[: max(3, len(code) - 2)]
+        return "POST", "/api/findCourseBySearch", {"json": body}
+    if name == "findCourseByTime":
+        day = rng.choice((1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 7))
+        return "POST", "/api/findCourseByTime", {"json": {"calendarId": cid, "day": day, "section": rng.randint(1, 6)}}
+    if name == "findCourseDetailByCode":
+        code = rng.choice(pool["courseCodes"]) if pool["courseCodes"] else ""
+        return "POST", "/api/findCourseDetailByCode", {"json": {"calendarId": cid, "courseCode": code}}
+    if name == "getAllCalendar":
+        return "GET", "/api/getAllCalendar", {}
+    if name == "reviewCourseSearch":
+        term = rng.choice(pool["reviewTerms"]) if pool["reviewTerms"] else ""
+        return "GET", "/api/courses", {"params": {"q": term, "page": 1, "limit": 20}}
+    raise ValueError(f"unknown endpoint {name}")
+
+
+def response_ok(name: str, res: requests.Response) -> bool:
+    if res.status_code >= 400:
+        return False
+    if name == "reviewCourseSearch":
+        return True
+    # pk routes answer {code: 200, msg, data} and report errors in the body
+    try:
+        return res.json().get("code") == 200
+    except ValueError:
+        return False
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """Per-endpoint and overall stats from (endpoint, ms, ok, status, bytes) samples."""
+    groups = {}
+    for s in samples:
+        groups.setdefault(s[0], []).append(s)
+    groups["all"] = samples
+    out = {}
+    for name, rows in groups.items():
+        ms = sorted(r[1] for r in rows)
+        errors = [r for r in rows if not r[2]]
+        statuses = {}
+        for r in errors:
+            statuses[str(r[3])] = statuses.get(str(r[3]), 0) + 1
+        out[name] = {
+            "requests": len(rows),
+            "errors": len(errors),
+            "errorRate": round(len(errors) / len(rows), 4) if rows else 0,
+            "throughput": round(len(rows) / elapsed, 2) if elapsed else 0,
+            "latencyMs": {
+                **{f"p{p}": round(percentile(ms, p), 2) for p in PERCENTILES},
+                "mean": round(sum(ms) / len(ms), 2) if ms else 0,
+                "max": round(ms[-1], 2) if ms else 0,
+            },
+            "bytes": sum(r[4] for r in rows),
+            "errorStatuses": statuses,
+        }
+    return out
+
+
+class LoadRunner:
+    """Closed-loop load generator: each worker thread sends the weighted mix back to back on its own keep-alive session."""
+
+    def __init__(self, base_url: str, pool: dict, mix: dict = None, seed: int = 1, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.pool = pool
+        self.mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.seed = seed
+        self.timeout = timeout
+
+    def _worker(self, wid: int, deadline: float, samples: list):
+        rng = random.Random(self.seed * 100_003 + wid)
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, kwargs = build_request(name, self.pool, rng)
+                t0 = time.perf_counter()
+                try:
+                    res = session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+                    ok, status, size = response_ok(name, res), res.status_code, len(res.content)
+                except requests.RequestException as e:
+                    ok, status, size = False, type(e).__name__, 0
+                samples.append((name, (time.perf_counter() - t0) * 1000, ok, status, size))
+
+    def run_stage(self, concurrency: int, seconds: float) -> dict:
+        samples = []
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(wid, start + seconds, samples), daemon=True) for wid in range(concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        return {"concurrency": concurrency, "durationSec": round(elapsed, 2), "endpoints": summarize(samples, elapsed)}
+
+    def run(self, ramp, seconds: float, warmup: float = 0) -> list:
+        if warmup > 0:
+            self.run_stage(ramp[0], warmup)
+        return [self.run_stage(c, seconds) for c in ramp]
+
+
+def compare_runs(current: dict, previous: dict) -> dict:
+    """p95/throughput/error-rate deltas per stage (matched by concurrency) and endpoint."""
+    prev_stages = {s["concurrency"]: s for s in previous.get("stages", [])}
+    out = {}
+    for stage in current.get("stages", []):
+        prev = prev_stages.get(stage["concurrency"])
+        if not prev:
+            continue
+        rows = {}
+        for name, cur in stage["endpoints"].items():
+            old = prev["endpoints"].get(name)
+            if not old:
+                continue
+            p95, old_p95 = cur["latencyMs"]["p95"], old["latencyMs"]["p95"]
+            rows[name] = {
+                "p95": {"current": p95, "previous": old_p95, "ratio": round(p95 / old_p95, 3) if old_p95 else None},
+                "throughput": {"current": cur["throughput"], "previous": old["throughput"]},
+                "errorRate": {"current": cur["errorRate"], "previous": old["errorRate"]},
+            }
+        out[str(stage["concurrency"])] = rows
+    return out
+
+
+def check_run(report: dict, max_error_rate: float = 0.0, max_p95_growth: float = 0.0, comparison: dict = None) -> list:
+    violations = []
+    for stage in report["stages"]:
+        for name, s in stage["endpoints"].items():
+            if max_error_rate and s["errorRate"] > max_error_rate:
+                violations.append(f"c={stage['concurrency']} {name}: error rate {s['errorRate']} > {max_error_rate}")
+    if max_p95_growth and comparison:
+        for concurrency, rows in comparison.items():
+            for name, row in rows.items():
+                ratio = row["p95"]["ratio"]
+                if ratio is not None and ratio > 1 + max_p95_growth:
+                    violations.append(
+                        f"c={concurrency} {name}: p95 {row['p95']['previous']}ms -> {row['p95']['current']}ms (x{ratio})"
+                    )
+    return violations
@@ -0,0 +1,151 @@
+import pathlib
+import sqlite3
+import time
+
+from .common import sql_value
+from .cost import MIGRATIONS_DIR, pk_migration_files, statement_class
+
+# wrangler dev / `wrangler d1 execute --local` keep each D1 database as one SQLite file here (relative to backend/)
+LOCAL_STATE_GLOB = ".wrangler/state/v3/d1/*/*.sqlite"
+
+# Connection-scoped only: journal_mode is persistent and belongs to wrangler, so it is left alone.
+LOAD_PRAGMAS = (
+    "PRAGMA synchronous = OFF",  # a crash mid-load only loses a dev cache that can be re-synced
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+)
+
+
+class LocalSchemaError(Exception):
+    pass
+
+
+def find_local_d1(backend_dir) -> pathlib.Path:
+    """The local D1 SQLite file under backend/.wrangler/state (the pk one when several databases exist)."""
+    candidates = [p for p in pathlib.Path(backend_dir).glob(LOCAL_STATE_GLOB) if p.name != "metadata.sqlite"]
+    if not candidates:
+        raise FileNotFoundError(
+            f"No local D1 database under {pathlib.Path(backend_dir) / '.wrangler/state'}; run `npm run db:init:local` first"
+        )
+    if len(candidates) > 1:
+        with_pk = []
+        for path in candidates:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coursedetail'").fetchone():
+                    with_pk.append(path)
+            finally:
+                conn.close()
+        candidates = with_pk or candidates
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def read_schema(conn: sqlite3.Connection) -> dict:
+    """{"tables": {table/view: [columns]}, "indexes": {index: table}} of a database, sqlite internals excluded."""
+    tables = {}
+    indexes = {}
+    for kind, name, table in conn.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master WHERE type IN ('table', 'view', 'index') AND name NOT LIKE 'sqlite_%'"
+    ):
+        if kind == "index":
+            indexes[name] = table
+        else:
+            tables[name] = [row[1] for row in conn.execute(f'PRAGMA table_info("{name}")')]
+    return {"tables": tables, "indexes": indexes}
+
+
+def migration_schema(migrations_dir=MIGRATIONS_DIR) -> dict:
+    """Tables/columns/indexes the pk migrations define, each mapped to the first migration file that creates it."""
+    conn = sqlite3.connect(":memory:")
+    owner = {"tables": {}, "columns": {}, "indexes": {}}
+    try:
+        for path in pk_migration_files(migrations_dir):
+            conn.executescript(path.read_text(encoding="utf-8-sig"))
+            schema = read_schema(conn)
+            for table, columns in schema["tables"].items():
+                owner["tables"].setdefault(table, path.name)
+                for column in columns:
+                    owner["columns"].setdefault((table, column), path.name)
+            for index in schema["indexes"]:
+                owner["indexes"].setdefault(index, path.name)
+            for index in set(owner["indexes"]) - set(schema["indexes"]):
+                del owner["indexes"][index]  # dropped again by a later migration
+    finally:
+        conn.close()
+    return owner
+
+
+def schema_problems(conn: sqlite3.Connection, migrations_dir=MIGRATIONS_DIR):
+    """(errors, warnings) of a database versus the pk migrations: missing tables/columns are errors, missing indexes warnings."""
+    expected = migration_schema(migrations_dir)
+    actual = read_schema(conn)
+    errors = []
+    warnings = []
+    for table, migration in expected["tables"].items():
+        if table not in actual["tables"]:
+            errors.append(f"missing table {table} (migrations/{migration})")
+    for (table, column), migration in expected["columns"].items():
+        if table in actual["tables"] and column not in actual["tables"][table]:
+            errors.append(f"missing column {table}.{column} (migrations/{migration})")
+    for index, migration in expected["indexes"].items():
+        if index not in actual["indexes"]:
+            warnings.append(f"missing index {index} (migrations/{migration})")
+    return errors, warnings
+
+
+def execute_statements(conn: sqlite3.Connection, statements, by_table: dict = None):
+    """Bind (sql, rows, batch) statements with executemany (the batch hint only matters for SQL files)."""
+    for sql, rows, _ in statements:
+        if not rows:
+            continue
+        conn.executemany(sql, ([sql_value(v) for v in row] for row in rows))
+        if by_table is not None:
+            _, table = statement_class(sql)
+            entry = by_table.setdefault(table, {"statements": 0, "rows": 0})
+            entry["statements"] += 1
+            entry["rows"] += len(rows)
+
+
+def apply_local(db_path, statement_groups, analyze: bool = True, migrations_dir=MIGRATIONS_DIR) -> dict:
+    """Write (sql, rows, batch) statement groups into a local D1 SQLite file with executemany in one transaction.
+
+    The groups run in order (dimension rows first); the schema is checked against the pk migrations
+    before anything is written, and ANALYZE refreshes planner stats afterwards.
+    """
+    t0 = time.time()
+    conn = sqlite3.connect(str(db_path), isolation_level=None, timeout=30)
+    try:
+        errors, warnings = schema_problems(conn, migrations_dir)
+        if errors:
+            raise LocalSchemaError(
+                "local D1 schema is behind the pk migrations (apply them with "
+                "`npx wrangler d1 execute jcourse-db --local --file=migrations/<file>`): " + "; ".join(errors)
+            )
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+
+        by_table = {}
+        changes = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statements in statement_groups:
+                execute_statements(conn, statements, by_table)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        changes = conn.total_changes - changes
+        load_sec = time.time() - t0
+
+        if analyze:
+            conn.execute("ANALYZE")
+        return {
+            "db": str(db_path),
+            "rowsChanged": changes,
+            "byTable": by_table,
+            "schemaWarnings": warnings,
+            "loadSec": round(load_sec, 3),
+            "elapsedSec": round(time.time() - t0, 3),
+        }
+    finally:
+        conn.close()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from .decode import decode_page
+
+MANUAL_ARRANGE_URL = "https://1.tongji.edu.cn/api/arrangementservice/manualArrange/page?profile"
+MANUAL_ARRANGE_HEADERS = {
+    "Content-Type": "application/json",
+    "Referer": "https://1.tongji.edu.cn/taskResultQuery",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36",
+}
+
+# Where an expired onesystem session gets redirected (the SSO login, see pk_crawler/utils/loginout.py).
+LOGIN_HOSTS = ("iam.tongji.edu.cn",)
+
+
+class SessionExpired(Exception):
+    pass
+
+
+def redirected_to_login(res: requests.Response) -> bool:
+    """Whether the request ended on the SSO login page instead of the API."""
+    if not res.history:
+        return False
+    url = urlsplit(res.url)
+    return url.hostname in LOGIN_HOSTS or "login" in url.path.lower()
+
+
+def fetch_manual_arrange_page(
+    session: requests.Session, calendar_id: int, page_num: int, page_size: int, attempts: int = 5, stats: dict = None
+):
+    # stats, when given, accumulates the response body size as "rawBytes" (the archive's size baseline).
+    payload = {
+        "condition": {
+            "trainingLevel": "",
+            "campus": "",
+            "calendar": calendar_id,
+            "college": "",
+            "course": "",
+            "ids": [],
+            "isChineseTeaching": None,
+        },
+        "pageNum_": page_num,
+        "pageSize_": page_size,
+    }
+
+    last_err = None
+    for attempt in range(1, attempts + 1):
+        try:
+            res = session.post(MANUAL_ARRANGE_URL, json=payload, headers=MANUAL_ARRANGE_HEADERS, timeout=120)
+            if res.status_code in (401, 403):
+                raise SessionExpired(f"HTTP {res.status_code}")
+            if redirected_to_login(res):
+                raise SessionExpired(f"redirected to {res.url}")
+            if res.status_code in (429, 500, 502, 503, 504):
+                raise requests.HTTPError(f"HTTP {res.status_code}", response=res)
+            res.raise_for_status()
+            try:
+                # Projected records (decode.COURSE_FIELDS) instead of the full res.json() tree.
+                page = decode_page(res.content)
+            except ValueError as e:
+                # Truncated bodies and gateway html pages are retried; an expired session was caught above.
+                raise ValueError(f"non-json response (HTTP {res.status_code}, {len(res.content)} bytes)") from e
+            if stats is not None:
+                stats["rawBytes"] = stats.get("rawBytes", 0) + len(res.content)
+            return page
+        except SessionExpired:
+            raise
+        except Exception as e:
+            last_err = e
+            if attempt >= attempts:
+                break
+            sleep_s = min(10, 1 + attempt * 2)
+            print(
+                f"[warn] manualArrange/page failed (calendarId={calendar_id} page={page_num} attempt={attempt}): {e}. retry in {sleep_s}s",
+                file=sys.stderr,
+            )
+            time.sleep(sleep_s)
+    raise last_err  # type: ignore[misc]
+
+
+def page_total_and_list(resp: dict):
+    data = (resp or {}).get("data") or {}
+    total = int(data.get("total_") or 0)
+    lst = data.get("list") or []
+    if not isinstance(lst, list):
+        lst = []
+    return total, lst
+
+
+def fetch_calendar_courses(session: requests.Session, calendar_id: int, page_size: int, stats: dict = None):
+    first = fetch_manual_arrange_page(session, calendar_id, 1, page_size, stats=stats)
+    total, first_list = page_total_and_list(first)
+
+    total_pages = (total // page_size) + 1
+    courses = list(first_list)
+    for page in range(2, total_pages + 1):
+        nxt = fetch_manual_arrange_page(session, calendar_id, page, page_size, stats=stats)
+        _, lst = page_total_and_list(nxt)
+        if lst:
+            courses.extend(lst)
+    return courses
+
+
+def content_hash(obj) -> str:
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def probe_fingerprint(session: requests.Session, calendar_id: int, page_size: int):
+    # Cheap change detection: total_ plus a hash of page 1 only (no retries, the caller reschedules).
+    resp = fetch_manual_arrange_page(session, calendar_id, 1, page_size, attempts=1)
+    total, lst = page_total_and_list(resp)
+    return {"total": total, "hash": content_hash(lst)}
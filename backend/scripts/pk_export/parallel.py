@@ -0,0 +1,114 @@
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from .dimensions import DimensionStage
+from .sqlgen import (
+    CALENDAR_BODY,
+    calendar_head_statements,
+    calendar_rows,
+    calendar_tail_statements,
+    merge_calendar_rows,
+    write_calendar_header,
+    write_statements,
+)
+
+# Below this many courses per slice, shipping a slice to a worker and its rows back costs more than building it here.
+MIN_SLICE_COURSES = 1000
+
+
+def split_courses(courses: list, slices: int) -> list:
+    """Consecutive slices of the course list, so merging them in order keeps every first-seen value of a serial pass."""
+    n = max(1, min(slices, len(courses) // MIN_SLICE_COURSES))
+    size = -(-len(courses) // n) or 1
+    return [courses[i : i + size] for i in range(0, len(courses), size)] or [[]]
+
+
+def generate_slice(cid: int, courses: list, fragment_path: str):
+    """Worker: render one slice's SQL into its fragment file, CALENDAR_BODY entry by entry.
+
+    Returns the slice's rows, the byte offsets of each entry in the fragment (len(CALENDAR_BODY) + 1)
+    and its dimension rows; the SQL text itself stays on disk.
+    """
+    rows = calendar_rows(cid, courses)
+    offsets = [0]
+    with open(fragment_path, "wb") as f:
+        for key, sql, batch in CALENDAR_BODY:
+            buf = io.StringIO()
+            write_statements(buf, [(sql, rows[key], batch)])
+            offsets.append(offsets[-1] + f.write(buf.getvalue().encode("utf-8")))
+    stage = DimensionStage()
+    stage.add_courses(cid, courses)
+    return rows, offsets, stage
+
+
+class CalendarSql:
+    """One calendar generated in slices: the merged statements (local D1 load, checksums), the slices'
+    fragment files and their merged dimension rows."""
+
+    def __init__(self, cid: int, results: list, fragment_paths: list, source: str = "action"):
+        merged = merge_calendar_rows([rows for rows, _, _ in results])
+        self.fragments = [(path, offsets) for path, (_, offsets, _) in zip(fragment_paths, results)]
+        self.slices = [{"teachingClasses": rows["inserted"], "sqlBytes": offsets[-1]} for rows, offsets, _ in results]
+        # first-seen labels within the calendar: merge the slice stages in slice order
+        self.dimensions = DimensionStage()
+        for _, _, stage in results:
+            self.dimensions.merge(stage)
+        self.head = calendar_head_statements(cid, merged)
+        self.tail = calendar_tail_statements(cid, source)
+        # what calendar_statements(cid, courses) returns for the whole calendar
+        self.statements = self.head + [(sql, merged[key], batch) for key, sql, batch in CALENDAR_BODY] + self.tail
+        self.inserted = merged["inserted"]
+
+    def write(self, f):
+        """Same statements as write_calendar_statements(f, self.statements) into a text file opened on disk;
+        batched VALUES may split at other rows."""
+        write_calendar_header(f)
+        write_statements(f, self.head)
+        f.flush()
+        # table by table, each table's fragments in slice order (as one pass over the whole calendar would)
+        for i in range(len(CALENDAR_BODY)):
+            for path, offsets in self.fragments:
+                with open(path, "rb") as src:
+                    src.seek(offsets[i])
+                    f.buffer.write(src.read(offsets[i + 1] - offsets[i]))
+        f.buffer.flush()
+        write_statements(f, self.tail)
+
+
+class ParallelCalendarGenerator:
+    """Build calendar rows and render their SQL on a process pool, one consecutive course slice per task.
+
+    Each worker writes its slice's SQL to a fragment file under ``work_dir`` (a temporary directory by
+    default); only rows and offsets come back through the pool.
+    """
+
+    def __init__(self, jobs: int = 0, work_dir=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self.own_dir = work_dir is None
+        self.work_dir = pathlib.Path(tempfile.mkdtemp(prefix="pk-sync-fragments-") if work_dir is None else work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    def generate(self, cid: int, courses: list, source: str = "action") -> CalendarSql:
+        slices = split_courses(courses, self.jobs)
+        paths = [str(self.work_dir / f"pk-sync-{cid}.{i:03d}.part") for i in range(len(slices))]
+        if len(slices) == 1:
+            results = [generate_slice(cid, slices[0], paths[0])]
+        else:
+            results = list(self.executor.map(generate_slice, [cid] * len(slices), slices, paths))
+        return CalendarSql(cid, results, paths, source=source)
+
+    def close(self):
+        self.executor.shutdown()
+        if self.own_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,523 @@
+import io
+import re
+import sqlite3
+import statistics
+import time
+
+from .sqlgen import write_calendar_sql
+
+OPTIONAL_LABEL_IDS = [947, 955, 956, 957, 958]
+# what optCourseQueryListGenerator(1, 1) in src/pk/utils.ts binds for the arrangeinfo fallback of findCourseByTime
+LEGACY_TIME_PATTERN = "%星期一1-2%"
+
+# advisor acceptance thresholds (timed median with the index / without)
+MIN_SPEEDUP = 0.9
+MAX_SIDE_SLOWDOWN = 1.25
+
+PLAN_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+PLAN_SEARCH_RE = re.compile(r"^SEARCH (?:TABLE )?(\w+)")
+PLAN_AUTO_RE = re.compile(r"AUTOMATIC (?:PARTIAL )?(?:COVERING )?INDEX ON (\w+)")
+TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b|ORDER\b|LIMIT\b)(\w+))?", re.IGNORECASE)
+PREDICATE_RE = re.compile(r"(?<![\w.])(?:(\w+)\.)?(\w+)\s*(=|<=|>=|<|>|\bIN\b|\bLIKE\b)", re.IGNORECASE)
+ORDER_RE = re.compile(r"\b(?:ORDER|GROUP)\s+BY\s+(.+?)(?=\bLIMIT\b|\bORDER\b|\)|$)", re.IGNORECASE | re.DOTALL)
+
+
+def _qmarks(n: int) -> str:
+    return ",".join("?" for _ in range(n))
+
+
+# Mirrors the SQL in src/pk/routes.ts (dynamic IN lists use a fixed placeholder count); tests/test_plans.py
+# fails when an entry no longer matches a query string there.
+# params(s) builds the bind list from sample_values().
+ROUTE_QUERIES = (
+    {
+        "name": "getAllCalendar",
+        "sql": "SELECT calendarId as calendarId, calendarIdI18n as calendarName FROM calendar ORDER BY calendarId DESC LIMIT 8",
+        "params": lambda s: [],
+    },
+    {"name": "getAllCampus", "sql": "SELECT campus as campusId, campusI18n as campusName FROM campus", "params": lambda s: []},
+    {"name": "getAllFaculty", "sql": "SELECT faculty as facultyId, facultyI18n as facultyName FROM faculty", "params": lambda s: []},
+    {
+        "name": "findGradeByCalendarId",
+        "sql": """SELECT DISTINCT m.grade as grade
+       FROM major m
+       JOIN majorandcourse mac ON mac.majorId = m.id
+       JOIN coursedetail c ON c.id = mac.courseId
+       WHERE c.calendarId = ?
+       ORDER BY m.grade DESC""",
+        "params": lambda s: [s["calendarId"]],
+    },
+    {
+        "name": "findMajorByGrade",
+        "sql": "SELECT code, name FROM major WHERE grade = ? ORDER BY code ASC",
+        "params": lambda s: [s["grade"]],
+    },
+    {
+        "name": "resolveMajor",
+        "sql": """SELECT r.majorId as majorId, mc.courseIds as courseIds, mc.ownCourseIds as ownCourseIds
+         FROM majorresolve r
+         LEFT JOIN majorcourses mc ON mc.calendarId = ? AND mc.majorId = r.majorId
+         WHERE r.code = ? AND r.grade = ?""",
+        "params": lambda s: [s["calendarId"], s["majorCode"], s["grade"]],
+    },
+    {
+        "name": "findCourseByMajor.majorId",
+        "sql": "SELECT id FROM major WHERE code = ? AND grade <= ? ORDER BY grade DESC, id DESC LIMIT 1",
+        "params": lambda s: [s["majorCode"], s["grade"]],
+    },
+    {
+        "name": "findCourseByMajor.classesByIds",
+        "sql": """SELECT
+             cd.*,
+             f.facultyI18n as facultyI18n,
+             ca.campusI18n as campusI18n,
+             n.courseLabelName as courseLabelName,
+             l.teachingLanguageI18n as teachingLanguageI18n,
+             CASE WHEN cd.id IN (SELECT value FROM json_each(?)) THEN 1 ELSE 0 END as isExclusive
+           FROM coursedetail cd
+           LEFT JOIN faculty f ON f.faculty = cd.faculty
+           LEFT JOIN campus ca ON ca.campus = cd.campus
+           LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+           LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
+           WHERE cd.id IN (SELECT value FROM json_each(?))
+           ORDER BY cd.courseCode ASC, cd.code ASC""",
+        "params": lambda s: [s["ownCourseIds"], s["courseIds"]],
+    },
+    {
+        "name": "findCourseByMajor.classes",
+        "sql": """SELECT
+           cd.*,
+           f.facultyI18n as facultyI18n,
+           ca.campusI18n as campusI18n,
+           n.courseLabelName as courseLabelName,
+           l.teachingLanguageI18n as teachingLanguageI18n,
+           CASE
+             WHEN ? IS NOT NULL AND EXISTS (
+               SELECT 1 FROM majorandcourse mac2 WHERE mac2.majorId = ? AND mac2.courseId = cd.id
+             ) THEN 1
+             ELSE 0
+           END as isExclusive
+         FROM coursedetail cd
+         JOIN majorandcourse mac ON mac.courseId = cd.id
+         JOIN major m ON m.id = mac.majorId
+         LEFT JOIN faculty f ON f.faculty = cd.faculty
+         LEFT JOIN campus ca ON ca.campus = cd.campus
+         LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+         LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
+         WHERE cd.calendarId = ?
+           AND m.code = ?
+           AND m.grade <= ?
+         ORDER BY cd.courseCode ASC, cd.code ASC""",
+        "params": lambda s: [s["majorId"], s["majorId"], s["calendarId"], s["majorCode"], s["grade"]],
+    },
+    {
+        "name": "teachersByClasses",
+        "sql": f"""SELECT teachingClassId, teacherCode, teacherName, arrangeInfoText
+           FROM teacher_by_class
+           WHERE teachingClassId IN ({_qmarks(10)})""",
+        "params": lambda s: s["classIds"],
+    },
+    {
+        "name": "getTeachers",
+        "sql": "SELECT teacherCode, teacherName, arrangeInfoText FROM teacher_by_class WHERE teachingClassId = ?",
+        "params": lambda s: s["classIds"][:1],
+    },
+    {
+        "name": "findOptionalCourseType",
+        "sql": f"""SELECT DISTINCT n.courseLabelId as courseLabelId, n.courseLabelName as courseLabelName
+      FROM coursenature_by_calendar n
+      JOIN coursedetail cd ON cd.courseLabelId = n.courseLabelId AND cd.calendarId = n.calendarId
+      WHERE n.calendarId = ?
+        AND n.courseLabelId IN ({_qmarks(len(OPTIONAL_LABEL_IDS))})
+      ORDER BY n.courseLabelId DESC""",
+        "params": lambda s: [s["calendarId"], *OPTIONAL_LABEL_IDS],
+    },
+    {
+        "name": "findCourseByNatureId",
+        "sql": f"""SELECT
+             cd.courseLabelId as courseLabelId,
+             n.courseLabelName as courseLabelName,
+             cd.courseCode as courseCode,
+             cd.courseName as courseName,
+             f.facultyI18n as facultyI18n,
+             MAX(cd.credit) as credit,
+             GROUP_CONCAT(DISTINCT ca.campusI18n) as campus_list
+           FROM coursedetail cd
+           LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+           LEFT JOIN faculty f ON f.faculty = cd.faculty
+           LEFT JOIN campus ca ON ca.campus = cd.campus
+           WHERE cd.calendarId = ?
+             AND cd.courseLabelId IN ({_qmarks(len(OPTIONAL_LABEL_IDS))})
+           GROUP BY cd.courseLabelId, cd.courseCode, cd.courseName, f.facultyI18n
+           ORDER BY cd.courseLabelId DESC, cd.courseCode ASC""",
+        "params": lambda s: [s["calendarId"], *OPTIONAL_LABEL_IDS],
+    },
+    {
+        "name": "findCourseDetailByCode",
+        "sql": f"""SELECT
+             cd.*,
+             ca.campusI18n as campusI18n,
+             l.teachingLanguageI18n as teachingLanguageI18n
+           FROM coursedetail cd
+           LEFT JOIN campus ca ON ca.campus = cd.campus
+           LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
+           WHERE cd.calendarId = ?
+             AND cd.courseCode IN ({_qmarks(5)})
+           ORDER BY cd.courseCode ASC, cd.code ASC""",
+        "params": lambda s: [s["calendarId"], *s["courseCodes"]],
+    },
+    {
+        "name": "findCourseBySearch",
+        "sql": """SELECT
+        cd.courseCode as courseCode,
+        cd.courseName as courseName,
+        f.facultyI18n as facultyI18n,
+        GROUP_CONCAT(DISTINCT n.courseLabelName) as courseNature,
+        GROUP_CONCAT(DISTINCT ca.campusI18n) as campus_list,
+        MAX(cd.credit) as credit
+      FROM coursedetail cd
+      LEFT JOIN faculty f ON f.faculty = cd.faculty
+      LEFT JOIN campus ca ON ca.campus = cd.campus
+      LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+      WHERE cd.calendarId = ? AND cd.courseName LIKE ?
+        AND EXISTS (SELECT 1 FROM teacher_by_class t WHERE t.teachingClassId = cd.id AND t.teacherName LIKE ?)
+      GROUP BY cd.courseCode, cd.courseName, f.facultyI18n
+      ORDER BY cd.courseCode ASC
+      LIMIT 100""",
+        "params": lambda s: [s["calendarId"], "%课程%", f"%{s['teacherName']}%"],
+    },
+    {
+        "name": "findCourseByTime.hasArrangement",
+        "sql": "SELECT 1 as ok FROM arrangement WHERE calendarId = ? LIMIT 1",
+        "params": lambda s: [s["calendarId"]],
+    },
+    {
+        "name": "findCourseByTime.arrangement",
+        "sql": f"""SELECT
+        cd.courseCode as courseCode,
+        cd.courseName as courseName,
+        f.facultyI18n as faculty,
+        MAX(cd.credit) as credit,
+        GROUP_CONCAT(DISTINCT n.courseLabelName) as courseNature,
+        GROUP_CONCAT(DISTINCT ca.campusI18n) as campus
+      FROM coursedetail cd
+      JOIN (
+        SELECT DISTINCT a.teachingClassId as teachingClassId
+        FROM arrangement a
+        WHERE a.calendarId = ? AND a.weekday = ? AND a.startPeriod = ? AND a.endPeriod IN (?)
+      ) a ON a.teachingClassId = cd.id
+      LEFT JOIN faculty f ON f.faculty = cd.faculty
+      LEFT JOIN campus ca ON ca.campus = cd.campus
+      LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+      WHERE cd.calendarId = ?
+        AND cd.courseLabelId IN ({_qmarks(len(OPTIONAL_LABEL_IDS))})
+      GROUP BY cd.courseCode, cd.courseName, f.facultyI18n
+      ORDER BY cd.courseCode ASC""",
+        "params": lambda s: [s["calendarId"], 1, 1, 2, s["calendarId"], *OPTIONAL_LABEL_IDS],
+    },
+    {
+        "name": "findCourseByTime.legacy",
+        "sql": f"""SELECT
+        cd.courseCode as courseCode,
+        cd.courseName as courseName,
+        f.facultyI18n as faculty,
+        MAX(cd.credit) as credit,
+        GROUP_CONCAT(DISTINCT n.courseLabelName) as courseNature,
+        GROUP_CONCAT(DISTINCT ca.campusI18n) as campus
+      FROM coursedetail cd
+      JOIN (
+        SELECT ai.teachingClassId as teachingClassId
+        FROM arrangeinfo ai
+        WHERE ai.arrangeInfoText LIKE ?
+      ) a ON a.teachingClassId = cd.id
+      LEFT JOIN faculty f ON f.faculty = cd.faculty
+      LEFT JOIN campus ca ON ca.campus = cd.campus
+      LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+      WHERE cd.calendarId = ?
+        AND cd.courseLabelId IN ({_qmarks(len(OPTIONAL_LABEL_IDS))})
+      GROUP BY cd.courseCode, cd.courseName, f.facultyI18n
+      ORDER BY cd.courseCode ASC""",
+        "params": lambda s: [LEGACY_TIME_PATTERN, s["calendarId"], *OPTIONAL_LABEL_IDS],
+    },
+    {
+        "name": "getLatestUpdateTime",
+        "sql": "SELECT fetchTime FROM fetchlog ORDER BY fetchTime DESC LIMIT 1",
+        "params": lambda s: [],
+    },
+    {
+        "name": "getLatestCourseInfo.isExclusive",
+        "sql": f"SELECT courseId FROM majorandcourse WHERE majorId = ? AND courseId IN ({_qmarks(10)})",
+        "params": lambda s: [s["majorId"], *s["classIds"]],
+    },
+)
+
+
+def exporter_deletes(cid: int):
+    """The per-calendar DELETE statements pk-sync-{cid}.sql starts with (taken from sqlgen itself)."""
+    buf = io.StringIO()
+    write_calendar_sql(buf, cid, [])
+    return [line.rstrip(";") for line in buf.getvalue().splitlines() if line.startswith("DELETE ")]
+
+
+def sample_values(conn: sqlite3.Connection) -> dict:
+    row = conn.execute("SELECT MAX(calendarId) FROM coursedetail").fetchone()
+    cid = row[0] if row and row[0] is not None else 0
+    major = conn.execute(
+        """SELECT m.id, m.code, m.grade FROM major m
+           JOIN majorandcourse mac ON mac.majorId = m.id
+           JOIN coursedetail cd ON cd.id = mac.courseId
+           WHERE cd.calendarId = ? AND m.code IS NOT NULL AND m.grade IS NOT NULL
+           GROUP BY m.id ORDER BY COUNT(*) DESC LIMIT 1""",
+        (cid,),
+    ).fetchone() or (0, "", 0)
+    class_ids = [r[0] for r in conn.execute("SELECT id FROM coursedetail WHERE calendarId = ? ORDER BY id LIMIT 10", (cid,))]
+    codes = [r[0] for r in conn.execute("SELECT DISTINCT courseCode FROM coursedetail WHERE calendarId = ? ORDER BY courseCode LIMIT 5", (cid,))]
+    teacher = conn.execute("SELECT teacherName FROM teacherinfo WHERE teacherName IS NOT NULL LIMIT 1").fetchone()
+    lists = conn.execute("SELECT courseIds, ownCourseIds FROM majorcourses WHERE calendarId = ? AND majorId = ?", (cid, major[0])).fetchone()
+    return {
+        "calendarId": cid,
+        "majorId": major[0],
+        "majorCode": major[1],
+        "grade": major[2],
+        "classIds": (class_ids + [0] * 10)[:10],
+        "courseCodes": (codes + [""] * 5)[:5],
+        "teacherName": teacher[0] if teacher else "",
+        "courseIds": lists[0] if lists else "[]",
+        "ownCourseIds": lists[1] if lists else "[]",
+    }
+
+
+def query_catalog(sample: dict):
+    out = [(q["name"], q["sql"], q["params"](sample), False) for q in ROUTE_QUERIES]
+    for sql in exporter_deletes(sample["calendarId"]):
+        table = sql.split()[2]
+        out.append((f"export.delete.{table}", sql, [], True))
+    return out
+
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> list:
+    return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def _subqueries(plan: list) -> set:
+    return {d.split()[-1] for d in plan if d.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+
+
+def plan_flags(plan: list, aliases: dict) -> list:
+    """Full scans, index scans, automatic indexes and temp B-trees found in a query plan."""
+    subqueries = _subqueries(plan)
+    flags = []
+    for detail in plan:
+        m = PLAN_SCAN_RE.match(detail)
+        if m and m.group(1) not in subqueries:
+            table = aliases.get(m.group(1), m.group(1))
+            flags.append(("index-scan:" if "INDEX" in m.group(2) else "full-scan:") + table)
+        m = PLAN_AUTO_RE.search(detail)
+        if m:
+            flags.append("auto-index:" + aliases.get(m.group(1), m.group(1)))
+        if detail.startswith("USE TEMP B-TREE"):
+            flags.append("temp-btree:" + detail[len("USE TEMP B-TREE FOR "):].lower())
+    return sorted(set(flags))
+
+
+def plan_score(plan: list, aliases: dict, row_counts: dict) -> float:
+    subqueries = _subqueries(plan)
+    score = 0.0
+    for detail in plan:
+        m = PLAN_SCAN_RE.match(detail)
+        if m and m.group(1) not in subqueries:
+            rows = row_counts.get(aliases.get(m.group(1), m.group(1)), 100)
+            score += rows / 2 if "INDEX" in m.group(2) else rows
+        elif PLAN_SEARCH_RE.match(detail):
+            score += 1
+        m = PLAN_AUTO_RE.search(detail)
+        if m:
+            score += row_counts.get(aliases.get(m.group(1), m.group(1)), 100)
+        if detail.startswith("USE TEMP B-TREE"):
+            score += 10
+    return score
+
+
+def time_query(conn: sqlite3.Connection, sql: str, params, repeat: int, write: bool) -> float:
+    runs = []
+    for _ in range(max(1, repeat)):
+        if write:
+            conn.execute("SAVEPOINT pk_plan")
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        runs.append((time.perf_counter() - start) * 1000)
+        if write:
+            conn.execute("ROLLBACK TO pk_plan")
+            conn.execute("RELEASE pk_plan")
+    return round(statistics.median(runs), 3)
+
+
+def _table_aliases(sql: str, tables: set) -> dict:
+    aliases = {}
+    for m in TABLE_REF_RE.finditer(sql):
+        table = m.group(1)
+        if table in tables:
+            aliases[m.group(2) or table] = table
+            aliases.setdefault(table, table)
+    return aliases
+
+
+def index_candidates(sql: str, columns: dict, existing: list) -> list:
+    """Composite index candidates per table: equality columns, then range, then ORDER/GROUP BY."""
+    aliases = _table_aliases(sql, set(columns))
+    single = len({t for t in aliases.values()}) == 1
+    preds = {}
+    for m in PREDICATE_RE.finditer(sql):
+        alias, col, op = m.group(1), m.group(2), m.group(3).upper()
+        if alias is None and not single:
+            continue
+        table = aliases.get(alias) if alias else next(iter(aliases.values()), None)
+        if not table or col not in columns[table] or op == "LIKE":
+            continue
+        kind = "eq" if op in ("=", "IN") else "range"
+        bucket = preds.setdefault(table, {"eq": [], "range": [], "order": []})
+        if col not in bucket[kind]:
+            bucket[kind].append(col)
+
+    for m in ORDER_RE.finditer(sql):
+        for item in m.group(1).split(","):
+            parts = item.strip().split()
+            if not parts:
+                continue
+            alias, _, col = parts[0].rpartition(".")
+            table = aliases.get(alias) if alias else (next(iter(aliases.values()), None) if single else None)
+            if table and col in columns[table]:
+                bucket = preds.setdefault(table, {"eq": [], "range": [], "order": []})
+                if col not in bucket["order"]:
+                    bucket["order"].append(col)
+
+    out = []
+    for table, b in preds.items():
+        eq = b["eq"]
+        for cols in (eq + b["range"], eq + [c for c in b["order"] if c not in eq], eq + [c for c in b["range"] + b["order"] if c not in eq]):
+            dedup = list(dict.fromkeys(cols))
+            if not dedup or any(e[0] == table and e[1][: len(dedup)] == dedup for e in existing):
+                continue
+            cand = (table, dedup)
+            if cand not in out:
+                out.append(cand)
+    return out
+
+
+def index_name(table: str, cols: list) -> str:
+    return f"idx_{table}_" + "_".join(cols)
+
+
+class PlanChecker:
+    """Run every route query and exporter DELETE against a loaded pk database."""
+
+    def __init__(self, conn: sqlite3.Connection, repeat: int = 5):
+        self.conn = conn
+        self.repeat = repeat
+        self.tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        self.columns = {t: [r[1] for r in conn.execute(f'PRAGMA table_info("{t}")')] for t in self.tables}
+        self.row_counts = {t: conn.execute(f'SELECT count(*) FROM "{t}"').fetchone()[0] for t in self.tables}
+        self.index_names = {}
+        for t in self.tables:
+            for idx in conn.execute(f'PRAGMA index_list("{t}")'):
+                self.index_names[idx[1]] = (t, [r[2] for r in conn.execute(f'PRAGMA index_info("{idx[1]}")')])
+        self.existing = list(self.index_names.values())
+
+    def run(self) -> dict:
+        sample = sample_values(self.conn)
+        results = {}
+        for name, sql, params, write in query_catalog(sample):
+            plan = explain(self.conn, sql, params)
+            aliases = _table_aliases(sql, set(self.tables))
+            results[name] = {
+                "plan": plan,
+                "flags": plan_flags(plan, aliases),
+                "score": plan_score(plan, aliases, self.row_counts),
+                "ms": time_query(self.conn, sql, params, self.repeat, write),
+                "sql": sql,
+                "params": params,
+                "write": write,
+            }
+        return {"sample": sample, "rowCounts": self.row_counts, "queries": results}
+
+    def _what_if(self, report: dict, table: str, cols: list) -> dict:
+        """Plan and median ms of every read query whose plan changes under a what-if index."""
+        changed = {}
+        self.conn.execute("SAVEPOINT pk_advise")
+        try:
+            self.conn.execute(f'CREATE INDEX "{index_name(table, cols)}" ON "{table}" ({", ".join(cols)})')
+            for name, q in report["queries"].items():
+                if q["write"]:
+                    continue
+                plan = explain(self.conn, q["sql"], q["params"])
+                if plan != q["plan"]:
+                    changed[name] = (plan, time_query(self.conn, q["sql"], q["params"], self.repeat, write=False))
+        finally:
+            self.conn.execute("ROLLBACK TO pk_advise")
+            self.conn.execute("RELEASE pk_advise")
+        return changed
+
+    def advise(self, report: dict) -> list:
+        """What-if search: try each candidate index in a savepoint and keep the best one for a flagged query.
+
+        A candidate must appear in the query's plan and lower its plan score. Every read query whose plan
+        changes is then timed; the candidate is kept only when the query gets at least MIN_SPEEDUP faster
+        and no other query gets more than MAX_SIDE_SLOWDOWN slower (a wider index can lure the planner
+        into an index-ordered walk that costs more than the sort it avoids). Index upkeep on writes is
+        left to pk-d1-cost.
+        """
+        proposals = {}
+        timings = {}
+        for name, q in report["queries"].items():
+            if not q["flags"] or q["write"]:
+                continue
+            ranked = []
+            for table, cols in index_candidates(q["sql"], self.columns, self.existing):
+                key = index_name(table, cols)
+                if key not in timings:
+                    timings[key] = self._what_if(report, table, cols)
+                changed = timings[key]
+                if name not in changed or key not in " ".join(changed[name][0]):
+                    continue
+                plan, ms = changed[name]
+                score = plan_score(plan, _table_aliases(q["sql"], set(self.tables)), self.row_counts)
+                if score < q["score"]:
+                    ranked.append((score, table, cols, plan, ms, changed))
+
+            for score, table, cols, plan, ms, changed in sorted(ranked, key=lambda r: r[0]):
+                if ms > q["ms"] * MIN_SPEEDUP:
+                    continue
+                before = report["queries"]
+                if any(t > before[n]["ms"] * MAX_SIDE_SLOWDOWN and t - before[n]["ms"] > 0.1 for n, (_, t) in changed.items()):
+                    continue
+                key = index_name(table, cols)
+                supersedes = [i for i, (t, c) in self.index_names.items() if t == table and c == cols[: len(c)] and not i.startswith("sqlite_")]
+                p = proposals.setdefault(key, {"index": key, "table": table, "columns": cols, "supersedes": supersedes, "queries": []})
+                p["queries"].append({"name": name, "scoreBefore": q["score"], "scoreAfter": score, "msBefore": q["ms"], "msAfter": ms, "planAfter": plan})
+                break
+        return sorted(proposals.values(), key=lambda p: p["index"])
+
+
+def migration_sql(proposals: list) -> str:
+    lines = ["-- Composite indexes proposed by scripts/pk-plan-check.py for pk route / exporter queries", ""]
+    for p in proposals:
+        lines.append(f"-- {', '.join(q['name'] for q in p['queries'])}")
+        if p["supersedes"]:
+            lines.append(f"-- makes {', '.join(p['supersedes'])} redundant (column prefix); drop once no plan depends on it")
+        lines.append(f"CREATE INDEX IF NOT EXISTS {p['index']} ON {p['table']}({', '.join(p['columns'])});")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def compare_baseline(report: dict, baseline: dict, max_slowdown: float = 0.0) -> list:
+    regressions = []
+    for name, q in report["queries"].items():
+        base = (baseline.get("queries") or {}).get(name)
+        if base is None:
+            continue
+        new_flags = sorted(set(q["flags"]) - set(base.get("flags") or []))
+        if new_flags:
+            regressions.append(f"{name}: new plan flags {', '.join(new_flags)}")
+        if max_slowdown and base.get("ms") and q["ms"] > base["ms"] * max_slowdown:
+            regressions.append(f"{name}: {q['ms']}ms > {max_slowdown}x baseline {base['ms']}ms")
+    return regressions
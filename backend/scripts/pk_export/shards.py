@@ -0,0 +1,272 @@
+import hashlib
+import json
+import pathlib
+import re
+import time
+
+from .arrangement import arrangement_info_objs
+from .common import as_int, norm_str, parse_major_string
+from .conflicts import conflict_shards
+
+SHARD_FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+
+SAFE_KEY_RE = re.compile(r"[^0-9A-Za-z_.-]")
+
+
+def shard_name(value) -> str:
+    return SAFE_KEY_RE.sub("_", str(value)) or "_"
+
+
+def dumps_compact(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=False).encode("utf-8")
+
+
+def _teachers(course: dict):
+    out = []
+    for t in course.get("teacherList") or []:
+        if isinstance(t, dict):
+            out.append({"teacherCode": norm_str(t.get("teacherCode")) or "", "teacherName": norm_str(t.get("teacherName")) or ""})
+    return out
+
+
+def _num(value):
+    try:
+        n = float(value or 0)
+    except Exception:
+        return 0
+    return int(n) if n.is_integer() else n
+
+
+def _class_view(course: dict):
+    return {
+        "id": as_int(course.get("id")),
+        "code": norm_str(course.get("code")) or "",
+        "teachers": _teachers(course),
+        "campus": norm_str(course.get("campusI18n")) or "",
+        "teachingLanguage": norm_str(course.get("teachingLanguageI18n")) or "",
+        "arrangementInfo": arrangement_info_objs(course.get("arrangeInfo")),
+    }
+
+
+def known_majors(conn) -> dict:
+    """name -> (code, grade, id) of every major in a pk database (local D1), for build_calendar_shards."""
+    return {row[0]: (row[1], row[2], row[3]) for row in conn.execute("SELECT name, code, grade, id FROM major WHERE name IS NOT NULL")}
+
+
+def _resolve_major(code: str, grade: int, names: list, known: dict = None):
+    """Name of the major majorresolve picks for (code, grade) (grade DESC, id DESC), or None without ``known``.
+
+    Candidates are this calendar's names plus the known majors with that code and grade (another
+    calendar may have one). Known names order by id; names the database does not have yet are
+    inserted by this run's DimensionStage after them, in name order.
+    """
+    if known is None:
+        return None
+    candidates = set(names)
+    candidates.update(n for n, (c, g, _) in known.items() if c == code and g == grade)
+    return max(candidates, key=lambda n: (n not in known, known[n][2] if n in known else 0, n))
+
+
+def build_calendar_shards(cid: int, courses: list, known: dict = None):
+    """Build the pk API read model of one calendar as {shard key: payload}.
+
+    Payloads are the ``data`` field the matching route returns:
+    - ``{cid}/calendar``: calendar name, gradeList, majors and course natures
+    - ``{cid}/major/{code}/{grade}``: /api/findCourseByMajor for that major code and grade, with the
+      classes of each course as ``classIds`` into the course shards and ``exclusiveIds`` for isExclusive
+      (a teaching class code listed twice is merged by the reader, like the route does)
+    - ``{cid}/nature/{courseLabelId}``: one group of /api/findCourseByNatureId
+    - ``{cid}/course/{courseCode}``: /api/findCourseDetailByCode (single courseCode) plus each class's
+      id; also the per-code entries of /api/getLatestCourseInfo (isExclusive comes from the major shard)
+    - ``{cid}/conflicts/...``: which teaching classes clash, for the scheduling simulator (conflicts.py)
+
+    ``known`` (see known_majors) resolves which major a code and grade stands for; without it the major
+    shards get ``exclusiveIds: null`` and the reader falls back to the route for isExclusive.
+    """
+    classes = []
+    for course in courses:
+        if isinstance(course, dict) and as_int(course.get("id")) is not None:
+            classes.append(course)
+    classes.sort(key=lambda c: (norm_str(c.get("courseCode")) or "", norm_str(c.get("code")) or ""))
+
+    calendar_name = None
+    natures = {}
+    majors = {}  # name -> parsed
+    classes_by_major = {}  # name -> [course]
+    by_course_code = {}
+    for course in classes:
+        calendar_name = calendar_name or norm_str(course.get("calendarIdI18n"))
+        label_id = as_int(course.get("courseLabelId"))
+        if label_id is not None and label_id not in natures:
+            natures[label_id] = norm_str(course.get("courseLabelName")) or ""
+        cc = norm_str(course.get("courseCode"))
+        if cc:
+            by_course_code.setdefault(cc, []).append(course)
+        for mj in course.get("majorList") or []:
+            name = str(mj or "").strip()
+            if not name:
+                continue
+            if name not in majors:
+                majors[name] = parse_major_string(name)
+            classes_by_major.setdefault(name, []).append(course)
+
+    shards = {}
+
+    grades_by_code = {}
+    for parsed in majors.values():
+        if parsed["code"] and parsed["grade"] is not None:
+            grades_by_code.setdefault(parsed["code"], set()).add(parsed["grade"])
+
+    shards[f"{cid}/calendar"] = {
+        "calendarId": cid,
+        "calendarName": calendar_name,
+        "gradeList": sorted({p["grade"] for p in majors.values() if p["grade"] is not None}, reverse=True),
+        "majors": sorted(
+            ({"code": p["code"], "grade": p["grade"], "name": p["name"]} for p in majors.values()),
+            key=lambda m: (m["grade"] or 0, m["code"] or "", m["name"]),
+        ),
+        "courseNatures": [{"courseLabelId": k, "courseLabelName": v} for k, v in sorted(natures.items(), reverse=True)],
+    }
+
+    # /api/findCourseByMajor: classes of every major with this code and grade <= requested grade, as ids
+    # into the {cid}/course/{courseCode} shards (a class shows up under every grade it qualifies for, so
+    # the views live once in the course shards); exclusiveIds are the classes linked to the one major
+    # resolveMajor picks for the closest grade (requests for a grade in between resolve to the highest
+    # shard grade <= requested).
+    for code, grades in grades_by_code.items():
+        names_by_grade = {}
+        for name, parsed in majors.items():
+            if parsed["code"] == code and parsed["grade"] is not None:
+                names_by_grade.setdefault(parsed["grade"], []).append(name)
+        for grade in sorted(grades):
+            resolved = _resolve_major(code, grade, names_by_grade[grade], known)
+            exclusive_ids = {as_int(c.get("id")) for c in classes_by_major.get(resolved, [])}
+            member_ids = set()
+            for g, names in names_by_grade.items():
+                if g <= grade:
+                    for n in names:
+                        member_ids.update(as_int(c.get("id")) for c in classes_by_major.get(n, []))
+
+            groups = {}
+            for course in classes:
+                tc_id = as_int(course.get("id"))
+                cc = norm_str(course.get("courseCode"))
+                if tc_id not in member_ids or not cc:
+                    continue
+                group = groups.get(cc)
+                label = norm_str(course.get("courseLabelName")) or ""
+                if group is None:
+                    group = groups[cc] = {
+                        "courseCode": cc,
+                        "courseName": norm_str(course.get("courseName")) or "",
+                        "faculty": norm_str(course.get("facultyI18n")) or "",
+                        "facultyI18n": norm_str(course.get("facultyI18n")) or "",
+                        "credit": _num(course.get("credits")),
+                        "grade": grade,
+                        "courseNature": [label] if label else [],
+                        "classIds": [],
+                    }
+                elif label and label not in group["courseNature"]:
+                    group["courseNature"].append(label)
+                group["classIds"].append(tc_id)
+            shards[f"{cid}/major/{code}/{grade}"] = {
+                "courses": list(groups.values()),
+                "exclusiveIds": sorted(exclusive_ids & member_ids) if resolved is not None else None,
+            }
+
+    # /api/findCourseByNatureId
+    for label_id, label_name in natures.items():
+        rows = {}
+        for course in classes:
+            if as_int(course.get("courseLabelId")) != label_id:
+                continue
+            cc = norm_str(course.get("courseCode")) or ""
+            key = (cc, norm_str(course.get("courseName")) or "", norm_str(course.get("facultyI18n")) or "")
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    "campus": [],
+                    "courseCode": key[0],
+                    "courseName": key[1],
+                    "faculty": key[2],
+                    "facultyI18n": key[2],
+                    "credit": _num(course.get("credits")),
+                }
+            else:
+                row["credit"] = max(row["credit"], _num(course.get("credits")))
+            campus = norm_str(course.get("campusI18n"))
+            if campus and campus not in row["campus"]:
+                row["campus"].append(campus)
+        shards[f"{cid}/nature/{label_id}"] = {"courseLabelId": label_id, "courseLabelName": label_name, "courses": list(rows.values())}
+
+    # /api/findCourseDetailByCode
+    for cc, lst in by_course_code.items():
+        shards[f"{cid}/course/{cc}"] = [_class_view(c) for c in lst]
+
+    shards.update(conflict_shards(cid, classes))
+    return shards
+
+
+class ShardWriter:
+    """Write shards as immutable content-addressed files plus a mutable manifest.json.
+
+    A shard ``121/course/ABC`` lands at ``121/course/ABC.<sha256[:16]>.json``; unchanged shards
+    keep their file name across runs, so caches keyed on the path never need purging. Files of a
+    rewritten calendar that the manifest no longer references are removed.
+    """
+
+    def __init__(self, root):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.root / MANIFEST_FILE
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if self.manifest.get("formatVersion") != SHARD_FORMAT_VERSION:
+                raise ValueError("format changed")
+        except Exception:
+            self.manifest = {"formatVersion": SHARD_FORMAT_VERSION, "calendars": {}}
+
+    def write_calendar(self, cid: int, shards: dict) -> dict:
+        entries = {}
+        written = 0
+        total_bytes = 0
+        for key, payload in sorted(shards.items()):
+            raw = dumps_compact(payload)
+            digest = hashlib.sha256(raw).hexdigest()
+            rel = "/".join(shard_name(p) for p in key.split("/")) + f".{digest[:16]}.json"
+            path = self.root / rel
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(raw)
+                written += 1
+            entries[key] = {"path": rel, "sha256": digest, "bytes": len(raw)}
+            total_bytes += len(raw)
+
+        calendar_hash = hashlib.sha256("".join(f"{k}={v['sha256']};" for k, v in sorted(entries.items())).encode("utf-8")).hexdigest()
+        self.manifest["calendars"][str(cid)] = {
+            "version": calendar_hash[:16],
+            "generatedAt": int(time.time()),
+            "shardCount": len(entries),
+            "bytes": total_bytes,
+            "shards": entries,
+        }
+        self._prune(cid, {e["path"] for e in entries.values()})
+        return {"calendarId": cid, "shards": len(entries), "written": written, "bytes": total_bytes, "version": calendar_hash[:16]}
+
+    def _prune(self, cid: int, keep: set):
+        base = self.root / shard_name(cid)
+        if not base.exists():
+            return
+        for path in base.rglob("*.json"):
+            if path.relative_to(self.root).as_posix() not in keep:
+                path.unlink()
+
+    def save(self):
+        versions = "".join(f"{cid}={c['version']};" for cid, c in sorted(self.manifest["calendars"].items()))
+        self.manifest["version"] = hashlib.sha256(versions.encode("utf-8")).hexdigest()[:16]
+        self.manifest["generatedAt"] = int(time.time())
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(self.manifest_path)
+        return self.manifest_path
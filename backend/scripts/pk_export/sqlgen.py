@@ -0,0 +1,289 @@
+import time
+
+from .arrangement import parse_arrange_info
+from .common import as_int, compute_new_code, inline_params
+
+# Clear only one calendar's data to avoid duplicates/stale rows (keep other semesters).
+CALENDAR_DELETES = (
+    "DELETE FROM teacher WHERE teachingClassId IN (SELECT id FROM coursedetail WHERE calendarId = ?)",
+    "DELETE FROM teacherandclass WHERE teachingClassId IN (SELECT id FROM coursedetail WHERE calendarId = ?)",
+    "DELETE FROM arrangeinfo WHERE teachingClassId IN (SELECT id FROM coursedetail WHERE calendarId = ?)",
+    "DELETE FROM majorandcourse WHERE courseId IN (SELECT id FROM coursedetail WHERE calendarId = ?)",
+    "DELETE FROM coursedetail WHERE calendarId = ?",
+    "DELETE FROM calendar WHERE calendarId = ?",
+    "DELETE FROM coursenature_by_calendar WHERE calendarId = ?",
+    "DELETE FROM arrangement WHERE calendarId = ?",
+    "DELETE FROM majorcourses WHERE calendarId = ?",
+)
+
+CALENDAR_SQL = "INSERT OR REPLACE INTO calendar (calendarId, calendarIdI18n) VALUES (?, ?)"
+COURSENATURE_SQL = (
+    "INSERT INTO coursenature_by_calendar (calendarId, courseLabelId, courseLabelName) VALUES (?, ?, ?) "
+    "ON CONFLICT(calendarId, courseLabelId) DO UPDATE SET courseLabelName=excluded.courseLabelName"
+)
+COURSEDETAIL_SQL = (
+    "INSERT OR REPLACE INTO coursedetail "
+    "(id, code, name, courseLabelId, assessmentMode, period, weekHour, campus, number, elcNumber, startWeek, endWeek, "
+    "courseCode, courseName, credit, teachingLanguage, faculty, calendarId, newCourseCode, newCode) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+ARRANGEMENT_SQL = (
+    "INSERT OR REPLACE INTO arrangement "
+    "(teachingClassId, slotIndex, calendarId, weekday, startPeriod, endPeriod, weekMask, oddEven, room, campus) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+ARRANGEINFO_SQL = "INSERT OR REPLACE INTO arrangeinfo (teachingClassId, arrangeInfoText) VALUES (?, ?)"
+TEACHERANDCLASS_SQL = "INSERT OR IGNORE INTO teacherandclass (teachingClassId, teacherId) VALUES (?, ?)"
+MAJORANDCOURSE_SQL = "INSERT OR IGNORE INTO majorandcourse (majorId, courseId) VALUES ((SELECT id FROM major WHERE name = ?), ?)"
+# Per resolved major (majorresolve, refreshed by the dimension rows): the calendar's classes linked to any major of
+# the same code with grade <= the major's, and those linked to the major itself (migrations/006_pk_major_resolve.sql).
+MAJORCOURSES_SQL = (
+    "INSERT INTO majorcourses (calendarId, majorId, courseIds, ownCourseIds) "
+    "SELECT l.calendarId, t.id, json_group_array(DISTINCT l.courseId), json_group_array(l.courseId) FILTER (WHERE l.majorId = t.id) "
+    "FROM (SELECT DISTINCT r.majorId AS id, m.code AS code, m.grade AS grade FROM majorresolve r JOIN major m ON m.id = r.majorId) t "
+    "JOIN (SELECT cd.calendarId AS calendarId, mac.majorId AS majorId, mac.courseId AS courseId, m.code AS code, m.grade AS grade "
+    "FROM coursedetail cd JOIN majorandcourse mac ON mac.courseId = cd.id JOIN major m ON m.id = mac.majorId WHERE cd.calendarId = ?) l "
+    "ON l.code = t.code AND l.grade <= t.grade GROUP BY l.calendarId, t.id"
+)
+FETCHLOG_SQL = "INSERT INTO fetchlog (fetchTime, msg) VALUES (?, ?)"
+VALUES_BATCH = 500
+
+# Per-course statements of a calendar file, in apply order: (rows key, sql, batch).
+CALENDAR_BODY = (
+    ("details", COURSEDETAIL_SQL, 0),
+    ("slots", ARRANGEMENT_SQL, 0),
+    ("arrangeInfos", ARRANGEINFO_SQL, VALUES_BATCH),
+    ("links", TEACHERANDCLASS_SQL, VALUES_BATCH),
+    # majorandcourse looks major ids up by name, so the dimension rows must already be applied
+    ("majorLinks", MAJORANDCOURSE_SQL, 0),
+)
+
+
+class ValuesBatch:
+    """Collect row tuples for one multi-row INSERT; flush before the statement gets large (D1 caps statement size)."""
+
+    def __init__(self, f, head: str, tail: str = "", max_rows: int = VALUES_BATCH, max_bytes: int = 50_000):
+        self.f = f
+        self.head = head
+        self.tail = tail
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows = []
+        self.size = 0
+
+    def add(self, row: str):
+        self.rows.append(row)
+        self.size += len(row) + 2
+        if len(self.rows) >= self.max_rows or self.size >= self.max_bytes:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.f.write(self.head + ", ".join(self.rows) + self.tail + ";\n")
+            self.rows = []
+            self.size = 0
+
+
+def write_statements(f, statements):
+    """Render (sql, rows, batch) statements as D1 SQL; batch > 0 folds rows into multi-row VALUES."""
+    for sql, rows, batch in statements:
+        if not batch:
+            for row in rows:
+                f.write(inline_params(sql, row) + ";\n")
+            continue
+        start = sql.index(" VALUES ") + len(" VALUES ")
+        end = sql.index(")", start) + 1
+        values = ValuesBatch(f, sql[:start], tail=sql[end:], max_rows=batch)
+        for row in rows:
+            values.add(inline_params(sql[start:end], row))
+        values.flush()
+
+
+def calendar_rows(cid: int, courses: list) -> dict:
+    """Row tuples of one calendar's courses: the calendar label, course natures (first seen wins),
+    one list per CALENDAR_BODY entry and the number of teaching classes.
+
+    Courses are independent of each other apart from the first-seen natures/label, so slices of a
+    calendar can be turned into rows separately and combined with merge_calendar_rows.
+    """
+    calendar_i18n = None
+    for course in courses:
+        if isinstance(course, dict):
+            calendar_i18n = str(course.get("calendarIdI18n") or "").strip() or None
+            if calendar_i18n:
+                break
+
+    seen_course_nature = set()
+    natures, details, slots, arrange_infos, links, major_links = [], [], [], [], [], []
+    inserted = 0
+    for course in courses:
+        if not isinstance(course, dict):
+            continue
+
+        course_label_id = course.get("courseLabelId")
+        try:
+            course_label_id_i = int(course_label_id) if course_label_id is not None else None
+        except Exception:
+            course_label_id_i = None
+        course_label_name = str(course.get("courseLabelName") or "").strip() or None
+        if course_label_id_i is not None and course_label_id_i not in seen_course_nature:
+            seen_course_nature.add(course_label_id_i)
+            natures.append((cid, course_label_id_i, course_label_name))
+
+        assessment_mode = str(course.get("assessmentMode") or "").strip() or None
+        campus = str(course.get("campus") or "").strip() or None
+        faculty = str(course.get("faculty") or "").strip() or None
+        teaching_language = str(course.get("teachingLanguage") or "").strip() or None
+        majors = course.get("majorList") or []
+
+        teaching_class_id = course.get("id")
+        try:
+            teaching_class_id_i = int(teaching_class_id) if teaching_class_id is not None else None
+        except Exception:
+            teaching_class_id_i = None
+        if teaching_class_id_i is None:
+            continue
+
+        new_course_code, new_code = compute_new_code(course)
+
+        details.append(
+            (
+                teaching_class_id_i,
+                str(course.get("code") or "").strip() or None,
+                str(course.get("name") or "").strip() or None,
+                course_label_id_i,
+                assessment_mode,
+                course.get("period"),
+                course.get("weekHour"),
+                campus,
+                course.get("number"),
+                course.get("elcNumber"),
+                course.get("startWeek"),
+                course.get("endWeek"),
+                str(course.get("courseCode") or "").strip() or None,
+                str(course.get("courseName") or "").strip() or None,
+                course.get("credits"),
+                teaching_language,
+                faculty,
+                cid,
+                new_course_code,
+                new_code,
+            )
+        )
+
+        arrange_info = str(course.get("arrangeInfo") or "").strip() or None
+        for slot_index, slot in enumerate(parse_arrange_info(arrange_info)):
+            slots.append(
+                (
+                    teaching_class_id_i,
+                    slot_index,
+                    cid,
+                    slot["weekday"],
+                    slot["startPeriod"],
+                    slot["endPeriod"],
+                    slot["weekMask"],
+                    slot["oddEven"],
+                    slot["room"],
+                    slot["campus"],
+                )
+            )
+
+        if arrange_info:
+            arrange_infos.append((teaching_class_id_i, arrange_info))
+
+        # teacher rows themselves go to teacherinfo via DimensionStage; only the links are per calendar
+        teacher_ids = []
+        teachers = course.get("teacherList") or []
+        if isinstance(teachers, list):
+            for t in teachers:
+                if not isinstance(t, dict):
+                    continue
+                tid_i = as_int(t.get("id"))
+                if tid_i is not None and tid_i not in teacher_ids:
+                    teacher_ids.append(tid_i)
+        links.extend((teaching_class_id_i, tid) for tid in teacher_ids)
+
+        if isinstance(majors, list):
+            for mj in majors:
+                mj_name = str(mj or "").strip()
+                if mj_name:
+                    major_links.append((mj_name, teaching_class_id_i))
+
+        inserted += 1
+
+    return {
+        "calendarIdI18n": calendar_i18n,
+        "natures": natures,
+        "details": details,
+        "slots": slots,
+        "arrangeInfos": arrange_infos,
+        "links": links,
+        "majorLinks": major_links,
+        "inserted": inserted,
+    }
+
+
+def merge_calendar_rows(parts: list) -> dict:
+    """Combine calendar_rows of consecutive course slices (in slice order) into what one call over all courses returns."""
+    merged = {"calendarIdI18n": None, "natures": [], "inserted": 0, **{key: [] for key, _, _ in CALENDAR_BODY}}
+    seen_course_nature = set()
+    for part in parts:
+        merged["calendarIdI18n"] = merged["calendarIdI18n"] or part["calendarIdI18n"]
+        for nature in part["natures"]:
+            if nature[1] not in seen_course_nature:
+                seen_course_nature.add(nature[1])
+                merged["natures"].append(nature)
+        for key, _, _ in CALENDAR_BODY:
+            merged[key].extend(part[key])
+        merged["inserted"] += part["inserted"]
+    return merged
+
+
+def calendar_head_statements(cid: int, rows: dict):
+    """Statements before the per-course rows: clear the calendar, then its label and course natures."""
+    statements = [(sql, [(cid,)], 0) for sql in CALENDAR_DELETES]
+    statements += [
+        (CALENDAR_SQL, [(cid, rows["calendarIdI18n"])], 0),
+        (COURSENATURE_SQL, rows["natures"], 0),
+    ]
+    return statements
+
+
+def calendar_tail_statements(cid: int, source: str = "action"):
+    """Statements after every per-course row of the calendar is in."""
+    return [
+        (MAJORCOURSES_SQL, [(cid,)], 0),
+        (FETCHLOG_SQL, [(int(time.time()), f"sync calendarId={cid} via {source}")], 0),
+    ]
+
+
+def calendar_statements(cid: int, courses: list, source: str = "action"):
+    """(sql, rows, batch) statements that replace one calendar, in apply order, and the teaching classes inserted.
+
+    language/assessment/campus/faculty/major/teacherinfo rows come from DimensionStage; these only
+    carry the calendar's own rows.
+    """
+    rows = calendar_rows(cid, courses)
+    statements = calendar_head_statements(cid, rows)
+    statements += [(sql, rows[key], batch) for key, sql, batch in CALENDAR_BODY]
+    statements += calendar_tail_statements(cid, source)
+    return statements, rows["inserted"]
+
+
+def write_calendar_header(f):
+    f.write("-- generated by pk-login-and-export-sql.py\n")
+    # NOTE: Cloudflare D1 (via wrangler d1 execute) does not allow explicit BEGIN/COMMIT statements.
+    # Keep this file as plain sequential SQL statements.
+
+
+def write_calendar_statements(f, statements):
+    write_calendar_header(f)
+    write_statements(f, statements)
+
+
+def write_calendar_sql(f, cid: int, courses: list, source: str = "action") -> int:
+    # language/assessment/campus/faculty/major/teacherinfo are written once per run by DimensionStage
+    # (pk-sync-000-dimensions.sql); this file only carries the calendar's own rows.
+    statements, inserted = calendar_statements(cid, courses, source=source)
+    write_calendar_statements(f, statements)
+    return inserted
@@ -0,0 +1,134 @@
+import json
+import random
+
+DAYS = "一二三四五六日"
+CAMPUSES = (("1", "四平路校区"), ("3", "嘉定校区"), ("4", "沪西校区"))
+LANGUAGES = (("1", "中文"), ("2", "英语"), ("3", "双语"))
+ASSESSMENTS = (("1", "考试"), ("2", "考查"))
+LABELS = ((947, "公共选修课"), (955, "通识选修课"), (956, "体育"), (1001, "专业必修课"), (1002, "专业选修课"), (1003, "公共基础课"))
+WEEK_TEXTS = ("1-16", "1-17", "1-15周(单)", "2-16周(双)", "1-8", "9-16")
+
+
+def synthetic_courses(cid: int, classes: int = 3000, seed: int = 1, majors: int = 120, teachers: int = 1500):
+    """Deterministic manualArrange/page records shaped like one real calendar.
+
+    Course codes, majors and teachers are drawn from fixed pools so several calendars share
+    keys the way consecutive semesters do; ``seed`` varies the draw.
+    """
+    pools = random.Random(seed)
+    r = random.Random(seed * 100003 + cid)
+    faculties = [(f"{i:05d}", f"学院{i}") for i in range(1, 41)]
+    major_pool = []
+    for i in range(majors):
+        code = f"{10000 + i * 7:05d}"
+        for grade in range(2021, 2026):
+            major_pool.append(f"{grade}({code} 专业{i})")
+    course_pool = [f"{pools.randint(0, 99):02d}{i:04d}" for i in range(max(1, classes // 3))]
+
+    out = []
+    for i in range(classes):
+        course_code = r.choice(course_pool)
+        label_id, label_name = r.choice(LABELS)
+        campus, campus_name = r.choice(CAMPUSES)
+        language, language_name = r.choice(LANGUAGES)
+        assessment, assessment_name = r.choice(ASSESSMENTS)
+        faculty, faculty_name = faculties[int(course_code) % len(faculties)]
+
+        teacher_list = []
+        for t in sorted({r.randint(1, teachers) for _ in range(r.choice((1, 1, 1, 2, 3)))}):
+            teacher_list.append({"id": t, "teacherCode": f"{t:05d}", "teacherName": f"教师{t}"})
+        lines = []
+        for _ in range(r.choice((1, 1, 2, 2, 3))):
+            day = r.choice(DAYS[:6])
+            start = r.choice((1, 3, 5, 7, 10))
+            end = start + r.choice((1, 1, 2))
+            weeks = r.choice(WEEK_TEXTS)
+            room = f"{campus_name} {r.choice('ABCFG')}{r.randint(100, 499)}"
+            for t in teacher_list:
+                lines.append(f"{t['teacherName']}({t['teacherCode']}) 星期{day}{start}-{end}节[{weeks}] {room}")
+
+        credits = r.choice((0.5, 1, 2, 2, 3, 3, 4))
+        out.append(
+            {
+                "id": cid * 1000000 + i,
+                "code": f"{course_code}{i % 100:02d}",
+                "name": f"课程{course_code}",
+                "courseLabelId": label_id,
+                "courseLabelName": label_name,
+                "assessmentMode": assessment,
+                "assessmentModeI18n": assessment_name,
+                "period": int(credits * 16),
+                "weekHour": int(credits) or 1,
+                "campus": campus,
+                "campusI18n": campus_name,
+                "number": r.choice((30, 60, 90, 120)),
+                "elcNumber": r.randint(0, 120),
+                "startWeek": 1,
+                "endWeek": 16,
+                "courseCode": course_code,
+                "courseName": f"课程{course_code}",
+                "credits": credits,
+                "teachingLanguage": language,
+                "teachingLanguageI18n": language_name,
+                "faculty": faculty,
+                "facultyI18n": faculty_name,
+                "calendarIdI18n": f"{2000 + cid // 2}-{2001 + cid // 2}学年第{cid % 2 + 1}学期",
+                "newCourseCode": f"N{course_code}",
+                "majorList": r.sample(major_pool, r.choice((0, 1, 2, 3, 5))),
+                "teacherList": teacher_list,
+                "arrangeInfo": "\n".join(lines),
+            }
+        )
+    return out
+
+
+def synthetic_page(courses: list, page_num: int, page_size: int, seed: int = 1) -> bytes:
+    """A manualArrange/page response body for one page of ``courses``.
+
+    Each record also carries fields the exporter never reads (ids of related entities, audit columns,
+    a per-slot time table and fuller teacher objects), so decoders are measured on page-sized payloads
+    rather than on the projected records alone.
+    """
+    r = random.Random(seed * 7919 + page_num)
+    records = []
+    for course in courses[(page_num - 1) * page_size : page_num * page_size]:
+        rec = dict(course)
+        rec["teacherList"] = [
+            {**t, "teachingClassId": course["id"], "type": 1, "facultyName": f"学院{t['id'] % 40}", "title": "副教授", "email": None}
+            for t in course.get("teacherList") or []
+        ]
+        rec["timeTableList"] = [
+            {
+                "id": r.randint(1, 10**9),
+                "teachingClassId": course["id"],
+                "weekDay": r.randint(1, 6),
+                "startTime": r.choice((1, 3, 5, 7, 10)),
+                "endTime": r.choice((2, 4, 6, 8, 11)),
+                "weeks": sorted(r.sample(range(1, 18), 8)),
+                "roomId": r.randint(1, 5000),
+                "roomName": f"{r.choice('ABCFG')}{r.randint(100, 499)}",
+                "teacherIds": [t["id"] for t in course.get("teacherList") or []],
+            }
+            for _ in range(r.choice((1, 2, 3)))
+        ]
+        rec.update(
+            {
+                "calendarId": int(course["id"]) // 1000000,
+                "courseId": r.randint(1, 10**6),
+                "teachingClassType": r.choice((1, 2)),
+                "trainingLevel": "1",
+                "trainingLevelI18n": "本科",
+                "isChineseTeaching": r.choice((0, 1)),
+                "remark": None,
+                "limitCondition": "",
+                "createdBy": "admin",
+                "createdAt": 1700000000000 + r.randint(0, 10**9),
+                "updatedBy": "admin",
+                "updatedAt": 1700000000000 + r.randint(0, 10**9),
+                "deleteStatus": 0,
+                "majorIds": [r.randint(1, 5000) for _ in course.get("majorList") or []],
+            }
+        )
+        records.append(rec)
+    body = {"code": 200, "msg": "", "data": {"total_": len(courses), "pageNum_": page_num, "pageSize_": page_size, "list": records}}
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
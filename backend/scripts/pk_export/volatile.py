@@ -0,0 +1,126 @@
+import json
+import os
+import pathlib
+import sqlite3
+import time
+
+from .common import as_int, sql_value
+from .sqlgen import FETCHLOG_SQL
+
+# coursedetail columns that move between full syncs (capacity / enrolled count during course selection);
+# everything else in the calendar, and the dimension/teacher/major tables, only changes with a full export.
+VOLATILE_COLUMNS = ("number", "elcNumber")
+VOLATILE_BATCH = 2000
+VOLATILE_BATCH_BYTES = 50_000
+SNAPSHOT_FILE = "volatile-{cid}.json"
+# Written with the SQL; becomes SNAPSHOT_FILE only once that SQL is known to be applied (commit_snapshots).
+PENDING_SNAPSHOT_FILE = "volatile-{cid}.pending.json"
+REFRESH_FILE = "pk-refresh-{cid}.sql"  # not matched by the pk-sync-*.sql apply loop
+
+# One statement per batch: a JSON array of [id, number, elcNumber] joined on the primary key; the IS NOT guard
+# keeps rows whose values already match from being written (and counted as D1 rows written). The unary + keeps the
+# calendar guard off idx_coursedetail_calendar: otherwise SQLite scans the calendar and re-reads the JSON per class.
+VOLATILE_UPDATE_SQL = (
+    "UPDATE coursedetail SET "
+    + ", ".join(f"{col} = json_extract(j.value, '$[{i + 1}]')" for i, col in enumerate(VOLATILE_COLUMNS))
+    + " FROM json_each(?) j WHERE coursedetail.id = json_extract(j.value, '$[0]') AND +coursedetail.calendarId = ? AND ("
+    + " OR ".join(f"coursedetail.{col} IS NOT json_extract(j.value, '$[{i + 1}]')" for i, col in enumerate(VOLATILE_COLUMNS))
+    + ")"
+)
+
+
+def _affine(value):
+    """The value as stored in an INTEGER column (so snapshot/D1 comparisons see what the full export wrote)."""
+    value = sql_value(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return int(text)
+    return value
+
+
+def volatile_rows(courses: list) -> dict:
+    """{teachingClassId: [number, elcNumber]} for the crawled classes (same id handling as calendar_statements)."""
+    out = {}
+    for course in courses:
+        if not isinstance(course, dict):
+            continue
+        tid = as_int(course.get("id"))
+        if tid is not None:
+            out[tid] = [_affine(course.get(col)) for col in VOLATILE_COLUMNS]
+    return out
+
+
+def local_rows(conn: sqlite3.Connection, cid: int) -> dict:
+    cols = ", ".join(VOLATILE_COLUMNS)
+    return {row[0]: list(row[1:]) for row in conn.execute(f"SELECT id, {cols} FROM coursedetail WHERE calendarId = ?", (cid,))}
+
+
+def load_snapshot(out_dir: pathlib.Path, cid: int):
+    """Volatile values of the last applied export/refresh in out_dir, or None (missing, unreadable or other columns)."""
+    path = pathlib.Path(out_dir) / SNAPSHOT_FILE.format(cid=cid)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("calendarId") != cid or data.get("columns") != list(VOLATILE_COLUMNS):
+        return None
+    return {int(k): v for k, v in data.get("rows", {}).items()}
+
+
+def save_snapshot(out_dir: pathlib.Path, cid: int, rows: dict, pending: bool = False) -> pathlib.Path:
+    """Write the values an export/refresh sends. ``pending``: its SQL is not applied yet, so the next
+    --refresh keeps diffing against the previous snapshot until commit_snapshots promotes this one."""
+    path = pathlib.Path(out_dir) / (PENDING_SNAPSHOT_FILE if pending else SNAPSHOT_FILE).format(cid=cid)
+    payload = {"calendarId": cid, "columns": list(VOLATILE_COLUMNS), "savedAt": int(time.time()), "rows": rows}
+    path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    if not pending:
+        # an older pending snapshot is superseded by what was just applied
+        (pathlib.Path(out_dir) / PENDING_SNAPSHOT_FILE.format(cid=cid)).unlink(missing_ok=True)
+    return path
+
+
+def commit_snapshots(out_dir: pathlib.Path, calendar_ids) -> list:
+    """Promote the pending snapshots of ``calendar_ids`` (call after their SQL was applied); returns the calendars promoted."""
+    out = []
+    for cid in calendar_ids:
+        pending = pathlib.Path(out_dir) / PENDING_SNAPSHOT_FILE.format(cid=cid)
+        if pending.exists():
+            os.replace(pending, pathlib.Path(out_dir) / SNAPSHOT_FILE.format(cid=cid))
+            out.append(cid)
+    return out
+
+
+def diff_rows(current: dict, baseline) -> dict:
+    """Rows to update, plus the classes a volatile refresh cannot handle (added or removed since the baseline).
+
+    Without a baseline every class is sent; the UPDATE's IS NOT guard still writes only the changed rows.
+    """
+    if baseline is None:
+        return {"changed": sorted(current), "added": [], "removed": []}
+    return {
+        "changed": sorted(tid for tid, values in current.items() if tid in baseline and list(baseline[tid]) != values),
+        "added": sorted(tid for tid in current if tid not in baseline),
+        "removed": sorted(tid for tid in baseline if tid not in current),
+    }
+
+
+def refresh_statements(cid: int, current: dict, ids, source: str = "action"):
+    """(sql, rows, batch) statements updating only the volatile columns of ``ids`` in one calendar."""
+    rows = []
+    batch, size = [], 0
+    for tid in ids:
+        item = json.dumps([tid, *current[tid]], separators=(",", ":"))
+        if batch and (len(batch) >= VOLATILE_BATCH or size + len(item) >= VOLATILE_BATCH_BYTES):
+            rows.append(("[" + ",".join(batch) + "]", cid))
+            batch, size = [], 0
+        batch.append(item)
+        size += len(item) + 1
+    if batch:
+        rows.append(("[" + ",".join(batch) + "]", cid))
+    return [
+        (VOLATILE_UPDATE_SQL, rows, 0),
+        (FETCHLOG_SQL, [(int(time.time()), f"refresh calendarId={cid} ({len(ids)} classes) via {source}")], 0),
+    ]
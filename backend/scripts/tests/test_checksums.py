@@ -0,0 +1,84 @@
+import sqlite3
+import unittest
+
+from pk_export.checksums import checksum_tree, expected_db, key_ranges
+from pk_export.dimensions import DimensionStage
+from pk_export.sqlgen import calendar_statements
+from pk_export.synth import synthetic_courses
+
+CID = 121
+
+
+def export_db(courses: list) -> sqlite3.Connection:
+    dimensions = DimensionStage()
+    dimensions.add_courses(CID, courses)
+    statements, _ = calendar_statements(CID, courses)
+    return expected_db([dimensions.statements(), statements])
+
+
+class ChecksumTreeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = export_db(synthetic_courses(CID, classes=300))
+        cls.ranges = key_ranges(cls.expected, [CID])
+        cls.tree = checksum_tree(cls.expected, cls.ranges)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.expected.close()
+
+    def actual(self, *statements) -> dict:
+        """Tree of a copy of the exported data with ``statements`` applied."""
+        conn = sqlite3.connect(":memory:")
+        self.expected.backup(conn)
+        for sql, params in statements:
+            conn.execute(sql, params)
+        try:
+            return checksum_tree(conn, self.ranges)
+        finally:
+            conn.close()
+
+    def assertDetected(self, *statements):
+        actual = self.actual(*statements)
+        self.assertNotEqual(actual["root"], self.tree["root"])
+        return actual
+
+    def test_unchanged_copy_matches(self):
+        self.assertEqual(self.actual()["root"], self.tree["root"])
+
+    def test_text_swapped_between_rows(self):
+        a, b = self.expected.execute("SELECT id, name FROM coursedetail WHERE calendarId = ? AND name IS NOT NULL ORDER BY id LIMIT 2", (CID,))
+        self.assertNotEqual(a[1], b[1])
+        actual = self.assertDetected(
+            ("UPDATE coursedetail SET name = ? WHERE id = ?", (b[1], a[0])),
+            ("UPDATE coursedetail SET name = ? WHERE id = ?", (a[1], b[0])),
+        )
+        tables = actual["calendars"][str(CID)]["tables"]
+        self.assertNotEqual(tables["coursedetail"]["digest"], self.tree["calendars"][str(CID)]["tables"]["coursedetail"]["digest"])
+
+    def test_text_swapped_between_rows_of_one_class(self):
+        tc_id, first, second = self.expected.execute(
+            "SELECT a.teachingClassId, a.slotIndex, b.slotIndex FROM arrangement a JOIN arrangement b "
+            "ON b.teachingClassId = a.teachingClassId AND b.slotIndex > a.slotIndex AND b.room != a.room LIMIT 1"
+        ).fetchone()
+        self.assertDetected(
+            (
+                "UPDATE arrangement SET room = (SELECT room FROM arrangement WHERE teachingClassId = ?1 AND slotIndex = "
+                "CASE arrangement.slotIndex WHEN ?2 THEN ?3 ELSE ?2 END) WHERE teachingClassId = ?1 AND slotIndex IN (?2, ?3)",
+                (tc_id, first, second),
+            )
+        )
+
+    def test_anagram_within_a_value(self):
+        tc_id, code = self.expected.execute(
+            "SELECT id, code FROM coursedetail WHERE calendarId = ? AND substr(code, -2, 1) != substr(code, -1) ORDER BY id LIMIT 1", (CID,)
+        ).fetchone()
+        self.assertDetected(("UPDATE coursedetail SET code = ? WHERE id = ?", (code[:-2] + code[-1] + code[-2], tc_id)))
+
+    def test_missing_row(self):
+        link = self.expected.execute("SELECT teachingClassId, teacherId FROM teacherandclass LIMIT 1").fetchone()
+        self.assertDetected(("DELETE FROM teacherandclass WHERE teachingClassId = ? AND teacherId = ?", link))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from pk_export import decode
+from pk_export.synth import synthetic_courses, synthetic_page
+
+
+class DecodePageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pages = [synthetic_page(synthetic_courses(121, classes=120), n, 50) for n in (1, 2, 3)]
+
+    def test_stdlib_keeps_only_projected_fields(self):
+        page = decode.decode_page_stdlib(b"\xef\xbb\xbf" + self.pages[0])
+        self.assertEqual(set(page), {"code", "data"})
+        for course in page["data"]["list"]:
+            self.assertLessEqual(set(course), set(decode.COURSE_FIELDS))
+            self.assertNotIn(None, course.values())
+            for teacher in course.get("teacherList", []):
+                self.assertLessEqual(set(teacher), set(decode.TEACHER_FIELDS))
+
+    @unittest.skipIf(decode.msgspec is None, "msgspec is not installed")
+    def test_typed_matches_stdlib(self):
+        for raw in self.pages:
+            self.assertEqual(decode.decode_page_typed(raw), decode.decode_page_stdlib(raw))
+
+    def test_not_json(self):
+        with self.assertRaises(ValueError):
+            decode.decode_page(b"<html>login</html>")
+
+
+if __name__ == "__main__":
+    unittest.main()
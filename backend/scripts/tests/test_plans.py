@@ -0,0 +1,46 @@
+import pathlib
+import re
+import unittest
+
+from pk_export.plans import LEGACY_TIME_PATTERN, ROUTE_QUERIES
+
+SRC_PK = pathlib.Path(__file__).resolve().parents[2] / "src" / "pk"
+ROUTES_TS = SRC_PK / "routes.ts"
+UTILS_TS = SRC_PK / "utils.ts"
+
+STRING_RE = re.compile(r"`((?:[^`\\]|\\.)*)`|'((?:[^'\\\n]|\\.)*)'")
+INTERPOLATION_RE = re.compile(r"\$\{[^}]*\}")
+
+
+def normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def route_patterns() -> list:
+    """Every string literal of routes.ts as a regex; ``${...}`` (placeholder lists, composed clauses) matches anything."""
+    out = []
+    for m in STRING_RE.finditer(ROUTES_TS.read_text(encoding="utf-8")):
+        parts = [normalize(p) for p in INTERPOLATION_RE.split(m.group(1) if m.group(1) is not None else m.group(2))]
+        if not any(parts):
+            continue
+        out.append(re.compile(r"\s*.*?\s*".join(re.escape(p) for p in parts), re.DOTALL))
+    return out
+
+
+class RouteQueriesTest(unittest.TestCase):
+    def test_route_queries_match_routes_ts(self):
+        patterns = route_patterns()
+        for q in ROUTE_QUERIES:
+            with self.subTest(q["name"]):
+                sql = normalize(q["sql"])
+                self.assertTrue(any(p.fullmatch(sql) for p in patterns), f"no query in routes.ts matches:\n{sql}")
+
+    def test_legacy_time_pattern_matches_generator(self):
+        utils = UTILS_TS.read_text(encoding="utf-8")
+        self.assertIn("return [`%${dayText}${2 * section - 1}-${2 * section}%`]", utils)
+        day = re.search(r"'(\S+)': 1,", utils).group(1)
+        self.assertEqual(LEGACY_TIME_PATTERN, f"%{day}1-2%")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from pk_export.shards import build_calendar_shards
+
+CID = 121
+MAJOR_A = "2024(10000 专业A)"
+MAJOR_B = "2024(10000 专业B)"
+MAJOR_C = "2024(10000 专业C)"
+
+
+def course(tc_id: int, code: str, majors: list) -> dict:
+    return {"id": tc_id, "code": code, "courseCode": code[:-2], "courseName": "课程", "majorList": majors}
+
+
+COURSES = [
+    course(1, "10001", [MAJOR_A]),
+    course(2, "10002", [MAJOR_B]),
+    course(3, "20001", [MAJOR_A, MAJOR_B]),
+]
+
+
+def major_shard(known=None) -> dict:
+    return build_calendar_shards(CID, COURSES, known)[f"{CID}/major/10000/2024"]
+
+
+class MajorShardTest(unittest.TestCase):
+    def test_classes_are_ids_into_course_shards(self):
+        shards = build_calendar_shards(CID, COURSES)
+        groups = {g["courseCode"]: g["classIds"] for g in shards[f"{CID}/major/10000/2024"]["courses"]}
+        self.assertEqual(groups, {"100": [1, 2], "200": [3]})
+        self.assertEqual([v["id"] for v in shards[f"{CID}/course/100"]], [1, 2])
+
+    def test_exclusive_unknown_without_major_ids(self):
+        self.assertIsNone(major_shard()["exclusiveIds"])
+
+    def test_exclusive_follows_highest_major_id(self):
+        # Not the greatest name: 专业A was inserted after 专业B.
+        known = {MAJOR_A: ("10000", 2024, 9), MAJOR_B: ("10000", 2024, 5)}
+        self.assertEqual(major_shard(known)["exclusiveIds"], [1, 3])
+
+    def test_new_majors_rank_after_known_ones(self):
+        self.assertEqual(major_shard({MAJOR_A: ("10000", 2024, 9)})["exclusiveIds"], [2, 3])
+        self.assertEqual(major_shard({})["exclusiveIds"], [2, 3])
+
+    def test_major_of_another_calendar_can_win(self):
+        known = {MAJOR_A: ("10000", 2024, 9), MAJOR_B: ("10000", 2024, 5), MAJOR_C: ("10000", 2024, 12)}
+        self.assertEqual(major_shard(known)["exclusiveIds"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
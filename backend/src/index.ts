@@ -339,11 +339,11 @@ app.get('/api/courses', async (c) => {
         pkParams.push(faculty)
       }
       if (teacherName) {
-        pkWhere.push('EXISTS (SELECT 1 FROM teacher tt WHERE tt.teachingClassId = cd.id AND tt.teacherName LIKE ?)')
+        pkWhere.push('EXISTS (SELECT 1 FROM teacher_by_class tt WHERE tt.teachingClassId = cd.id AND tt.teacherName LIKE ?)')
         pkParams.push(`%${teacherName}%`)
       }
       if (teacherCode) {
-        pkWhere.push('EXISTS (SELECT 1 FROM teacher tt WHERE tt.teachingClassId = cd.id AND tt.teacherCode LIKE ?)')
+        pkWhere.push('EXISTS (SELECT 1 FROM teacher_by_class tt WHERE tt.teachingClassId = cd.id AND tt.teacherCode LIKE ?)')
         pkParams.push(`%${teacherCode}%`)
       }
 
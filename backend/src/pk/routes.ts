@@ -1,5 +1,5 @@
 import { Hono } from 'hono'
-import { arrangementTextToObj, splitEndline, optCourseQueryListGenerator } from './utils'
+import { arrangementTextToObj, splitEndline, optCourseQueryListGenerator, optCourseSlotGenerator } from './utils'
 
 type PkBindings = {
   DB: D1Database
@@ -25,7 +25,7 @@ function jsonErr(code: number, msg: string, data?: any) {
 
 async function getTeachers(db: D1Database, teachingClassId: number) {
   const { results } = await db
-    .prepare('SELECT teacherCode, teacherName, arrangeInfoText FROM teacher WHERE teachingClassId = ?')
+    .prepare('SELECT teacherCode, teacherName, arrangeInfoText FROM teacher_by_class WHERE teachingClassId = ?')
     .bind(teachingClassId)
     .all<any>()
   return results || []
@@ -51,6 +51,33 @@ function mergeArrangementInfo(teachers: any[]) {
   return objs
 }
 
+type ResolvedMajor = { majorId: number | null; courseIds: string | null; ownCourseIds: string | null }
+
+// (code, grade) -> major with the newest grade <= grade, plus its course ids in the calendar (JSON arrays), precomputed by
+// the exporter (migrations/006_pk_major_resolve.sql). courseIds is null when there is no precomputed row (table not
+// migrated yet, grade outside the table, calendar not re-exported since the major appeared): callers use the join query.
+async function resolveMajor(db: D1Database, calendarId: number, code: string, grade: number): Promise<ResolvedMajor> {
+  try {
+    const row = await db
+      .prepare(
+        `SELECT r.majorId as majorId, mc.courseIds as courseIds, mc.ownCourseIds as ownCourseIds
+         FROM majorresolve r
+         LEFT JOIN majorcourses mc ON mc.calendarId = ? AND mc.majorId = r.majorId
+         WHERE r.code = ? AND r.grade = ?`
+      )
+      .bind(calendarId, code, grade)
+      .first<ResolvedMajor>()
+    if (row) return { majorId: row.majorId, courseIds: row.courseIds ?? null, ownCourseIds: row.ownCourseIds ?? null }
+  } catch (_e) {
+    // majorresolve/majorcourses not migrated yet
+  }
+  const legacy = await db
+    .prepare('SELECT id FROM major WHERE code = ? AND grade <= ? ORDER BY grade DESC, id DESC LIMIT 1')
+    .bind(code, grade)
+    .first<{ id: number }>()
+  return { majorId: legacy?.id ?? null, courseIds: null, ownCourseIds: null }
+}
+
 export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }>) {
   // GET /api/getAllCalendar
   app.get('/api/getAllCalendar', async (c) => {
@@ -107,42 +134,62 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
     const calendarId = Number(body?.calendarId)
     if (!Number.isFinite(grade) || !code || !Number.isFinite(calendarId)) return c.json(jsonErr(400, '参数错误'), 400)
 
-    // 找到目标 major（允许 grade <=，与 pk 行为保持一致）
-    const majorRow = await c.env.DB
-      .prepare('SELECT id FROM major WHERE code = ? AND grade <= ? ORDER BY grade DESC LIMIT 1')
-      .bind(code, grade)
-      .first<{ id: number }>()
-    const targetMajorId = majorRow?.id ?? null
+    // 找到目标 major（允许 grade <=，与 pk 行为保持一致）及其本学期课程 id：导出时预计算（majorresolve/majorcourses 主键读）
+    const resolved = await resolveMajor(c.env.DB, calendarId, code, grade)
+    const targetMajorId = resolved.majorId
 
-    // 直接按 major + calendarId 拉取 teaching class，避免先查 courseCode 再分块 IN(...) 的多次往返
-    const cdRowsRes = await c.env.DB
-      .prepare(
-        `SELECT
-           cd.*,
-           f.facultyI18n as facultyI18n,
-           ca.campusI18n as campusI18n,
-           n.courseLabelName as courseLabelName,
-           l.teachingLanguageI18n as teachingLanguageI18n,
-           CASE
-             WHEN ? IS NOT NULL AND EXISTS (
-               SELECT 1 FROM majorandcourse mac2 WHERE mac2.majorId = ? AND mac2.courseId = cd.id
-             ) THEN 1
-             ELSE 0
-           END as isExclusive
-         FROM coursedetail cd
-         JOIN majorandcourse mac ON mac.courseId = cd.id
-         JOIN major m ON m.id = mac.majorId
-         LEFT JOIN faculty f ON f.faculty = cd.faculty
-         LEFT JOIN campus ca ON ca.campus = cd.campus
-         LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
-         LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
-         WHERE cd.calendarId = ?
-           AND m.code = ?
-           AND m.grade <= ?
-         ORDER BY cd.courseCode ASC, cd.code ASC`
-      )
-      .bind(targetMajorId, targetMajorId, calendarId, code, grade)
-      .all<any>()
+    let cdRowsRes: D1Result<any>
+    if (resolved.courseIds !== null) {
+      cdRowsRes = await c.env.DB
+        .prepare(
+          `SELECT
+             cd.*,
+             f.facultyI18n as facultyI18n,
+             ca.campusI18n as campusI18n,
+             n.courseLabelName as courseLabelName,
+             l.teachingLanguageI18n as teachingLanguageI18n,
+             CASE WHEN cd.id IN (SELECT value FROM json_each(?)) THEN 1 ELSE 0 END as isExclusive
+           FROM coursedetail cd
+           LEFT JOIN faculty f ON f.faculty = cd.faculty
+           LEFT JOIN campus ca ON ca.campus = cd.campus
+           LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+           LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
+           WHERE cd.id IN (SELECT value FROM json_each(?))
+           ORDER BY cd.courseCode ASC, cd.code ASC`
+        )
+        .bind(resolved.ownCourseIds, resolved.courseIds)
+        .all<any>()
+    } else {
+      // 直接按 major + calendarId 拉取 teaching class，避免先查 courseCode 再分块 IN(...) 的多次往返
+      cdRowsRes = await c.env.DB
+        .prepare(
+          `SELECT
+             cd.*,
+             f.facultyI18n as facultyI18n,
+             ca.campusI18n as campusI18n,
+             n.courseLabelName as courseLabelName,
+             l.teachingLanguageI18n as teachingLanguageI18n,
+             CASE
+               WHEN ? IS NOT NULL AND EXISTS (
+                 SELECT 1 FROM majorandcourse mac2 WHERE mac2.majorId = ? AND mac2.courseId = cd.id
+               ) THEN 1
+               ELSE 0
+             END as isExclusive
+           FROM coursedetail cd
+           JOIN majorandcourse mac ON mac.courseId = cd.id
+           JOIN major m ON m.id = mac.majorId
+           LEFT JOIN faculty f ON f.faculty = cd.faculty
+           LEFT JOIN campus ca ON ca.campus = cd.campus
+           LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
+           LEFT JOIN language l ON l.teachingLanguage = cd.teachingLanguage
+           WHERE cd.calendarId = ?
+             AND m.code = ?
+             AND m.grade <= ?
+           ORDER BY cd.courseCode ASC, cd.code ASC`
+        )
+        .bind(targetMajorId, targetMajorId, calendarId, code, grade)
+        .all<any>()
+    }
 
     const cdRowsAll: any[] = cdRowsRes.results || []
     if (cdRowsAll.length === 0) return c.json(jsonOk([]))
@@ -161,7 +208,7 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
       const { results } = await c.env.DB
         .prepare(
           `SELECT teachingClassId, teacherCode, teacherName, arrangeInfoText
-           FROM teacher
+           FROM teacher_by_class
            WHERE teachingClassId IN (${placeholders})`
         )
         .bind(...part)
@@ -374,7 +421,7 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
       const { results } = await c.env.DB
         .prepare(
           `SELECT teachingClassId, teacherCode, teacherName, arrangeInfoText
-           FROM teacher
+           FROM teacher_by_class
            WHERE teachingClassId IN (${placeholders})`
         )
         .bind(...part)
@@ -463,11 +510,11 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
       args.push(faculty)
     }
     if (teacherCode) {
-      where.push('t.teacherCode LIKE ?')
+      where.push('EXISTS (SELECT 1 FROM teacher_by_class t WHERE t.teachingClassId = cd.id AND t.teacherCode LIKE ?)')
       args.push(`%${teacherCode}%`)
     }
     if (teacherName) {
-      where.push('t.teacherName LIKE ?')
+      where.push('EXISTS (SELECT 1 FROM teacher_by_class t WHERE t.teachingClassId = cd.id AND t.teacherName LIKE ?)')
       args.push(`%${teacherName}%`)
     }
 
@@ -486,7 +533,6 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
       LEFT JOIN faculty f ON f.faculty = cd.faculty
       LEFT JOIN campus ca ON ca.campus = cd.campus
       LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
-      LEFT JOIN teacher t ON t.teachingClassId = cd.id
       ${whereSql}
       GROUP BY cd.courseCode, cd.courseName, f.facultyI18n
       ORDER BY cd.courseCode ASC
@@ -525,10 +571,40 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
     if (!Number.isFinite(calendarId) || !Number.isFinite(day) || !Number.isFinite(section)) return c.json(jsonErr(400, '输入参数有误'), 400)
 
     const patterns = optCourseQueryListGenerator(day, section)
-    if (!patterns) return c.json(jsonErr(400, '输入参数有误', []), 400)
+    const slot = optCourseSlotGenerator(day, section)
+    if (!patterns || !slot) return c.json(jsonErr(400, '输入参数有误', []), 400)
+
+    // 优先走 arrangement 表（calendarId, weekday, startPeriod, endPeriod 索引）；
+    // 该学期还没有导出 arrangement 时回退到 arrangeinfo.arrangeInfoText LIKE 扫描（每个教学班一行）
+    let hasArrangement = false
+    try {
+      const row = await c.env.DB.prepare('SELECT 1 as ok FROM arrangement WHERE calendarId = ? LIMIT 1').bind(calendarId).first<{ ok: number }>()
+      hasArrangement = Boolean(row?.ok)
+    } catch (_e) {
+      hasArrangement = false
+    }
 
-    const orLike = patterns.map(() => 't.arrangeInfoText LIKE ?').join(' OR ')
     const labelPlaceholders = OPTIONAL_LABEL_IDS.map(() => '?').join(',')
+    let matchSql: string
+    let matchArgs: any[]
+    if (hasArrangement) {
+      const endSql = slot.endPeriods ? `AND a.endPeriod IN (${slot.endPeriods.map(() => '?').join(',')})` : ''
+      matchSql = `JOIN (
+        SELECT DISTINCT a.teachingClassId as teachingClassId
+        FROM arrangement a
+        WHERE a.calendarId = ? AND a.weekday = ? AND a.startPeriod = ? ${endSql}
+      ) a ON a.teachingClassId = cd.id`
+      matchArgs = [calendarId, slot.weekday, slot.startPeriod, ...(slot.endPeriods || [])]
+    } else {
+      const orLike = patterns.map(() => 'ai.arrangeInfoText LIKE ?').join(' OR ')
+      matchSql = `JOIN (
+        SELECT ai.teachingClassId as teachingClassId
+        FROM arrangeinfo ai
+        WHERE ${orLike}
+      ) a ON a.teachingClassId = cd.id`
+      matchArgs = [...patterns]
+    }
+
     const query = `
       SELECT
         cd.courseCode as courseCode,
@@ -538,18 +614,17 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
         GROUP_CONCAT(DISTINCT n.courseLabelName) as courseNature,
         GROUP_CONCAT(DISTINCT ca.campusI18n) as campus
       FROM coursedetail cd
-      JOIN teacher t ON t.teachingClassId = cd.id
+      ${matchSql}
       LEFT JOIN faculty f ON f.faculty = cd.faculty
       LEFT JOIN campus ca ON ca.campus = cd.campus
       LEFT JOIN coursenature_by_calendar n ON n.courseLabelId = cd.courseLabelId AND n.calendarId = cd.calendarId
       WHERE cd.calendarId = ?
-        AND (${orLike})
         AND cd.courseLabelId IN (${labelPlaceholders})
       GROUP BY cd.courseCode, cd.courseName, f.facultyI18n
       ORDER BY cd.courseCode ASC
     `
 
-    const { results } = await c.env.DB.prepare(query).bind(calendarId, ...patterns, ...OPTIONAL_LABEL_IDS).all<any>()
+    const { results } = await c.env.DB.prepare(query).bind(...matchArgs, calendarId, ...OPTIONAL_LABEL_IDS).all<any>()
     const data = (results || []).map((r: any) => ({
       courseCode: String(r.courseCode || ''),
       courseName: String(r.courseName || ''),
@@ -611,14 +686,25 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
       if (cdRows.results?.length) cdRowsAll.push(...(cdRows.results || []))
     }
 
-    // target majorId for isExclusive
+    // isExclusive: classes linked to the target major, from the precomputed list or one chunked lookup (not one probe per class)
     let targetMajorId: number | null = null
+    const exclusiveIds = new Set<number>()
     if (majorInfo?.grade && majorInfo?.code) {
-      const row = await c.env.DB
-        .prepare('SELECT id FROM major WHERE code = ? AND grade <= ? ORDER BY grade DESC LIMIT 1')
-        .bind(String(majorInfo.code), Number(majorInfo.grade))
-        .first<{ id: number }>()
-      targetMajorId = row?.id ?? null
+      const resolved = await resolveMajor(c.env.DB, calendarId, String(majorInfo.code), Number(majorInfo.grade))
+      targetMajorId = resolved.majorId
+      if (resolved.ownCourseIds !== null) {
+        for (const id of JSON.parse(resolved.ownCourseIds)) exclusiveIds.add(Number(id))
+      } else if (targetMajorId) {
+        const classIds = cdRowsAll.filter((r: any) => majorCourseCodes.includes(String(r.courseCode || ''))).map((r: any) => Number(r.id))
+        for (const part of chunk(classIds, MAX_SQL_VARS)) {
+          const placeholders = part.map(() => '?').join(',')
+          const { results } = await c.env.DB
+            .prepare(`SELECT courseId FROM majorandcourse WHERE majorId = ? AND courseId IN (${placeholders})`)
+            .bind(targetMajorId, ...part)
+            .all<{ courseId: number }>()
+          for (const r of results || []) exclusiveIds.add(Number(r.courseId))
+        }
+      }
     }
 
     for (const row of cdRowsAll) {
@@ -630,15 +716,7 @@ export function registerPkRoutes<T extends PkBindings>(app: Hono<{ Bindings: T }
 
       let isExclusive: boolean | undefined = undefined
       if (majorCourseCodes.includes(cc)) {
-        if (!targetMajorId) {
-          isExclusive = false
-        } else {
-          const ex = await c.env.DB
-            .prepare('SELECT 1 as ok FROM majorandcourse WHERE majorId = ? AND courseId = ? LIMIT 1')
-            .bind(targetMajorId, row.id)
-            .first<{ ok: number }>()
-          isExclusive = Boolean(ex?.ok)
-        }
+        isExclusive = Boolean(targetMajorId) && exclusiveIds.has(Number(row.id))
       }
 
       out[cc] = out[cc] || []
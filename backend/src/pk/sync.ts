@@ -64,6 +64,8 @@ async function deleteCalendarData(db: D1Database, calendarId: number) {
     const chunk = classIds.slice(i, i + chunkSize)
     const placeholders = chunk.map(() => '?').join(',')
     await db.prepare(`DELETE FROM teacher WHERE teachingClassId IN (${placeholders})`).bind(...chunk).run()
+    await db.prepare(`DELETE FROM teacherandclass WHERE teachingClassId IN (${placeholders})`).bind(...chunk).run()
+    await db.prepare(`DELETE FROM arrangeinfo WHERE teachingClassId IN (${placeholders})`).bind(...chunk).run()
     await db.prepare(`DELETE FROM majorandcourse WHERE courseId IN (${placeholders})`).bind(...chunk).run()
   }
 
@@ -71,6 +73,44 @@ async function deleteCalendarData(db: D1Database, calendarId: number) {
   await db.prepare('DELETE FROM calendar WHERE calendarId = ?').bind(calendarId).run()
   // keep other semesters; clear only this calendar's course nature cache
   await db.prepare('DELETE FROM coursenature_by_calendar WHERE calendarId = ?').bind(calendarId).run()
+  // arrangement 由导出脚本解析写入；这里不重建，清掉后 findCourseByTime 会回退到 arrangeInfoText 匹配
+  await db.prepare('DELETE FROM arrangement WHERE calendarId = ?').bind(calendarId).run()
+  // 预计算的专业课程列表随本学期一起清掉，同步完成后由 rebuildMajorCourses 重建
+  await db.prepare('DELETE FROM majorcourses WHERE calendarId = ?').bind(calendarId).run()
+}
+
+// 与导出脚本 (scripts/pk_export: MAJORRESOLVE_SQL / MAJORRESOLVE_STALE_SQL / MAJORCOURSES_SQL) 相同的重建 SQL，
+// 否则 resolveMajor / findCourseByMajor 会读到同步前的 majorresolve / majorcourses
+async function rebuildMajorCourses(db: D1Database, calendarId: number) {
+  await db
+    .prepare(
+      `INSERT INTO majorresolve (code, grade, majorId)
+       SELECT code, grade, majorId FROM (
+         SELECT c.code AS code, g.grade AS grade,
+           (SELECT m.id FROM major m WHERE m.code = c.code AND m.grade <= g.grade ORDER BY m.grade DESC, m.id DESC LIMIT 1) AS majorId
+         FROM (SELECT DISTINCT code FROM major WHERE code IS NOT NULL) c, (SELECT DISTINCT grade FROM major WHERE grade IS NOT NULL) g
+       ) WHERE majorId IS NOT NULL
+       ON CONFLICT(code, grade) DO UPDATE SET majorId = excluded.majorId WHERE majorresolve.majorId != excluded.majorId`
+    )
+    .run()
+  await db
+    .prepare(
+      `DELETE FROM majorresolve WHERE grade NOT IN (SELECT grade FROM major WHERE grade IS NOT NULL)
+       OR NOT EXISTS (SELECT 1 FROM major m WHERE m.id = majorresolve.majorId AND m.code = majorresolve.code AND m.grade <= majorresolve.grade)`
+    )
+    .run()
+  await db.prepare('DELETE FROM majorcourses WHERE calendarId = ?').bind(calendarId).run()
+  await db
+    .prepare(
+      `INSERT INTO majorcourses (calendarId, majorId, courseIds, ownCourseIds)
+       SELECT l.calendarId, t.id, json_group_array(DISTINCT l.courseId), json_group_array(l.courseId) FILTER (WHERE l.majorId = t.id)
+       FROM (SELECT DISTINCT r.majorId AS id, m.code AS code, m.grade AS grade FROM majorresolve r JOIN major m ON m.id = r.majorId) t
+       JOIN (SELECT cd.calendarId AS calendarId, mac.majorId AS majorId, mac.courseId AS courseId, m.code AS code, m.grade AS grade
+             FROM coursedetail cd JOIN majorandcourse mac ON mac.courseId = cd.id JOIN major m ON m.id = mac.majorId WHERE cd.calendarId = ?) l
+       ON l.code = t.code AND l.grade <= t.grade GROUP BY l.calendarId, t.id`
+    )
+    .bind(calendarId)
+    .run()
 }
 
 async function ensurePkTables(db: D1Database) {
@@ -94,7 +134,22 @@ async function ensurePkTables(db: D1Database) {
   await db.prepare(
     'CREATE TABLE IF NOT EXISTS teacher (id INTEGER PRIMARY KEY, teachingClassId INTEGER, teacherCode TEXT, teacherName TEXT, arrangeInfoText TEXT)'
   ).run()
+  await db.prepare('CREATE TABLE IF NOT EXISTS teacherinfo (id INTEGER PRIMARY KEY, teacherCode TEXT, teacherName TEXT, calendarId INTEGER)').run()
+  await db.prepare(
+    'CREATE TABLE IF NOT EXISTS teacherandclass (teachingClassId INTEGER NOT NULL, teacherId INTEGER NOT NULL, PRIMARY KEY (teachingClassId, teacherId)) WITHOUT ROWID'
+  ).run()
+  await db.prepare('CREATE TABLE IF NOT EXISTS arrangeinfo (teachingClassId INTEGER PRIMARY KEY, arrangeInfoText TEXT)').run()
+  await db.prepare(
+    'CREATE VIEW IF NOT EXISTS teacher_by_class AS SELECT tc.teacherId AS id, tc.teachingClassId AS teachingClassId, ti.teacherCode AS teacherCode, ti.teacherName AS teacherName, ai.arrangeInfoText AS arrangeInfoText FROM teacherandclass tc LEFT JOIN teacherinfo ti ON ti.id = tc.teacherId LEFT JOIN arrangeinfo ai ON ai.teachingClassId = tc.teachingClassId'
+  ).run()
+  await db.prepare(
+    'CREATE TABLE IF NOT EXISTS arrangement (teachingClassId INTEGER NOT NULL, slotIndex INTEGER NOT NULL, calendarId INTEGER NOT NULL, weekday INTEGER NOT NULL, startPeriod INTEGER NOT NULL, endPeriod INTEGER NOT NULL, weekMask INTEGER NOT NULL DEFAULT 0, oddEven INTEGER NOT NULL DEFAULT 0, room TEXT, campus TEXT, PRIMARY KEY (teachingClassId, slotIndex))'
+  ).run()
   await db.prepare('CREATE TABLE IF NOT EXISTS majorandcourse (majorId INTEGER NOT NULL, courseId INTEGER NOT NULL, PRIMARY KEY (majorId, courseId))').run()
+  await db.prepare('CREATE TABLE IF NOT EXISTS majorresolve (code TEXT NOT NULL, grade INTEGER NOT NULL, majorId INTEGER NOT NULL, PRIMARY KEY (code, grade)) WITHOUT ROWID').run()
+  await db.prepare(
+    'CREATE TABLE IF NOT EXISTS majorcourses (calendarId INTEGER NOT NULL, majorId INTEGER NOT NULL, courseIds TEXT NOT NULL, ownCourseIds TEXT NOT NULL, PRIMARY KEY (calendarId, majorId)) WITHOUT ROWID'
+  ).run()
   await db.prepare('CREATE TABLE IF NOT EXISTS fetchlog (fetchTime INTEGER DEFAULT (strftime(\'%s\',\'now\')), msg TEXT)').run()
 }
 
@@ -120,6 +175,7 @@ async function upsertCourseList(db: D1Database, list: any[], calendarId: number)
   const seenAssessment = new Set<string>()
   const seenCampus = new Set<string>()
   const seenFaculty = new Set<string>()
+  const seenTeacher = new Set<number>()
   const majorIdCache = new Map<string, number>() // name -> id (0 means not found)
 
   const stmts: any[] = []
@@ -258,14 +314,27 @@ async function upsertCourseList(db: D1Database, list: any[], calendarId: number)
     const arrangeInfo = normalizeStr(course?.arrangeInfo || '')
     const teachers = Array.isArray(course?.teacherList) ? course.teacherList : []
 
+    if (arrangeInfo) {
+      await push(db.prepare('INSERT OR REPLACE INTO arrangeinfo (teachingClassId, arrangeInfoText) VALUES (?, ?)').bind(teachingClassId, arrangeInfo))
+    }
+
     for (const t of teachers) {
       const teacherId = asInt(t?.id)
       if (teacherId === null) continue
-      await push(
-        db
-          .prepare('INSERT OR REPLACE INTO teacher (id, teachingClassId, teacherCode, teacherName, arrangeInfoText) VALUES (?, ?, ?, ?, ?)')
-          .bind(teacherId, teachingClassId, normalizeStr(t?.teacherCode) || null, normalizeStr(t?.teacherName) || null, arrangeInfo)
-      )
+      if (!seenTeacher.has(teacherId)) {
+        seenTeacher.add(teacherId)
+        await push(
+          db
+            .prepare(
+              `INSERT INTO teacherinfo (id, teacherCode, teacherName, calendarId)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET teacherCode=excluded.teacherCode, teacherName=excluded.teacherName, calendarId=excluded.calendarId
+               WHERE teacherinfo.calendarId IS NULL OR excluded.calendarId >= teacherinfo.calendarId`
+            )
+            .bind(teacherId, normalizeStr(t?.teacherCode) || null, normalizeStr(t?.teacherName) || null, calendarId)
+        )
+      }
+      await push(db.prepare('INSERT OR IGNORE INTO teacherandclass (teachingClassId, teacherId) VALUES (?, ?)').bind(teachingClassId, teacherId))
     }
 
     for (const major of majors) {
@@ -358,6 +427,8 @@ export async function syncOnesystemToPkTables(opts: {
       teachingClassInserted += await upsertCourseList(db, list, i)
     }
 
+    await rebuildMajorCourses(db, i)
+
     await db.prepare('INSERT INTO fetchlog (fetchTime, msg) VALUES (?, ?)').bind(Math.floor(Date.now() / 1000), `sync calendarId=${i}`).run()
   }
 
@@ -139,3 +139,19 @@ export function optCourseQueryListGenerator(day: number, section: number): strin
   }
   return null
 }
+
+export function optCourseSlotGenerator(day: number, section: number): { weekday: number; startPeriod: number; endPeriods: number[] | null } | null {
+  // 与 optCourseQueryListGenerator 的 LIKE 模式等价，用于 arrangement 表的索引查询
+  if (!Object.values(DAY_MAP).includes(day)) return null
+
+  if ([1, 2, 3, 4].includes(section)) {
+    return { weekday: day, startPeriod: 2 * section - 1, endPeriods: [2 * section] }
+  }
+  if (section === 5) {
+    return { weekday: day, startPeriod: 9, endPeriods: null }
+  }
+  if (section === 6) {
+    return { weekday: day, startPeriod: 10, endPeriods: [11, 12] }
+  }
+  return null
+}